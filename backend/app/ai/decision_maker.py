@@ -7,34 +7,68 @@ AI决策引擎 - 为AI玩家做出智能决策
 
 import random
 from typing import Dict, List, Optional, Tuple
-from ..core.poker import Card
+from ..core.poker import CARD_VALUES, CARD_SUITS, CARD_RANK_BITS
+from ..core.preflop_equity import preflop_table
 
 
 class AIDecisionMaker:
     """AI决策制定者"""
 
-    def __init__(self):
-        pass
+    def __init__(self, rng: Optional[random.Random] = None):
+        """
+        Args:
+            rng: 决策使用的随机数生成器（模拟时传入以复现结果）, 默认使用全局随机
+        """
+        self.rng = rng or random
 
     def evaluate_hand_strength(
         self,
-        hole_cards: List[Card],
-        community_cards: List[Card]
+        hole_cards: List[int],
+        community_cards: List[int],
+        num_opponents: int = 1
     ) -> float:
         """
         评估手牌强度 (0.0 - 1.0)
 
-        简化版评估：
-        - 基于高牌、对子、顺子听牌、同花听牌等
+        - 底牌: 翻牌前权益表中对抗 num_opponents 个对手的真实权益 (归一化)
+        - 公共牌: 对子、同花听牌等改进
         """
         if not hole_cards or len(hole_cards) != 2:
             return 0.0
 
-        score = 0.0
         card1, card2 = hole_cards
 
+        # 1. 底牌强度: 优先使用翻牌前权益表 (按对手数的真实权益, 归一化到 0-1)
+        if preflop_table.available:
+            score = preflop_table.strength(card1, card2, num_opponents)
+        else:
+            score = self._heuristic_hole_score(card1, card2)
+
+        # 2. 如果有公共牌，评估改进
+        if community_cards:
+            all_cards = hole_cards + community_cards
+
+            # 检查对子（点数位图中的位数少于牌数即有重复）
+            rank_mask = 0
+            suit_counts = [0, 0, 0, 0]
+            for card in all_cards:
+                rank_mask |= CARD_RANK_BITS[card]
+                suit_counts[CARD_SUITS[card]] += 1
+            if bin(rank_mask).count("1") < len(all_cards):
+                score += 0.3
+
+            # 检查同花听牌
+            if max(suit_counts) >= 4:
+                score += 0.2
+
+        return min(score, 1.0)
+
+    def _heuristic_hole_score(self, card1: int, card2: int) -> float:
+        """权益表不可用时的底牌启发式评分"""
+        score = 0.0
+
         # 使用 value (2-14) 进行统一比较
-        val1, val2 = card1.value, card2.value
+        val1, val2 = CARD_VALUES[card1], CARD_VALUES[card2]
 
         # 1. 底牌对子
         if val1 == val2:
@@ -55,30 +89,14 @@ class AIDecisionMaker:
             score += 0.1
 
         # 3. 同花
-        if card1.suit == card2.suit:
+        if CARD_SUITS[card1] == CARD_SUITS[card2]:
             score += 0.2
 
         # 4. 连牌 (顺子听牌)
         if abs(val1 - val2) <= 4:
             score += 0.1
 
-        # 5. 如果有公共牌，评估改进
-        if community_cards:
-            all_cards = hole_cards + community_cards
-
-            # 检查对子
-            values = [c.value for c in all_cards]
-            if len(set(values)) < len(values):  # 有重复
-                score += 0.3
-
-            # 检查同花听牌
-            suits = [c.suit for c in all_cards]
-            for suit in set(suits):
-                if suits.count(suit) >= 4:
-                    score += 0.2
-                    break
-
-        return min(score, 1.0)
+        return score
 
     def calculate_pot_odds(
         self,
@@ -99,14 +117,15 @@ class AIDecisionMaker:
         self,
         player_id: int,
         player_type: str,
-        hole_cards: List[Card],
-        community_cards: List[Card],
+        hole_cards: List[int],
+        community_cards: List[int],
         current_bet: int,
         player_bet: int,
         player_chips: int,
         pot: int,
         game_state: str,
-        position: str = "MP"
+        position: str = "MP",
+        num_opponents: int = 1
     ) -> Tuple[str, Optional[int]]:
         """
         为AI玩家做出决策
@@ -122,6 +141,7 @@ class AIDecisionMaker:
             pot: 底池
             game_state: 游戏阶段 (preflop/flop/turn/river)
             position: 位置 (BTN/SB/BB/UTG/MP/CO)
+            num_opponents: 仍在这手牌中的对手数 (多人底池使用对应的翻牌前权益)
 
         Returns:
             (action, amount) - 动作和金额
@@ -132,31 +152,32 @@ class AIDecisionMaker:
         if call_amount == 0:
             return self._decide_with_no_bet(
                 player_type, hole_cards, community_cards,
-                current_bet, player_chips, pot, game_state
+                current_bet, player_chips, pot, game_state, num_opponents
             )
 
         # 需要跟注
         return self._decide_with_bet(
             player_type, hole_cards, community_cards,
-            current_bet, call_amount, player_chips, pot, game_state
+            current_bet, call_amount, player_chips, pot, game_state, num_opponents
         )
 
     def _decide_with_no_bet(
         self,
         player_type: str,
-        hole_cards: List[Card],
-        community_cards: List[Card],
+        hole_cards: List[int],
+        community_cards: List[int],
         current_bet: int,
         chips: int,
         pot: int,
-        game_state: str
+        game_state: str,
+        num_opponents: int = 1
     ) -> Tuple[str, Optional[int]]:
         """当无需跟注时的决策
 
         注意: chips 是玩家剩余筹码，current_bet 是当前全局最大下注
         玩家已经下注了 current_bet (因为 call_amount == 0)
         """
-        hand_strength = self.evaluate_hand_strength(hole_cards, community_cards)
+        hand_strength = self.evaluate_hand_strength(hole_cards, community_cards, num_opponents)
 
         # 最小加注额（至少是大盲注，或当前下注的2倍）
         # 如果是preflop且current_bet是盲注，则至少加注到2BB
@@ -177,7 +198,7 @@ class AIDecisionMaker:
                 return ("check", None)
             elif hand_strength >= 0.4:
                 # 中等牌：有时加注，有时过牌
-                if random.random() < 0.3:
+                if self.rng.random() < 0.3:
                     raise_size = max(int(pot * 0.5), min_raise - current_bet)
                     raise_amount = min(raise_size, chips)
                     if current_bet + raise_amount > current_bet:
@@ -190,12 +211,12 @@ class AIDecisionMaker:
         elif player_type == "LAG":  # 松凶型
             if hand_strength >= 0.5:
                 # 中等以上牌：加注
-                raise_size = max(int(pot * random.uniform(0.5, 1.5)), min_raise - current_bet)
+                raise_size = max(int(pot * self.rng.uniform(0.5, 1.5)), min_raise - current_bet)
                 raise_amount = min(raise_size, chips)
                 if current_bet + raise_amount > current_bet:
                     return ("raise", current_bet + raise_amount)
                 return ("check", None)
-            elif random.random() < 0.4:
+            elif self.rng.random() < 0.4:
                 # 弱牌也有40%概率加注（诈唬）
                 raise_size = max(int(pot * 0.6), min_raise - current_bet)
                 raise_amount = min(raise_size, chips)
@@ -214,8 +235,8 @@ class AIDecisionMaker:
 
         elif player_type == "FISH":  # 鱼
             # 随机决策，经常看牌
-            if random.random() < 0.2 and hand_strength >= 0.3:
-                raise_size = max(int(pot * random.uniform(0.3, 1.0)), min_raise - current_bet)
+            if self.rng.random() < 0.2 and hand_strength >= 0.3:
+                raise_size = max(int(pot * self.rng.uniform(0.3, 1.0)), min_raise - current_bet)
                 raise_amount = min(raise_size, chips)
                 if current_bet + raise_amount > current_bet:
                     return ("raise", current_bet + raise_amount)
@@ -229,7 +250,7 @@ class AIDecisionMaker:
                     return ("raise", current_bet + raise_amount)
                 return ("check", None)
             elif hand_strength >= 0.4:
-                if random.random() < 0.2:
+                if self.rng.random() < 0.2:
                     raise_size = max(int(pot * 0.5), min_raise - current_bet)
                     raise_amount = min(raise_size, chips)
                     if current_bet + raise_amount > current_bet:
@@ -240,20 +261,21 @@ class AIDecisionMaker:
     def _decide_with_bet(
         self,
         player_type: str,
-        hole_cards: List[Card],
-        community_cards: List[Card],
+        hole_cards: List[int],
+        community_cards: List[int],
         current_bet: int,
         call_amount: int,
         chips: int,
         pot: int,
-        game_state: str
+        game_state: str,
+        num_opponents: int = 1
     ) -> Tuple[str, Optional[int]]:
         """当需要跟注时的决策
 
         注意: chips 是玩家剩余筹码，call_amount 是需要跟注的金额
         如果筹码不足，根据手牌强度决定是 all-in 还是弃牌
         """
-        hand_strength = self.evaluate_hand_strength(hole_cards, community_cards)
+        hand_strength = self.evaluate_hand_strength(hole_cards, community_cards, num_opponents)
         pot_odds = self.calculate_pot_odds(pot, call_amount)
 
         # 最小加注额（当前下注的2倍，或current_bet + 最小加注）
@@ -292,15 +314,15 @@ class AIDecisionMaker:
         elif player_type == "LAG":  # 松凶型
             if hand_strength >= 0.5:
                 # 较强牌：加注或 all-in
-                raise_size = max(int(pot * random.uniform(0.8, 1.5)), min_raise_total - current_bet)
+                raise_size = max(int(pot * self.rng.uniform(0.8, 1.5)), min_raise_total - current_bet)
                 total_raise = current_bet + raise_size
                 if raise_size <= chips - call_amount and total_raise > current_bet:
                     return ("raise", total_raise)
                 return ("all_in", None)
             elif hand_strength >= 0.25:
                 return ("call", None)
-            elif random.random() < 0.4:
-                if random.random() < 0.6:
+            elif self.rng.random() < 0.4:
+                if self.rng.random() < 0.6:
                     return ("call", None)
                 else:
                     raise_size = max(int(pot * 0.7), min_raise_total - current_bet)
@@ -312,7 +334,7 @@ class AIDecisionMaker:
 
         elif player_type == "PASSIVE":  # 被动型
             if hand_strength >= 0.6:
-                if random.random() < 0.2:
+                if self.rng.random() < 0.2:
                     raise_size = max(int(pot * 0.5), min_raise_total - current_bet)
                     total_raise = current_bet + raise_size
                     if raise_size <= chips - call_amount and total_raise > current_bet:
@@ -326,9 +348,9 @@ class AIDecisionMaker:
             return ("fold", None)
 
         elif player_type == "FISH":  # 鱼
-            if hand_strength >= 0.2 or random.random() < 0.6:
-                if random.random() < 0.1:
-                    raise_size = max(int(pot * random.uniform(0.5, 1.2)), min_raise_total - current_bet)
+            if hand_strength >= 0.2 or self.rng.random() < 0.6:
+                if self.rng.random() < 0.1:
+                    raise_size = max(int(pot * self.rng.uniform(0.5, 1.2)), min_raise_total - current_bet)
                     total_raise = current_bet + raise_size
                     if raise_size <= chips - call_amount and total_raise > current_bet:
                         return ("raise", total_raise)
@@ -358,7 +380,7 @@ class AIDecisionMaker:
         types = ["TAG", "LAG", "PASSIVE", "FISH", "REGULAR"]
         weights = [0.2, 0.15, 0.2, 0.25, 0.2]  # 各类型概率
 
-        return random.choices(types, weights=weights)[0]
+        return self.rng.choices(types, weights=weights)[0]
 
 
 # 全局单例
@@ -0,0 +1,327 @@
+"""
+无头牌局模拟器
+
+使用真实的 PokerGame 规则和 AIDecisionMaker 连续模拟多手牌,
+不做任何 I/O、日志或等待, 用于在海量牌局上回归测试 AI 决策与智能发牌
+"""
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ..core.poker import PokerGame, GameState
+from .decision_maker import AIDecisionMaker
+from .smart_dealer import SmartDealer
+
+PLAYER_TYPES = ["TAG", "LAG", "PASSIVE", "FISH", "REGULAR"]
+
+# 单手牌的动作上限, 防止 AI 与规则配合异常时死循环
+MAX_ACTIONS_PER_HAND = 200
+
+# 底池大小分布的分档 (以大盲注为单位)
+POT_BUCKETS = [(5, "<5bb"), (10, "5-10bb"), (25, "10-25bb"), (50, "25-50bb"), (100, "50-100bb")]
+POT_BUCKET_OVERFLOW = "100bb+"
+
+_BETTING_STATES = (GameState.PREFLOP, GameState.FLOP, GameState.TURN, GameState.RIVER)
+
+
+def _pot_bucket(pot_bb: float) -> str:
+    for limit, label in POT_BUCKETS:
+        if pot_bb < limit:
+            return label
+    return POT_BUCKET_OVERFLOW
+
+
+@dataclass
+class SimulationStats:
+    """模拟结果汇总, 多个分片的结果可以直接合并"""
+    hands: int = 0
+    actions: int = 0
+    showdowns: int = 0
+    invalid_actions: int = 0   # AI 给出的非法动作 (按弃牌处理)
+    stalled_hands: int = 0     # 超出动作上限未能结束的牌局 (退还下注)
+    rebuys: int = 0
+    elapsed: float = 0.0       # 模拟耗时 (秒, 合并时为各分片之和)
+    big_blind: float = 2.0
+    total_pot: float = 0.0
+    max_pot: float = 0.0
+    pot_buckets: Dict[str, int] = field(default_factory=dict)
+    hand_ranks: Dict[str, int] = field(default_factory=dict)       # 获胜牌型分布 (含 WIN_BY_FOLD)
+    player_types: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def record_player(self, player_type: str, won_share: float, net_chips: float):
+        """记录某类型玩家一手牌的结果"""
+        entry = self.player_types.get(player_type)
+        if entry is None:
+            entry = self.player_types[player_type] = {"hands": 0, "wins": 0.0, "net_chips": 0.0}
+        entry["hands"] += 1
+        entry["wins"] += won_share
+        entry["net_chips"] += net_chips
+
+    def merge(self, other: "SimulationStats"):
+        """合并另一个分片的结果"""
+        self.hands += other.hands
+        self.actions += other.actions
+        self.showdowns += other.showdowns
+        self.invalid_actions += other.invalid_actions
+        self.stalled_hands += other.stalled_hands
+        self.rebuys += other.rebuys
+        self.elapsed += other.elapsed
+        self.total_pot += other.total_pot
+        self.max_pot = max(self.max_pot, other.max_pot)
+        for key, count in other.pot_buckets.items():
+            self.pot_buckets[key] = self.pot_buckets.get(key, 0) + count
+        for key, count in other.hand_ranks.items():
+            self.hand_ranks[key] = self.hand_ranks.get(key, 0) + count
+        for player_type, other_entry in other.player_types.items():
+            entry = self.player_types.setdefault(player_type, {"hands": 0, "wins": 0.0, "net_chips": 0.0})
+            for key, value in other_entry.items():
+                entry[key] += value
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SimulationStats":
+        """由 to_dict() 的结果还原 (用于跨进程传递分片结果)"""
+        return cls(
+            hands=data["hands"],
+            actions=data["actions"],
+            showdowns=data["showdowns"],
+            invalid_actions=data["invalid_actions"],
+            stalled_hands=data["stalled_hands"],
+            rebuys=data["rebuys"],
+            elapsed=data["elapsed"],
+            big_blind=data["big_blind"],
+            total_pot=data["total_pot"],
+            max_pot=data["max_pot"],
+            pot_buckets=dict(data["pot_buckets"]),
+            hand_ranks=dict(data["hand_ranks"]),
+            player_types={
+                player_type: {
+                    "hands": entry["hands"],
+                    "wins": entry["wins"],
+                    "net_chips": entry["net_chips"]
+                }
+                for player_type, entry in data["player_types"].items()
+            }
+        )
+
+    def to_dict(self) -> dict:
+        hands = self.hands or 1
+        return {
+            "hands": self.hands,
+            "actions": self.actions,
+            "showdowns": self.showdowns,
+            "showdown_rate": self.showdowns / hands,
+            "invalid_actions": self.invalid_actions,
+            "stalled_hands": self.stalled_hands,
+            "rebuys": self.rebuys,
+            "elapsed": self.elapsed,
+            "hands_per_sec": self.hands / self.elapsed if self.elapsed else 0.0,
+            "big_blind": self.big_blind,
+            "total_pot": self.total_pot,
+            "avg_pot": self.total_pot / hands,
+            "max_pot": self.max_pot,
+            "pot_buckets": dict(self.pot_buckets),
+            "hand_ranks": dict(self.hand_ranks),
+            "player_types": {
+                player_type: {
+                    "hands": entry["hands"],
+                    "wins": entry["wins"],
+                    "net_chips": entry["net_chips"],
+                    "win_rate": entry["wins"] / entry["hands"] if entry["hands"] else 0.0,
+                    "bb_per_100": (entry["net_chips"] / self.big_blind / entry["hands"] * 100
+                                   if entry["hands"] else 0.0)
+                }
+                for player_type, entry in self.player_types.items()
+            }
+        }
+
+
+class HeadlessSimulator:
+    """
+    无头模拟器
+
+    一桌 AI 玩家按真实规则连续打牌: 每手牌后庄家轮转, 筹码不足一个大盲注的
+    玩家自动补充到初始筹码以保持满桌. 传入 seed 时结果完全可复现
+    """
+
+    def __init__(
+        self,
+        num_players: int = 6,
+        starting_chips: float = 1000,
+        small_blind: float = 1.0,
+        big_blind: float = 2.0,
+        seed: Optional[int] = None,
+        player_types: Optional[List[str]] = None,
+        smart_dealing: bool = False
+    ):
+        """
+        Args:
+            num_players: 玩家数量 (2-10)
+            starting_chips: 初始 (及补充) 筹码
+            small_blind: 小盲注
+            big_blind: 大盲注
+            seed: 随机种子 (洗牌、AI 决策、智能发牌共用同一个生成器)
+            player_types: 各座位的 AI 类型, 不足时循环使用; 默认按 AI 的概率随机分配
+            smart_dealing: 是否使用 SmartDealer 发底牌
+        """
+        if not 2 <= num_players <= 10:
+            raise ValueError("玩家数量必须在 2-10 之间")
+
+        self.rng = random.Random(seed)
+        self.ai = AIDecisionMaker(self.rng)
+        self.dealer = SmartDealer(rng=self.rng) if smart_dealing else None
+        self.starting_chips = starting_chips
+
+        self.game = PokerGame(
+            game_id="simulation",
+            small_blind=small_blind,
+            big_blind=big_blind,
+            verbose=False
+        )
+        for idx in range(num_players):
+            self.game.add_player(idx + 1, starting_chips)
+
+        self.player_types: Dict[int, str] = {}
+        for idx, player in enumerate(self.game.players):
+            if player_types:
+                self.player_types[player.player_id] = player_types[idx % len(player_types)]
+            else:
+                self.player_types[player.player_id] = self.ai.assign_player_type(player.player_id)
+
+        self.loss_streaks: Dict[int, int] = {p.player_id: 0 for p in self.game.players}
+        self.stats = SimulationStats(big_blind=big_blind)
+
+    def run(self, num_hands: int) -> SimulationStats:
+        """连续模拟 num_hands 手牌, 返回累计结果"""
+        play_hand = self.play_hand
+        start = time.perf_counter()
+        for _ in range(num_hands):
+            play_hand()
+        self.stats.elapsed += time.perf_counter() - start
+        return self.stats
+
+    def play_hand(self):
+        """模拟一手牌并累计统计"""
+        game = self.game
+        stats = self.stats
+        players = game.players
+
+        # 补充筹码, 保持满桌 (start_hand 会移除筹码为 0 的玩家)
+        for player in players:
+            if player.chips < game.big_blind:
+                player.chips = self.starting_chips
+                stats.rebuys += 1
+        chips_before = [player.chips for player in players]
+
+        game.start_hand(self.rng)
+        if self.dealer:
+            self._smart_deal()
+
+        decide = self.ai.make_decision
+        actions = 0
+        while game.state in _BETTING_STATES and actions < MAX_ACTIONS_PER_HAND:
+            player = game.get_current_player()
+            if player is None:
+                break
+            action, amount = decide(
+                player_id=player.player_id,
+                player_type=self.player_types[player.player_id],
+                hole_cards=player.hole_cards,
+                community_cards=game.community_cards,
+                current_bet=game.current_bet,
+                player_bet=player.current_bet,
+                player_chips=player.chips,
+                pot=game.pot,
+                game_state=game.state.value,
+                position=player.position,
+                num_opponents=game.active_opponents(player)
+            )
+            try:
+                game.player_action(player.player_id, action, amount or 0)
+            except ValueError:
+                stats.invalid_actions += 1
+                game.player_action(player.player_id, "fold", 0)
+            actions += 1
+
+        pot = sum(player.total_bet for player in players)
+        if game.state == GameState.SHOWDOWN:
+            game.showdown()
+            stats.showdowns += 1
+        elif game.state != GameState.FINISHED:
+            # 牌局未能正常结束, 退还本手下注
+            stats.stalled_hands += 1
+            for player in players:
+                player.chips += player.total_bet
+            game.pot = 0
+            game.state = GameState.FINISHED
+            game.last_winners = []
+
+        self._record_hand(pot, actions, chips_before)
+        game.dealer_idx = (game.dealer_idx + 1) % len(players)
+
+    def _smart_deal(self):
+        """用 SmartDealer 替换 start_hand 发出的底牌, 剩余牌作为牌堆"""
+        game = self.game
+        player_states = [
+            {
+                "player_id": player.player_id,
+                "activity_score": 1.0,
+                "loss_streak": self.loss_streaks[player.player_id],
+                "skill_level": 50
+            }
+            for player in game.players
+        ]
+        hole_cards, remaining = self.dealer.deal_with_strategy(len(game.players), player_states)
+        for player, cards in zip(game.players, hole_cards):
+            player.hole_cards = cards
+        game.deck.cards = list(remaining)
+
+    def _record_hand(self, pot: float, actions: int, chips_before: List[float]):
+        stats = self.stats
+        game = self.game
+        stats.hands += 1
+        stats.actions += actions
+        stats.total_pot += pot
+        if pot > stats.max_pot:
+            stats.max_pot = pot
+        bucket = _pot_bucket(pot / game.big_blind)
+        stats.pot_buckets[bucket] = stats.pot_buckets.get(bucket, 0) + 1
+
+        winners = game.last_winners
+        if winners:
+            hand_rank = winners[0]["hand_rank"]
+            stats.hand_ranks[hand_rank] = stats.hand_ranks.get(hand_rank, 0) + 1
+        winner_ids = {w["player_id"] for w in winners}
+        share = 1 / len(winner_ids) if winner_ids else 0.0
+
+        for player, before in zip(game.players, chips_before):
+            won = player.player_id in winner_ids
+            stats.record_player(
+                self.player_types[player.player_id],
+                share if won else 0.0,
+                player.chips - before
+            )
+            self.loss_streaks[player.player_id] = 0 if won else self.loss_streaks[player.player_id] + 1
+
+
+def run_simulation(
+    num_hands: int,
+    num_players: int = 6,
+    seed: Optional[int] = None,
+    player_types: Optional[List[str]] = None,
+    smart_dealing: bool = False,
+    starting_chips: float = 1000,
+    small_blind: float = 1.0,
+    big_blind: float = 2.0
+) -> dict:
+    """在一张新桌上模拟 num_hands 手牌, 返回 SimulationStats.to_dict() (可在子进程中调用)"""
+    simulator = HeadlessSimulator(
+        num_players=num_players,
+        starting_chips=starting_chips,
+        small_blind=small_blind,
+        big_blind=big_blind,
+        seed=seed,
+        player_types=player_types,
+        smart_dealing=smart_dealing
+    )
+    return simulator.run(num_hands).to_dict()
@@ -2,7 +2,10 @@
 import random
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
-from ..core.poker import Card, Deck, RANK_SYMBOLS
+import numpy as np
+from ..core.poker import Deck, RANK_SYMBOLS, CARD_RANKS, CARD_SUITS
+from ..core.hand_evaluator import HandEvaluator
+from ..core.preflop_equity import preflop_table
 
 
 @dataclass
@@ -32,15 +35,16 @@ class SmartDealer:
     4. 增加戏剧性牌面出现概率
     """
 
-    def __init__(self, config: Optional[DealingConfig] = None):
+    def __init__(self, config: Optional[DealingConfig] = None, rng: Optional[random.Random] = None):
         self.config = config or DealingConfig()
         self.deck = Deck()
+        self.rng = rng or random
 
     def deal_with_strategy(
         self,
         num_players: int,
         player_states: List[Dict]
-    ) -> Tuple[List[List[Card]], List[Card]]:
+    ) -> Tuple[List[List[int]], List[int]]:
         """
         策略性发牌
 
@@ -64,10 +68,10 @@ class SmartDealer:
         # 按权重发牌
         return self._weighted_deal(num_players, weights)
 
-    def _standard_deal(self, num_players: int) -> Tuple[List[List[Card]], List[Card]]:
+    def _standard_deal(self, num_players: int) -> Tuple[List[List[int]], List[int]]:
         """标准随机发牌"""
         self.deck.reset()
-        self.deck.shuffle()
+        self.deck.shuffle(self.rng)
 
         hole_cards = []
         for _ in range(num_players):
@@ -106,14 +110,14 @@ class SmartDealer:
         self,
         num_players: int,
         weights: List[float]
-    ) -> Tuple[List[List[Card]], List[Card]]:
+    ) -> Tuple[List[List[int]], List[int]]:
         """
         加权发牌
 
         原理: 对权重较高的玩家,增加获得较强手牌的概率
         """
         self.deck.reset()
-        self.deck.shuffle()
+        self.deck.shuffle(self.rng)
 
         # 生成所有可能的两张牌组合并评估强度
         all_cards = self.deck.cards.copy()
@@ -134,7 +138,7 @@ class SmartDealer:
             weight = weights[player_idx] if player_idx < len(weights) else 1.0
 
             # 从剩余牌中选择
-            available_cards = [c for i, c in enumerate(all_cards) if i not in used_cards]
+            available_cards = [c for c in all_cards if c not in used_cards]
 
             if len(available_cards) < 2:
                 break
@@ -142,32 +146,28 @@ class SmartDealer:
             # 根据权重选择手牌
             if weight > 1.05:
                 # 权重高 - 倾向选择较强的牌
-                hand = self._select_stronger_hand(available_cards)
+                hand = self._select_stronger_hand(available_cards, num_players - 1)
             elif weight < 0.95:
                 # 权重低 - 倾向选择较弱的牌
                 hand = self._select_weaker_hand(available_cards)
             else:
                 # 正常随机
-                random.shuffle(available_cards)
+                self.rng.shuffle(available_cards)
                 hand = available_cards[:2]
 
             hole_cards[player_idx] = hand
 
             # 标记已使用的牌
-            for card in hand:
-                for i, c in enumerate(all_cards):
-                    if i not in used_cards and c.suit == card.suit and c.rank == card.rank:
-                        used_cards.add(i)
-                        break
+            used_cards.update(hand)
 
         # 更新剩余牌堆
-        remaining = [c for i, c in enumerate(all_cards) if i not in used_cards]
+        remaining = [c for c in all_cards if c not in used_cards]
         self.deck.cards = remaining
 
         return hole_cards, remaining
 
-    def _select_stronger_hand(self, cards: List[Card]) -> List[Card]:
-        """选择较强的手牌"""
+    def _select_stronger_hand(self, cards: List[int], num_opponents: int = 1) -> List[int]:
+        """选择较强的手牌 (按 num_opponents 个对手时的翻牌前权益)"""
         if len(cards) < 2:
             return cards
 
@@ -180,60 +180,72 @@ class SmartDealer:
 
         for i, card1 in enumerate(sample_cards):
             for card2 in sample_cards[i + 1:]:
-                score = self._evaluate_hand_strength([card1, card2])
+                score = self._evaluate_hand_strength([card1, card2], num_opponents)
                 if score > best_score:
                     best_score = score
                     best_hand = [card1, card2]
 
         # 加入随机性,不总是选最强的
-        if random.random() < 0.3 and len(cards) >= 4:
+        if self.rng.random() < 0.3 and len(cards) >= 4:
             # 30%概率选择次优
-            random.shuffle(cards)
+            self.rng.shuffle(cards)
             return cards[:2]
 
         return best_hand or cards[:2]
 
-    def _select_weaker_hand(self, cards: List[Card]) -> List[Card]:
+    def _select_weaker_hand(self, cards: List[int]) -> List[int]:
         """选择较弱的手牌"""
         if len(cards) < 2:
             return cards
 
         # 简单实现: 随机选择中等偏下的牌
-        random.shuffle(cards)
+        self.rng.shuffle(cards)
         return cards[:2]
 
-    def _evaluate_hand_strength(self, cards: List[Card]) -> float:
+    def _evaluate_hand_strength(self, cards: List[int], num_opponents: int = 1) -> float:
         """
         评估两张底牌的强度 (0-1)
 
+        优先使用翻牌前权益表中对抗 num_opponents 个对手的真实权益排序, 不可用时退回启发式评分
+        """
+        if len(cards) != 2:
+            return 0
+
+        card1, card2 = cards
+        if preflop_table.available:
+            return preflop_table.strength(card1, card2, num_opponents)
+
+        return self._heuristic_hand_strength(card1, card2)
+
+    def _heuristic_hand_strength(self, card1: int, card2: int) -> float:
+        """
+        启发式底牌强度
+
         考虑因素:
         - 高牌价值
         - 是否对子
         - 是否同花
         - 是否连张
         """
-        if len(cards) != 2:
-            return 0
-
-        card1, card2 = cards
+        rank1, rank2 = CARD_RANKS[card1], CARD_RANKS[card2]
         score = 0.0
 
         # 高牌加分 (每张牌最高0.3分)
-        score += (card1.rank / 12) * 0.3
-        score += (card2.rank / 12) * 0.3
+        score += (rank1 / 12) * 0.3
+        score += (rank2 / 12) * 0.3
 
         # 对子加分 (0.25分)
-        if card1.rank == card2.rank:
+        if rank1 == rank2:
             score += 0.25
             # 高对子额外加分
-            score += (card1.rank / 12) * 0.1
+            score += (rank1 / 12) * 0.1
 
         # 同花加分 (0.1分)
-        if card1.suit == card2.suit:
+        if CARD_SUITS[card1] == CARD_SUITS[card2]:
             score += 0.1
 
         # 连张加分 (0.05分)
-        gap = abs(card1.rank - card2.rank)
+        gap = abs(rank1 - rank2)
         if gap == 1:
             score += 0.05
         elif gap == 2:
@@ -241,18 +253,75 @@ class SmartDealer:
 
         return min(score, 1.0)
 
-    def get_hand_description(self, cards: List[Card]) -> str:
+    def audit_fairness(self, player_states: List[Dict], num_deals: int = 2000) -> Dict:
+        """
+        发牌公平性审计
+
+        按当前策略发 num_deals 手底牌, 每手从剩余牌中随机补齐 5 张公共牌,
+        一次批量评估所有玩家的 7 张牌, 统计各座位的摊牌胜率 (平局均分)
+        并与均匀分布比较
+
+        Args:
+            player_states: 玩家状态列表 (同 deal_with_strategy)
+            num_deals: 模拟发牌次数
+
+        Returns:
+            各座位胜率、相对偏差以及是否满足公平性约束
+        """
+        num_players = len(player_states)
+        # 使用独立的发牌器, 避免与线上发牌共用牌堆状态
+        dealer = SmartDealer(self.config)
+        rng = np.random.default_rng()
+
+        holes = np.empty((num_deals, num_players, 2), dtype=np.int8)
+        boards = np.empty((num_deals, 5), dtype=np.int8)
+        for i in range(num_deals):
+            hole_cards, remaining = dealer.deal_with_strategy(num_players, player_states)
+            holes[i] = hole_cards
+            boards[i] = rng.choice(remaining, 5, replace=False)
+
+        strengths = HandEvaluator.evaluate_batch(
+            holes.reshape(-1, 2),
+            np.repeat(boards, num_players, axis=0)
+        ).reshape(num_deals, num_players)
+
+        winners = strengths == strengths.max(axis=1, keepdims=True)
+        win_rates = (winners / winners.sum(axis=1, keepdims=True)).mean(axis=0)
+        expected = 1 / num_players
+        weights = self._calculate_weights(player_states)
+
+        seats = [
+            {
+                "player_id": state.get("player_id", idx + 1),
+                "weight": weights[idx],
+                "win_rate": float(win_rates[idx]),
+                "deviation": float(win_rates[idx] / expected - 1)
+            }
+            for idx, state in enumerate(player_states)
+        ]
+        max_deviation = max(abs(seat["deviation"]) for seat in seats)
+
+        return {
+            "num_deals": num_deals,
+            "num_players": num_players,
+            "expected_win_rate": expected,
+            "seats": seats,
+            "max_deviation": max_deviation,
+            "within_constraint": max_deviation <= self.config.max_adjustment
+        }
+
+    def get_hand_description(self, cards: List[int]) -> str:
         """获取手牌描述"""
         if len(cards) != 2:
             return "无效手牌"
 
-        card1, card2 = sorted(cards, key=lambda c: c.rank, reverse=True)
+        card1, card2 = sorted(cards, key=lambda c: CARD_RANKS[c], reverse=True)
 
-        rank1 = RANK_SYMBOLS[card1.rank]
-        rank2 = RANK_SYMBOLS[card2.rank]
-        suited = "s" if card1.suit == card2.suit else "o"
+        rank1 = RANK_SYMBOLS[CARD_RANKS[card1]]
+        rank2 = RANK_SYMBOLS[CARD_RANKS[card2]]
+        suited = "s" if CARD_SUITS[card1] == CARD_SUITS[card2] else "o"
 
-        if card1.rank == card2.rank:
+        if CARD_RANKS[card1] == CARD_RANKS[card2]:
             return f"{rank1}{rank2}"  # 对子
         else:
             return f"{rank1}{rank2}{suited}"
@@ -260,3 +329,8 @@ class SmartDealer:
 
 # 全局智能发牌器
 smart_dealer = SmartDealer()
+
+
+def audit_fairness(player_states: List[Dict], num_deals: int = 2000, config: Optional[DealingConfig] = None) -> Dict:
+    """发牌公平性审计 (模块级函数, 可提交到进程池执行; 参数同 SmartDealer.audit_fairness)"""
+    return SmartDealer(config).audit_fairness(player_states, num_deals)
@@ -0,0 +1,271 @@
+"""
+WebSocket 广播
+
+广播消息发布到游戏的 Redis 频道 (game_ws:{id}), 每个工作进程对有本地连接的游戏
+各订阅一次, 收到消息后发给本进程内连接该游戏的 WebSocket. 因此任一进程的广播都能
+到达所有进程上的观众, Redis 上的发布次数只与工作进程数有关, 与连接数无关.
+本进程内某个游戏的第一个连接建立时订阅, 最后一个连接断开时退订
+(同一游戏的订阅与退订按游戏加锁依次执行, 新连接不会被并发的退订漏掉).
+
+每个连接有一个有界发送队列和独立的发送任务, 慢连接不会拖慢其他连接.
+队列满时按 WS_SLOW_CLIENT_POLICY 处理: coalesce 丢弃积压的消息, 先发一条
+messages_dropped 通知 (客户端据此发送 resync 重新获取快照) 再发最新消息; drop 直接断开.
+发送失败或超时的连接自动移除. 消息从广播到发出的延迟按游戏统计 (见 GET /metrics).
+
+以 ?encoding=msgpack 连接的客户端收到 MessagePack 二进制帧 (每次分发只编码一次).
+
+Redis 不可用时只发给本进程内的连接
+"""
+import asyncio
+import json
+import time
+import weakref
+from typing import Dict, Optional, Set, Union
+
+from fastapi import WebSocket
+
+from .config import settings
+from .metrics import metrics, Timing
+from .msgpack_encoding import packb
+
+_CHANNEL_PREFIX = "game_ws:"
+
+
+class _Client:
+    """一个 WebSocket 连接: 有界发送队列 + 发送任务"""
+
+    def __init__(self, manager: "ConnectionManager", game_id: str, websocket: WebSocket, binary: bool = False):
+        self.manager = manager
+        self.game_id = game_id
+        self.websocket = websocket
+        self.binary = binary  # 以 MessagePack 二进制帧发送
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(settings.WS_SEND_QUEUE_SIZE, 2))
+        self.task = asyncio.create_task(self._write())
+
+    def encode(self, message: dict) -> Union[str, bytes]:
+        return packb(message) if self.binary else json.dumps(message)
+
+    def enqueue(self, sent_at: float, payload: Union[str, bytes]) -> bool:
+        """
+        放入发送队列 (payload 为 JSON 文本或 MessagePack 字节)
+
+        Returns:
+            False 表示队列已满且策略为断开连接
+        """
+        try:
+            self.queue.put_nowait((sent_at, payload))
+            return True
+        except asyncio.QueueFull:
+            pass
+        if settings.WS_SLOW_CLIENT_POLICY == "drop":
+            return False
+
+        dropped = 0
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            dropped += 1
+        metrics.inc("ws_messages_dropped", dropped)
+        self.queue.put_nowait((sent_at, self.encode({"type": "messages_dropped", "count": dropped})))
+        self.queue.put_nowait((sent_at, payload))
+        return True
+
+    async def _write(self):
+        while True:
+            sent_at, payload = await self.queue.get()
+            send = self.websocket.send_bytes if isinstance(payload, bytes) else self.websocket.send_text
+            try:
+                await asyncio.wait_for(send(payload), settings.WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 连接已断开或长时间无法写入
+                metrics.inc("ws_send_failures")
+                self.manager._spawn(self.manager.disconnect(self.game_id, self.websocket, close=True))
+                return
+            self.manager._observe(self.game_id, time.time() - sent_at)
+
+
+class ConnectionManager:
+    """WebSocket 连接管理与跨进程广播"""
+
+    def __init__(self):
+        self.active_connections: Dict[str, Dict[WebSocket, _Client]] = {}
+        self.fanout_latency: Dict[str, Timing] = {}
+        self.redis_client = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+        self._background: Set[asyncio.Task] = set()
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _lock(self, game_id: str) -> asyncio.Lock:
+        """游戏频道对应的锁 (没有时创建)"""
+        lock = self._locks.get(game_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[game_id] = lock
+        return lock
+
+    async def start(self, redis_client):
+        """使用 Redis 发布/订阅 (连接 Redis 后调用; redis_client 为 None 时只做本地广播)"""
+        if redis_client is None:
+            return
+        self.redis_client = redis_client
+        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """停止接收广播和各连接的发送任务, 关闭订阅连接"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        clients = [client for clients in self.active_connections.values() for client in clients.values()]
+        for client in clients:
+            client.task.cancel()
+        await asyncio.gather(*(client.task for client in clients), return_exceptions=True)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception as e:
+                print(f"⚠️  关闭广播订阅失败: {e}")
+            self._pubsub = None
+        self.redis_client = None
+
+    async def connect(self, game_id: str, websocket: WebSocket, binary: bool = False):
+        """
+        接受连接
+
+        Args:
+            binary: 以 MessagePack 二进制帧推送消息
+        """
+        await websocket.accept()
+        async with self._lock(game_id):
+            if game_id not in self.active_connections:
+                await self._subscribe(game_id)
+                self.active_connections[game_id] = {}
+                self.fanout_latency[game_id] = Timing()
+            self.active_connections[game_id][websocket] = _Client(self, game_id, websocket, binary)
+
+    async def disconnect(self, game_id: str, websocket: WebSocket, close: bool = False):
+        """
+        移除连接 (可重复调用)
+
+        Args:
+            close: 同时关闭 WebSocket (服务端主动断开慢连接或已失效的连接)
+        """
+        async with self._lock(game_id):
+            clients = self.active_connections.get(game_id)
+            client = clients.pop(websocket, None) if clients is not None else None
+            if client is None:
+                return
+            if client.task is not asyncio.current_task():
+                client.task.cancel()
+            if not clients:
+                del self.active_connections[game_id]
+                self.fanout_latency.pop(game_id, None)
+                await self._unsubscribe(game_id)
+        if close:
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+    def send(self, game_id: str, websocket: WebSocket, message: dict):
+        """经发送队列回复单个连接 (与广播消息保持顺序)"""
+        client = self.active_connections.get(game_id, {}).get(websocket)
+        if client is not None and not client.enqueue(time.time(), client.encode(message)):
+            self._spawn(self.disconnect(game_id, websocket, close=True))
+
+    async def broadcast(self, game_id: str, message: dict):
+        """发送消息给所有工作进程上连接该游戏的 WebSocket"""
+        text = json.dumps(message)
+        sent_at = time.time()
+        if self._pubsub is not None:
+            try:
+                # 频道消息带上广播时间, 用于统计跨进程的发送延迟
+                await self.redis_client.publish(f"{_CHANNEL_PREFIX}{game_id}", f"{sent_at} {text}")
+                return
+            except Exception as e:
+                print(f"⚠️  广播发布失败，只发给本进程连接: {e}")
+        await self._fan_out(game_id, sent_at, text)
+
+    async def _fan_out(self, game_id: str, sent_at: float, text: str):
+        """放入本进程内连接该游戏的各连接的发送队列 (每种编码只序列化一次, 不等待发送)"""
+        clients = self.active_connections.get(game_id)
+        if not clients:
+            return
+        packed = None
+        slow = []
+        for client in list(clients.values()):
+            if client.binary and packed is None:
+                packed = packb(json.loads(text))
+            if not client.enqueue(sent_at, packed if client.binary else text):
+                slow.append(client)
+        for client in slow:
+            metrics.inc("ws_slow_clients_dropped")
+            await self.disconnect(game_id, client.websocket, close=True)
+
+    def _spawn(self, coro):
+        """在后台执行 (保留任务引用直到完成)"""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _observe(self, game_id: str, seconds: float):
+        metrics.observe("ws_fanout", seconds)
+        timing = self.fanout_latency.get(game_id)
+        if timing is not None:
+            timing.observe(seconds)
+
+    def stats(self) -> dict:
+        """各游戏的连接数与发送延迟"""
+        return {
+            game_id: dict(self.fanout_latency[game_id].to_dict(), connections=len(clients))
+            for game_id, clients in self.active_connections.items()
+        }
+
+    async def _subscribe(self, game_id: str):
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.subscribe(f"{_CHANNEL_PREFIX}{game_id}")
+            self._subscribed.set()
+        except Exception as e:
+            print(f"⚠️  订阅游戏 {game_id} 广播失败: {e}")
+
+    async def _unsubscribe(self, game_id: str):
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe(f"{_CHANNEL_PREFIX}{game_id}")
+        except Exception as e:
+            print(f"⚠️  退订游戏 {game_id} 广播失败: {e}")
+
+    async def _listen(self):
+        """接收订阅频道的消息并发给本进程内的连接"""
+        while True:
+            if not self._pubsub.subscribed:
+                # 没有订阅任何频道时等待下一次订阅
+                self._subscribed.clear()
+                await self._subscribed.wait()
+                continue
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  接收广播失败: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message and message["type"] == "message":
+                game_id = message["channel"].decode()[len(_CHANNEL_PREFIX):]
+                sent_at, text = message["data"].decode().split(" ", 1)
+                await self._fan_out(game_id, float(sent_at), text)
+
+
+# 全局实例 (应用启动时 start)
+ws_manager = ConnectionManager()
@@ -16,6 +16,43 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    # 游戏状态存储的连接池大小
+    REDIS_MAX_CONNECTIONS: int = 50
+    # 遍历游戏时每次 SCAN 的键数
+    REDIS_SCAN_COUNT: int = 500
+
+    # 进程内热点游戏缓存: 容量 (0 表示关闭)、脏游戏写回间隔 (秒)
+    GAME_CACHE_SIZE: int = 1000
+    GAME_CACHE_FLUSH_INTERVAL: float = 0.5
+    # 多工作进程部署时开启: 加载时按版本号校验缓存, 保存立即写回
+    GAME_CACHE_VALIDATE: bool = False
+    # 事件溯源存储 (仅缓存模式): 同一条街内的动作只追加动作事件, 不重写快照; 每个游戏事件流的最大长度 (近似)
+    GAME_EVENT_SOURCING: bool = True
+    GAME_EVENT_LOG_MAXLEN: int = 10000
+
+    # 游戏 Actor: 空闲退出时间 (秒)、工作进程心跳间隔 (秒)、转发命令等待结果的超时 (秒)、
+    # 每个工作进程同时等待结果的转发命令数上限
+    GAME_ACTOR_IDLE_TIMEOUT: float = 60.0
+    GAME_WORKER_HEARTBEAT: float = 2.0
+    GAME_COMMAND_TIMEOUT: float = 30.0
+    GAME_FORWARD_MAX_INFLIGHT: int = 256
+    # 按游戏把命令路由到所属工作进程; 关闭后任一进程都直接修改游戏, 靠版本号比较并写入避免覆盖
+    # (需同时开启 GAME_CACHE_VALIDATE), 冲突时最多重试 GAME_CAS_RETRIES 次
+    GAME_ACTOR_ROUTING: bool = True
+    GAME_CAS_RETRIES: int = 3
+
+    # WebSocket 发送: 每个连接的发送队列长度、单条消息发送超时 (秒),
+    # 队列满时的处理: coalesce 丢弃积压只保留最新消息, drop 断开该连接
+    WS_SEND_QUEUE_SIZE: int = 64
+    WS_SEND_TIMEOUT: float = 5.0
+    WS_SLOW_CLIENT_POLICY: str = "coalesce"
+
+    # 手牌记录写入队列 (Redis 流): 每批最多写入的手牌数、没有新记录时每次等待的时间 (秒)、
+    # 一批写入失败的最大重试次数、其他进程未确认的记录被接管前的空闲时间 (秒)
+    HAND_HISTORY_BATCH_SIZE: int = 200
+    HAND_HISTORY_BLOCK: float = 1.0
+    HAND_HISTORY_MAX_RETRIES: int = 8
+    HAND_HISTORY_CLAIM_IDLE: float = 60.0
 
     # JWT认证
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -25,6 +62,9 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: list = ["*"]
 
+    # 计算密集任务进程池 (0 表示使用 CPU 核数)
+    PROCESS_POOL_WORKERS: int = 0
+
     class Config:
         env_file = ".env"
 
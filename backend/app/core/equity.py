@@ -0,0 +1,359 @@
+"""
+手牌权益计算
+
+给定底牌、部分公共牌和若干对手 (随机或指定范围), 计算胜/平/负概率:
+- 剩余情形数较少 (通常是转牌/河牌) 时精确枚举所有情形
+- 否则使用可复现种子的蒙特卡洛抽样, 并给出置信区间
+所有牌型评估都通过 HandEvaluator.evaluate_batch 批量完成
+"""
+import math
+from itertools import combinations
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .poker import RANK_SYMBOLS, make_card
+from .hand_evaluator import HandEvaluator
+
+# 情形数不超过该值时精确枚举
+EXACT_ENUMERATION_LIMIT = 200_000
+
+# 蒙特卡洛每批样本数 (限制中间数组内存)
+_MC_CHUNK = 50_000
+
+# 对手范围冲突时, 最多抽取 samples 的多少倍
+_MC_MAX_DRAW_FACTOR = 20
+
+Combo = Tuple[int, int]
+RangeSpec = Union[None, str, Sequence[Combo]]
+
+
+def _class_combos(high: int, low: int, kind: str) -> List[Combo]:
+    """某个起手牌类型 (如 AKs) 的所有具体组合"""
+    combos = []
+    for suit1 in range(4):
+        for suit2 in range(4):
+            if high == low and suit2 <= suit1:
+                continue
+            if kind == "s" and suit1 != suit2:
+                continue
+            if kind == "o" and suit1 == suit2:
+                continue
+            c1, c2 = make_card(suit1, high), make_card(suit2, low)
+            combos.append((min(c1, c2), max(c1, c2)))
+    return combos
+
+
+def parse_range(spec: str) -> Optional[List[Combo]]:
+    """
+    解析对手范围
+
+    支持逗号分隔的起手牌类型: "QQ", "AKs", "AKo", "AK" (同花+杂色),
+    以及 "+" 后缀: "TT+" (TT-AA), "ATs+" (ATs-AKs)
+
+    Returns:
+        具体组合列表; "random"/"any"/"*"/空字符串 返回 None, 表示随机手牌
+    """
+    spec = spec.strip()
+    if not spec or spec.lower() in ("random", "any", "*"):
+        return None
+
+    combos = set()
+    for token in spec.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        plus = token.endswith("+")
+        body = token[:-1] if plus else token
+        if (len(body) not in (2, 3) or body[0].upper() not in RANK_SYMBOLS
+                or body[1].upper() not in RANK_SYMBOLS):
+            raise ValueError(f"无法识别的范围: {token}")
+
+        kind = body[2].lower() if len(body) == 3 else ""
+        if kind not in ("", "s", "o"):
+            raise ValueError(f"无法识别的范围: {token}")
+
+        r1 = RANK_SYMBOLS.index(body[0].upper())
+        r2 = RANK_SYMBOLS.index(body[1].upper())
+        high, low = max(r1, r2), min(r1, r2)
+
+        if high == low:
+            if kind:
+                raise ValueError(f"对子不能指定同花/杂色: {token}")
+            classes = [(r, r) for r in range(low, 13 if plus else low + 1)]
+        else:
+            classes = [(high, k) for k in range(low, high if plus else low + 1)]
+
+        for class_high, class_low in classes:
+            combos.update(_class_combos(class_high, class_low, kind))
+
+    return sorted(combos)
+
+
+def _prepare(
+    hole_cards: Sequence[int],
+    board: Sequence[int],
+    num_opponents: int,
+    opponent_ranges: Optional[Sequence[RangeSpec]]
+) -> Tuple[List[int], List[int], List[Optional[List[Combo]]]]:
+    """校验输入, 并把对手范围解析为去除已知牌后的组合列表"""
+    hole = list(hole_cards)
+    board = list(board)
+    known = hole + board
+
+    if len(hole) != 2:
+        raise ValueError("底牌必须是2张")
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("公共牌必须是0、3、4或5张")
+    if any(not 0 <= c <= 51 for c in known) or len(set(known)) != len(known):
+        raise ValueError("存在无效或重复的牌")
+
+    if opponent_ranges is not None:
+        ranges = [parse_range(r) if isinstance(r, str) else r for r in opponent_ranges]
+    else:
+        ranges = [None] * num_opponents
+
+    if not 1 <= len(ranges) <= 9:
+        raise ValueError("对手数量必须在1-9之间")
+
+    dead = set(known)
+    live_ranges = []
+    for r in ranges:
+        if r is None:
+            live_ranges.append(None)
+            continue
+        live = [tuple(c) for c in r if c[0] not in dead and c[1] not in dead]
+        if not live:
+            raise ValueError("对手范围与已知牌冲突, 没有可用组合")
+        live_ranges.append(live)
+
+    return hole, board, live_ranges
+
+
+def _enumeration_size(remaining: int, need: int, ranges: List[Optional[List[Combo]]]) -> int:
+    """精确枚举的情形数 (指定范围的对手按范围大小估计上界)"""
+    size = 1
+    for r in ranges:
+        size *= math.comb(remaining, 2) if r is None else len(r)
+        remaining -= 2
+    return size * math.comb(remaining, need)
+
+
+def estimate_work(
+    hole_cards: Sequence[int],
+    board: Sequence[int] = (),
+    num_opponents: int = 1,
+    opponent_ranges: Optional[Sequence[RangeSpec]] = None,
+    samples: int = 20000,
+    exact_limit: int = EXACT_ENUMERATION_LIMIT
+) -> int:
+    """估算一次计算需要评估的手牌数量, 用于决定是否放到进程池执行"""
+    hole, board, ranges = _prepare(hole_cards, board, num_opponents, opponent_ranges)
+    size = _enumeration_size(52 - len(hole) - len(board), 5 - len(board), ranges)
+    scenarios = size if size <= exact_limit else samples
+    return scenarios * (len(ranges) + 1)
+
+
+def _score(hero: np.ndarray, opponents: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    逐行比较英雄与所有对手的强度
+
+    Returns:
+        (是否获胜, 是否平局, 每行的权益份额)
+    """
+    best = opponents.max(axis=1)
+    win = hero > best
+    tie = hero == best
+    tied_opponents = (opponents == best[:, None]).sum(axis=1)
+    share = win + tie / (tied_opponents + 1)
+    return win, tie, share
+
+
+def _evaluate_rows(hole: List[int], opp_cards: np.ndarray, boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """批量评估英雄和所有对手在每一行公共牌上的强度"""
+    rows, num_opponents = opp_cards.shape[0], opp_cards.shape[1]
+    hero = HandEvaluator.evaluate_batch(
+        np.broadcast_to(np.array(hole, dtype=np.int8), (rows, 2)),
+        boards
+    )
+    opponents = HandEvaluator.evaluate_batch(
+        opp_cards.reshape(-1, 2),
+        np.repeat(boards, num_opponents, axis=0)
+    ).reshape(rows, num_opponents)
+    return hero, opponents
+
+
+def _enumerate(hole: List[int], board: List[int], ranges: List[Optional[List[Combo]]]) -> Dict:
+    """精确枚举所有 (对手手牌, 剩余公共牌) 情形"""
+    deck = [c for c in range(52) if c not in set(hole + board)]
+    need = 5 - len(board)
+    opp_rows = []
+    board_rows = []
+
+    def assign(idx: int, used: frozenset, holdings: List[Combo]):
+        if idx == len(ranges):
+            rest = [c for c in deck if c not in used]
+            for fill in combinations(rest, need):
+                opp_rows.append(holdings)
+                board_rows.append(board + list(fill))
+            return
+        candidates = combinations([c for c in deck if c not in used], 2) if ranges[idx] is None else ranges[idx]
+        for combo in candidates:
+            if combo[0] in used or combo[1] in used:
+                continue
+            assign(idx + 1, used | set(combo), holdings + [combo])
+
+    assign(0, frozenset(), [])
+    if not opp_rows:
+        raise ValueError("对手范围之间相互冲突, 没有可用情形")
+
+    opp_cards = np.array(opp_rows, dtype=np.int8)
+    boards = np.array(board_rows, dtype=np.int8).reshape(len(board_rows), 5)
+    hero, opponents = _evaluate_rows(hole, opp_cards, boards)
+    win, tie, share = _score(hero, opponents)
+
+    total = len(opp_rows)
+    equity = float(share.mean())
+    return {
+        "method": "exact",
+        "samples": total,
+        "win": float(win.mean()),
+        "tie": float(tie.mean()),
+        "lose": float(1 - win.mean() - tie.mean()),
+        "equity": equity,
+        "confidence_interval": [equity, equity],
+        "seed": None
+    }
+
+
+def _monte_carlo(
+    hole: List[int],
+    board: List[int],
+    ranges: List[Optional[List[Combo]]],
+    samples: int,
+    seed: int,
+    confidence: float
+) -> Dict:
+    """蒙特卡洛抽样估算权益"""
+    rng = np.random.default_rng(seed)
+    known = hole + board
+    need = 5 - len(board)
+    num_opponents = len(ranges)
+    range_arrays = [None if r is None else np.array(r, dtype=np.int8) for r in ranges]
+
+    done = 0
+    drawn = 0
+    wins = ties = 0
+    share_sum = share_sq_sum = 0.0
+
+    while done < samples:
+        if drawn >= samples * _MC_MAX_DRAW_FACTOR:
+            break
+        n = min(_MC_CHUNK, samples - done)
+        drawn += n
+        rows = np.arange(n)
+
+        dead = np.zeros((n, 52), dtype=bool)
+        dead[:, known] = True
+        opp_cards = np.empty((n, num_opponents, 2), dtype=np.int8)
+        valid = np.ones(n, dtype=bool)
+
+        # 指定范围的对手: 从范围中均匀抽取, 与其他对手冲突的样本整行拒绝
+        for j, combos in enumerate(range_arrays):
+            if combos is None:
+                continue
+            picks = combos[rng.integers(len(combos), size=n)]
+            valid &= ~(dead[rows, picks[:, 0]] | dead[rows, picks[:, 1]])
+            dead[rows, picks[:, 0]] = True
+            dead[rows, picks[:, 1]] = True
+            opp_cards[:, j] = picks
+
+        # 其余牌随机排列: 死牌的排序键置为最大, 排在所有活牌之后
+        keys = rng.random((n, 52))
+        keys[dead] = 2.0
+        order = np.argsort(keys, axis=1).astype(np.int8)
+
+        pos = 0
+        for j, combos in enumerate(range_arrays):
+            if combos is None:
+                opp_cards[:, j] = order[:, pos:pos + 2]
+                pos += 2
+        boards = np.concatenate(
+            [np.broadcast_to(np.array(board, dtype=np.int8), (n, len(board))), order[:, pos:pos + need]],
+            axis=1
+        )
+
+        if not valid.all():
+            opp_cards, boards = opp_cards[valid], boards[valid]
+        if not len(boards):
+            continue
+
+        hero, opponents = _evaluate_rows(hole, opp_cards, boards)
+        win, tie, share = _score(hero, opponents)
+
+        done += len(boards)
+        wins += int(win.sum())
+        ties += int(tie.sum())
+        share_sum += float(share.sum())
+        share_sq_sum += float((share * share).sum())
+
+    if done == 0:
+        raise ValueError("对手范围之间相互冲突, 没有可用情形")
+
+    equity = share_sum / done
+    variance = max(share_sq_sum / done - equity * equity, 0.0) * done / max(done - 1, 1)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    margin = z * math.sqrt(variance / done)
+
+    return {
+        "method": "monte_carlo",
+        "samples": done,
+        "win": wins / done,
+        "tie": ties / done,
+        "lose": 1 - (wins + ties) / done,
+        "equity": equity,
+        "confidence_interval": [max(equity - margin, 0.0), min(equity + margin, 1.0)],
+        "seed": seed
+    }
+
+
+def calculate_equity(
+    hole_cards: Sequence[int],
+    board: Sequence[int] = (),
+    num_opponents: int = 1,
+    opponent_ranges: Optional[Sequence[RangeSpec]] = None,
+    samples: int = 20000,
+    seed: Optional[int] = None,
+    confidence: float = 0.95,
+    exact_limit: int = EXACT_ENUMERATION_LIMIT
+) -> Dict:
+    """
+    计算手牌对抗若干对手的权益
+
+    Args:
+        hole_cards: 英雄底牌（2张整数牌）
+        board: 已知公共牌（0/3/4/5张整数牌）
+        num_opponents: 对手数量 (未指定 opponent_ranges 时使用, 对手手牌随机)
+        opponent_ranges: 每个对手的范围, 如 ["QQ+,AKs", "random"]; 指定时对手数量取其长度
+        samples: 蒙特卡洛样本预算
+        seed: 随机种子, 为空时自动生成并在结果中返回
+        confidence: 置信区间的置信水平
+        exact_limit: 情形数不超过该值时改为精确枚举
+
+    Returns:
+        胜/平/负概率、权益 (平局按人数均分)、置信区间及计算方式
+    """
+    hole, board, ranges = _prepare(hole_cards, board, num_opponents, opponent_ranges)
+    size = _enumeration_size(52 - len(hole) - len(board), 5 - len(board), ranges)
+
+    if size <= exact_limit:
+        result = _enumerate(hole, board, ranges)
+    else:
+        if seed is None:
+            seed = int(np.random.default_rng().integers(2 ** 31))
+        result = _monte_carlo(hole, board, ranges, samples, seed, confidence)
+
+    result["num_opponents"] = len(ranges)
+    result["confidence"] = confidence
+    return result
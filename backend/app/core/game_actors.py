@@ -0,0 +1,452 @@
+"""
+游戏 Actor
+
+每个活跃游戏由一个 asyncio 任务 (GameActor) 独占: 对该游戏的所有命令进入它的队列,
+按顺序在内存中的游戏对象上执行, 状态经热点缓存写回 Redis (只做快照, 不再每个动作往返).
+
+多工作进程部署时, 各进程在 Redis 中登记心跳, 用存活进程构成一致性哈希环,
+每个游戏归哈希环上的一个进程所有. 收到不属于本进程的游戏的命令时,
+经 Redis 列表转发给所属进程执行, 结果经发起进程的回复频道返回 (每个进程一个订阅连接,
+等待结果时不占用共享连接池), 因此同一游戏始终只在一个进程中修改.
+同时等待结果的转发命令最多 GAME_FORWARD_MAX_INFLIGHT 条, 超出的排队 (计入超时).
+关闭 GAME_ACTOR_ROUTING 时不做路由, 每个进程直接执行命令, 并发修改由存储层的
+版本号比较并写入检测, 冲突时重新加载并重新执行命令 (命令可能被执行多次).
+
+命令以名称注册 (转发时只传名称与 JSON 参数):
+    @game_actors.command("player_action")
+    async def _player_action(game, player_id, action, amount):
+        ...
+
+    result = await game_actors.call(game_id, "player_action", player_id=1, action="call", amount=0)
+
+修改游戏的命令执行后比较前后的 get_state(), 有变化时游戏的 state_seq 加一,
+并把 (序号, 补丁) 交给 on_change 注册的回调 (WebSocket 增量协议, 见 core/state_diff.py)
+"""
+import asyncio
+import bisect
+import json
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from .config import settings
+from .poker import PokerGame
+from .redis_storage import RedisGameStorage, GameConflictError, game_storage
+from .state_diff import diff_state
+
+_WORKERS = "game_workers"                 # 有序集合: 工作进程 ID -> 最近一次心跳时间
+_INBOX_PREFIX = "game_workers:inbox:"     # 列表: 转发给该工作进程的命令
+_REPLY_PREFIX = "game_workers:reply:"     # 频道: 转发给其他进程的命令的结果 (每个工作进程一个)
+
+# 每个工作进程在哈希环上的虚拟节点数
+_VIRTUAL_NODES = 64
+
+# 心跳超过这么多个间隔未更新的工作进程视为已下线
+_HEARTBEAT_MISSES = 3
+
+
+class HashRing:
+    """一致性哈希环 (工作进程增减时只有少量游戏改变归属)"""
+
+    def __init__(self, nodes=(), replicas: int = _VIRTUAL_NODES):
+        self.nodes = sorted(nodes)
+        points = sorted(
+            (zlib.crc32(f"{node}#{i}".encode()), node)
+            for node in self.nodes for i in range(replicas)
+        )
+        self._hashes = [point[0] for point in points]
+        self._owners = [point[1] for point in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """key 所属的节点 (环为空时返回 None)"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, zlib.crc32(key.encode())) % len(self._hashes)
+        return self._owners[index]
+
+
+@dataclass
+class _Command:
+    func: Callable
+    readonly: bool  # 只读命令不保存游戏
+
+
+class GameActor:
+    """独占一个游戏的任务: 依次执行队列中的命令, 空闲超时后退出"""
+
+    def __init__(self, system: "GameActorSystem", game_id: str):
+        self.system = system
+        self.game_id = game_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """处理完已在队列中的命令后退出 (之后的命令交给新的 Actor 或游戏当前的所属进程)"""
+        self.system._actor_done(self)
+        self.queue.put_nowait(None)
+
+    async def _run(self):
+        leftovers = []
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), self.system.idle_timeout)
+                except asyncio.TimeoutError:
+                    if self.queue.empty():
+                        return
+                    continue
+                if item is None:
+                    return
+
+                name, kwargs, future = item
+                if future.done():
+                    continue
+                if not self.system.owns(self.game_id):
+                    # 哈希环已变化, 游戏归其他工作进程所有: 不在本进程修改, 连同之后的命令一起转交
+                    leftovers.append(item)
+                    return
+                try:
+                    result = await self.system.execute(self.game_id, name, kwargs)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self.system._actor_done(self)
+            # 未执行的命令按原顺序交给游戏当前的所属进程 (系统停止时返回 503), 不会一直等待
+            while not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is not None:
+                    leftovers.append(item)
+            pending = [item for item in leftovers if not item[2].done()]
+            if pending:
+                self.system._reroute(self.game_id, pending)
+
+
+class GameActorSystem:
+    """游戏 Actor 管理与跨进程命令路由"""
+
+    def __init__(self, storage: Optional[RedisGameStorage] = None):
+        self.storage = storage or game_storage
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.idle_timeout = settings.GAME_ACTOR_IDLE_TIMEOUT
+        self.heartbeat_interval = settings.GAME_WORKER_HEARTBEAT
+        self._commands: Dict[str, _Command] = {}
+        self._listeners: List[Callable] = []
+        self._actors: Dict[str, GameActor] = {}
+        self._ring = HashRing([self.worker_id])
+        self._tasks: List[asyncio.Task] = []
+        self._serving: Set[asyncio.Task] = set()
+        self._stopping = False
+        # 转发命令的结果: 回复频道的订阅、等待中的请求、同时转发数上限 (start 时创建)
+        self._replies = None
+        self._reply_task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._forward_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def _redis(self):
+        return self.storage.redis_client
+
+    def command(self, name: str, readonly: bool = False):
+        """注册命令的装饰器, 命令函数签名为 async def func(game, **kwargs)"""
+        def decorator(func: Callable) -> Callable:
+            self._commands[name] = _Command(func=func, readonly=readonly)
+            return func
+        return decorator
+
+    def on_change(self, func: Callable) -> Callable:
+        """注册状态变化回调的装饰器, 回调签名为 async def func(game_id, seq, ops)"""
+        self._listeners.append(func)
+        return func
+
+    def owns(self, game_id: str) -> bool:
+        """游戏是否归本进程所有"""
+        return self._ring.owner(game_id) in (None, self.worker_id)
+
+    async def start(self):
+        """登记本进程并开始接收转发的命令 (连接 Redis 后调用)"""
+        self._stopping = False
+        if not self._redis or not settings.GAME_ACTOR_ROUTING:
+            return
+        self._forward_slots = asyncio.Semaphore(settings.GAME_FORWARD_MAX_INFLIGHT)
+        self._replies = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._replies.subscribe(f"{_REPLY_PREFIX}{self.worker_id}")
+        self._reply_task = asyncio.create_task(self._reply_loop())
+        await self._heartbeat()
+        self._tasks = [
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._inbox_loop()),
+        ]
+        print(f"✅ 游戏 Actor 已启动: 工作进程 {self.worker_id}, 当前 {len(self._ring.nodes)} 个工作进程")
+
+    async def stop(self):
+        """注销本进程, 等待各 Actor 处理完队列中的命令 (之后收到的命令返回 503)"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._redis:
+            try:
+                await self._redis.zrem(_WORKERS, self.worker_id)
+            except Exception as e:
+                print(f"⚠️  注销工作进程失败: {e}")
+
+        actors = list(self._actors.values())
+        for actor in actors:
+            actor.stop()
+        await asyncio.gather(*(actor.task for actor in actors), return_exceptions=True)
+        await asyncio.gather(*self._serving, return_exceptions=True)
+
+        # 转交给其他进程的命令都已返回后再停止接收结果
+        if self._reply_task:
+            self._reply_task.cancel()
+            await asyncio.gather(self._reply_task, return_exceptions=True)
+            self._reply_task = None
+        if self._replies is not None:
+            try:
+                await self._replies.aclose()
+            except Exception as e:
+                print(f"⚠️  关闭命令回复订阅失败: {e}")
+            self._replies = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(HTTPException(status_code=503, detail="服务正在关闭, 请重试"))
+
+    async def create(self, game: PokerGame):
+        """保存新游戏; 游戏不归本进程所有时立即写回并移出本进程缓存, 由所属进程加载"""
+        await self.storage.save_game(game.game_id, game)
+        if not self.owns(game.game_id):
+            await self.storage.release(game.game_id)
+
+    async def call(self, game_id: str, name: str, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        在游戏的所属进程上执行命令并返回结果
+
+        Args:
+            game_id: 游戏 ID
+            name: 命令名称
+            timeout: 转发给其他进程时等待结果的秒数, 默认使用 GAME_COMMAND_TIMEOUT
+            **kwargs: 命令参数 (需可 JSON 序列化)
+
+        Raises:
+            HTTPException: 命令抛出的 HTTP 错误, 所属进程无响应 (503), 或重试后仍有版本冲突 (409)
+        """
+        if name not in self._commands:
+            raise ValueError(f"未注册的游戏命令: {name}")
+
+        owner = self._ring.owner(game_id)
+        if not self._redis or owner in (None, self.worker_id):
+            return await self.call_local(game_id, name, kwargs)
+        return await self._forward(owner, game_id, name, kwargs, timeout or settings.GAME_COMMAND_TIMEOUT)
+
+    async def call_local(self, game_id: str, name: str, kwargs: dict) -> Any:
+        """把命令放入本进程中该游戏 Actor 的队列 (没有时创建) 并等待结果"""
+        future = asyncio.get_running_loop().create_future()
+        self._dispatch(game_id, name, kwargs, future)
+        return await future
+
+    def _dispatch(self, game_id: str, name: str, kwargs: dict, future: asyncio.Future):
+        """把命令放入该游戏 Actor 的队列, 系统停止后直接以 503 结束"""
+        if self._stopping:
+            future.set_exception(HTTPException(status_code=503, detail="服务正在关闭, 请重试"))
+            return
+        actor = self._actors.get(game_id)
+        if actor is None:
+            actor = self._actors[game_id] = GameActor(self, game_id)
+        actor.queue.put_nowait((name, kwargs, future))
+
+    def _reroute(self, game_id: str, items: List[tuple]):
+        """
+        重新投递已停止的 Actor 中未执行的命令 [(名称, 参数, future), ...]
+
+        游戏仍归本进程所有时交给新的 Actor; 否则 (哈希环已变化) 先写回本进程缓存中的修改,
+        再按原顺序逐条转发给当前的所属进程, 同一游戏不会在两个进程中同时修改
+        """
+        owner = self._ring.owner(game_id)
+        if self._stopping or not self._redis or owner in (None, self.worker_id):
+            for item in items:
+                self._dispatch(game_id, *item)
+            return
+
+        async def forward():
+            await self.storage.release(game_id)
+            for name, kwargs, future in items:
+                try:
+                    result = await self._forward(owner, game_id, name, kwargs, settings.GAME_COMMAND_TIMEOUT)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+
+        task = asyncio.create_task(forward())
+        self._serving.add(task)
+        task.add_done_callback(self._serving.discard)
+
+    async def execute(self, game_id: str, name: str, kwargs: dict) -> Any:
+        """在游戏对象上执行命令 (由 Actor 调用)"""
+        command = self._commands[name]
+        if command.readonly:
+            game = await self.storage.load_game(game_id)
+            if game is None:
+                raise HTTPException(status_code=404, detail="游戏不存在")
+            return await command.func(game, **kwargs)
+
+        async def mutate(game: Optional[PokerGame]) -> tuple:
+            if game is None:
+                raise HTTPException(status_code=404, detail="游戏不存在")
+            if not self._listeners:
+                return await command.func(game, **kwargs), None
+            before = game.get_state()
+            result = await command.func(game, **kwargs)
+            ops = diff_state(before, game.get_state())
+            if not ops:
+                return result, None
+            game.state_seq += 1
+            return result, (game.state_seq, ops)
+
+        try:
+            result, change = await self.storage.mutate_game(game_id, mutate)
+        except GameConflictError:
+            raise HTTPException(status_code=409, detail="游戏状态已被其他请求修改, 请重试")
+
+        # 保存成功后再通知, 冲突重试的中间结果不会发出
+        if change is not None:
+            for listener in self._listeners:
+                try:
+                    await listener(game_id, *change)
+                except Exception as e:
+                    print(f"⚠️  状态变化回调失败: {e}")
+        return result
+
+    def _actor_done(self, actor: GameActor):
+        if self._actors.get(actor.game_id) is actor:
+            del self._actors[actor.game_id]
+
+    async def _forward(self, owner: str, game_id: str, name: str, kwargs: dict, timeout: float) -> Any:
+        """转发命令给所属进程并等待结果 (等待转发名额的时间计入超时)"""
+        try:
+            reply = await asyncio.wait_for(self._request(owner, game_id, name, kwargs), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail=f"游戏 {game_id} 所在的工作进程无响应")
+
+        if "error" in reply:
+            raise HTTPException(status_code=reply["error"]["status_code"], detail=reply["error"]["detail"])
+        return reply["result"]
+
+    async def _request(self, owner: str, game_id: str, name: str, kwargs: dict) -> dict:
+        """占用一个转发名额, 把命令放入所属进程的收件箱, 等待回复频道送回结果"""
+        async with self._forward_slots:
+            request_id = uuid.uuid4().hex
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            message = {
+                "game_id": game_id, "command": name, "kwargs": kwargs,
+                "reply_to": f"{_REPLY_PREFIX}{self.worker_id}", "request_id": request_id
+            }
+            try:
+                await self._redis.rpush(f"{_INBOX_PREFIX}{owner}", json.dumps(message))
+                return await future
+            finally:
+                self._pending.pop(request_id, None)
+
+    async def _reply_loop(self):
+        """接收转发命令的结果, 交给等待中的请求 (已超时的请求的结果丢弃)"""
+        while True:
+            try:
+                message = await self._replies.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  接收命令结果失败: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message and message["type"] == "message":
+                reply = json.loads(message["data"])
+                future = self._pending.get(reply.pop("request_id", None))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+
+    async def _inbox_loop(self):
+        """接收其他进程转发来的命令, 每条命令在单独的任务中等待执行结果"""
+        inbox = f"{_INBOX_PREFIX}{self.worker_id}"
+        while True:
+            try:
+                item = await self._redis.blpop([inbox], timeout=1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  读取转发命令失败: {e}")
+                await asyncio.sleep(1)
+                continue
+            if item:
+                task = asyncio.create_task(self._serve(json.loads(item[1])))
+                self._serving.add(task)
+                task.add_done_callback(self._serving.discard)
+
+    async def _serve(self, message: dict):
+        """执行转发来的命令并回传结果"""
+        try:
+            reply = {"result": await self.call_local(message["game_id"], message["command"], message["kwargs"])}
+        except HTTPException as e:
+            reply = {"error": {"status_code": e.status_code, "detail": e.detail}}
+        except Exception as e:
+            reply = {"error": {"status_code": 500, "detail": str(e)}}
+
+        reply["request_id"] = message["request_id"]
+        try:
+            await self._redis.publish(message["reply_to"], json.dumps(reply))
+        except Exception as e:
+            print(f"⚠️  回传命令结果失败: {e}")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  工作进程心跳失败: {e}")
+
+    async def _heartbeat(self):
+        """更新本进程心跳, 移除已下线的进程, 并按存活进程重建哈希环"""
+        now = time.time()
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(_WORKERS, {self.worker_id: now})
+            pipe.zremrangebyscore(_WORKERS, "-inf", now - self.heartbeat_interval * _HEARTBEAT_MISSES)
+            pipe.zrange(_WORKERS, 0, -1)
+            _, _, workers = await pipe.execute()
+
+        ring = HashRing(worker.decode() for worker in workers)
+        if ring.nodes != self._ring.nodes:
+            self._ring = ring
+            print(f"🔄 工作进程变化, 当前 {len(ring.nodes)} 个: {ring.nodes}")
+            await self._rebalance()
+
+    async def _rebalance(self):
+        """
+        哈希环变化后移交游戏
+
+        停止不再归本进程所有的游戏的 Actor, 并把没有 Actor 的缓存游戏写回后移出缓存,
+        避免本进程以后重新拥有这些游戏时使用过期的缓存
+        """
+        for game_id, actor in list(self._actors.items()):
+            if not self.owns(game_id):
+                actor.stop()
+        for game_id in self.storage.cached_game_ids():
+            if game_id not in self._actors or not self.owns(game_id):
+                await self.storage.release(game_id)
+
+
+# 全局实例 (应用启动时 start)
+game_actors = GameActorSystem()
@@ -0,0 +1,446 @@
+"""
+PokerGame 的紧凑二进制快照格式
+
+替代 pickle 保存游戏状态: 牌按单字节存储, 玩家为定长记录, 动作历史为定长数组.
+
+格式 (小端序):
+    头部: magic "PKG" | 版本 u8 | 标志 u8
+    核心: 小盲 | 大盲 | 底池 | 当前下注 | 当前玩家 i8 | 庄家 u8 | 状态 u8
+          | game_id (u8 长度 + UTF-8)
+          | 牌堆 (u8 张数 + 每张 1 字节) | 公共牌 (u8 张数 + 每张 1 字节)
+          | 玩家数 u8 + 玩家记录 x N
+    分段: 若干个 (标签 u8 | 长度 u32 | 内容), 读取时跳过未知标签
+
+筹码类数值全部为 0 ~ 2^32-1 的整数时 (绝大多数牌局) 以 u32 存储, 否则以 f64 存储;
+动作记录的 player_id 能由座位号还原时省略 (见标志位)
+
+新增字段以新分段的形式追加, 旧版本读取新数据时忽略即可 (向前兼容);
+不兼容的改动提升 FORMAT_VERSION, 并在 _MIGRATIONS 中登记从旧版本升级字段的函数.
+非本格式的数据视为旧版 pickle 快照, 由 _migrate_legacy_pickle 统一补齐缺失字段
+
+动作事件 (事件溯源存储): 单个动作记录编码为定长的
+    player_id i64 | 座位 u8 | 街<<4|动作 u8 | 金额 f64 | 动作后底池 f64
+replay_actions 在快照上按顺序重放动作事件, 还原之后的游戏状态
+"""
+import pickle
+import struct
+import time
+from typing import Callable, Dict, List
+
+from .poker import PokerGame, PlayerState, Deck, GameState, Card, cards_to_dicts
+
+MAGIC = b"PKG"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<3sBB")
+_SECTION = struct.Struct("<BI")
+_PLAYER_TYPE = struct.Struct("<q")
+_TIMESTAMP = struct.Struct("<d")
+_STATE_SEQ = struct.Struct("<Q")
+_HAND_NO = struct.Struct("<I")
+_EVENT = struct.Struct("<qBBdd")
+
+# 头部标志位
+_FLAG_INT_MONEY = 1      # 筹码类数值以 u32 存储
+_FLAG_ACTION_IDS = 2     # 动作记录带 player_id (无法由座位号还原时)
+
+_U32_LIMIT = 1 << 32
+
+
+def _make_structs(money: str, action_ids: bool) -> tuple:
+    """按数值宽度生成 (核心, 玩家记录, 动作记录, 获胜者记录) 的定长结构"""
+    m = money
+    return (
+        struct.Struct(f"<{m}{m}{m}{m}bBB"),
+        struct.Struct(f"<qB{m}BB{m}{m}B"),     # player_id, 座位, 筹码, 底牌 x2, 本轮下注, 总下注, 标志位
+        struct.Struct(f"<{'q' if action_ids else ''}BB{m}{m}"),  # [player_id], 座位, 街<<4|动作, 金额, 动作后底池
+        struct.Struct(f"<q{m}BB"),             # player_id, 奖金, 底牌 x2
+    )
+
+
+_STRUCTS = {
+    (money, action_ids): _make_structs(money, action_ids)
+    for money in ("I", "d") for action_ids in (False, True)
+}
+
+# 分段标签
+_SECTION_ACTIONS = 1
+_SECTION_WINNERS = 2
+_SECTION_PLAYER_TYPES = 3
+_SECTION_CREATED_AT = 4
+_SECTION_STATE_SEQ = 5
+_SECTION_HAND_NO = 6
+
+_NO_CARD = 0xFF
+
+# 玩家标志位
+_FLAG_ACTIVE = 1
+_FLAG_ALL_IN = 2
+_FLAG_HAS_ACTED = 4
+
+_STATES = list(GameState)
+_STATE_INDEX = {state: idx for idx, state in enumerate(_STATES)}
+_STREET_INDEX = {state.value: idx for idx, state in enumerate(_STATES)}
+_STREETS = [state.value for state in _STATES]
+
+ACTIONS = ["small_blind", "big_blind", "fold", "check", "call", "raise", "all_in"]
+_ACTION_INDEX = {action: idx for idx, action in enumerate(ACTIONS)}
+
+# 版本迁移: {旧版本: 把该版本解码出的字段升级到下一版本的函数}
+_MIGRATIONS: Dict[int, Callable[[dict], dict]] = {}
+
+
+class SnapshotError(ValueError):
+    """快照数据损坏或版本不受支持"""
+
+
+def _pack_str(text: str, length_format: str = "<B") -> bytes:
+    data = text.encode("utf-8")
+    return struct.pack(length_format, len(data)) + data
+
+
+def _hole_bytes(cards: List[int]) -> tuple:
+    return (cards[0] if len(cards) > 0 else _NO_CARD, cards[1] if len(cards) > 1 else _NO_CARD)
+
+
+def _hole_list(card1: int, card2: int) -> List[int]:
+    return [card for card in (card1, card2) if card != _NO_CARD]
+
+
+def _money_format(game: PokerGame) -> str:
+    """筹码类数值全部为 u32 范围内的整数时使用 u32, 否则使用 f64"""
+    values = [game.small_blind, game.big_blind, game.pot, game.current_bet]
+    for player in game.players:
+        values += (player.chips, player.current_bet, player.total_bet)
+    for record in game.action_history:
+        values += (record["amount"], record["pot_after"])
+    for winner in game.last_winners:
+        values.append(winner["winnings"])
+    if max(values) >= _U32_LIMIT or min(values) < 0:
+        return "d"
+    return "I" if all(value == int(value) for value in values) else "d"
+
+
+def _actions_need_ids(game: PokerGame) -> bool:
+    """动作记录的 player_id 能否由 (当前) 座位号还原"""
+    seats = {player.position: player.player_id for player in game.players}
+    return any(seats.get(record["position"]) != record["player_id"] for record in game.action_history)
+
+
+def encode_game(game: PokerGame) -> bytes:
+    """把游戏状态编码为二进制快照"""
+    money = _money_format(game)
+    action_ids = _actions_need_ids(game)
+    core, player_struct, action_struct, winner_struct = _STRUCTS[money, action_ids]
+    flags = (_FLAG_INT_MONEY if money == "I" else 0) | (_FLAG_ACTION_IDS if action_ids else 0)
+    to_money = int if money == "I" else float
+
+    parts = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION, flags),
+        core.pack(
+            to_money(game.small_blind), to_money(game.big_blind), to_money(game.pot), to_money(game.current_bet),
+            game.current_player_idx, game.dealer_idx, _STATE_INDEX[game.state]
+        ),
+        _pack_str(game.game_id),
+        bytes([len(game.deck.cards)]), bytes(game.deck.cards),
+        bytes([len(game.community_cards)]), bytes(game.community_cards),
+        bytes([len(game.players)]),
+    ]
+    for player in game.players:
+        player_flags = ((_FLAG_ACTIVE if player.is_active else 0)
+                        | (_FLAG_ALL_IN if player.is_all_in else 0)
+                        | (_FLAG_HAS_ACTED if player.has_acted else 0))
+        parts.append(player_struct.pack(
+            player.player_id, player.position, to_money(player.chips),
+            *_hole_bytes(player.hole_cards),
+            to_money(player.current_bet), to_money(player.total_bet), player_flags
+        ))
+
+    if game.action_history:
+        pack = action_struct.pack
+        rows = [
+            (record["position"],
+             _STREET_INDEX[record["street"]] << 4 | _ACTION_INDEX[record["action"]],
+             to_money(record["amount"]),
+             to_money(record["pot_after"]))
+            for record in game.action_history
+        ]
+        if action_ids:
+            actions = b"".join(
+                pack(record["player_id"], *row) for record, row in zip(game.action_history, rows)
+            )
+        else:
+            actions = b"".join([pack(*row) for row in rows])
+        parts.append(_SECTION.pack(_SECTION_ACTIONS, len(actions)) + actions)
+
+    if game.last_winners:
+        winners = bytearray([len(game.last_winners)])
+        for winner in game.last_winners:
+            hole_cards = [Card(c["suit"], c["rank"]).to_int() for c in winner.get("hole_cards", [])]
+            winners += winner_struct.pack(winner["player_id"], to_money(winner["winnings"]), *_hole_bytes(hole_cards))
+            winners += _pack_str(winner["hand_rank"])
+            winners += _pack_str(winner["hand_description"], "<H")
+        parts.append(_SECTION.pack(_SECTION_WINNERS, len(winners)) + winners)
+
+    # single-action 接口为玩家分配的 AI 类型
+    player_types = getattr(game, "_player_types", None)
+    if player_types:
+        types = bytearray([len(player_types)])
+        for player_id, player_type in player_types.items():
+            types += _PLAYER_TYPE.pack(player_id) + _pack_str(player_type)
+        parts.append(_SECTION.pack(_SECTION_PLAYER_TYPES, len(types)) + types)
+
+    parts.append(_SECTION.pack(_SECTION_CREATED_AT, _TIMESTAMP.size) + _TIMESTAMP.pack(game.created_at))
+    if game.state_seq:
+        parts.append(_SECTION.pack(_SECTION_STATE_SEQ, _STATE_SEQ.size) + _STATE_SEQ.pack(game.state_seq))
+    if game.hand_no:
+        parts.append(_SECTION.pack(_SECTION_HAND_NO, _HAND_NO.size) + _HAND_NO.pack(game.hand_no))
+
+    return b"".join(parts)
+
+
+def _decode_v1(view: memoryview, offset: int, flags: int) -> dict:
+    """解码版本 1 的字段 (整数筹码模式下筹码类数值还原为 int)"""
+    action_ids = bool(flags & _FLAG_ACTION_IDS)
+    core, player_struct, action_struct, winner_struct = \
+        _STRUCTS["I" if flags & _FLAG_INT_MONEY else "d", action_ids]
+
+    small_blind, big_blind, pot, current_bet, current_player_idx, dealer_idx, state = \
+        core.unpack_from(view, offset)
+    offset += core.size
+
+    length = view[offset]
+    game_id = bytes(view[offset + 1:offset + 1 + length]).decode("utf-8")
+    offset += 1 + length
+
+    length = view[offset]
+    deck = list(view[offset + 1:offset + 1 + length])
+    offset += 1 + length
+
+    length = view[offset]
+    community = list(view[offset + 1:offset + 1 + length])
+    offset += 1 + length
+
+    players = []
+    count = view[offset]
+    offset += 1
+    for _ in range(count):
+        player_id, position, chips, card1, card2, player_bet, total_bet, player_flags = \
+            player_struct.unpack_from(view, offset)
+        offset += player_struct.size
+        players.append(PlayerState(
+            player_id=player_id,
+            position=position,
+            chips=chips,
+            hole_cards=_hole_list(card1, card2),
+            current_bet=player_bet,
+            total_bet=total_bet,
+            is_active=bool(player_flags & _FLAG_ACTIVE),
+            is_all_in=bool(player_flags & _FLAG_ALL_IN),
+            has_acted=bool(player_flags & _FLAG_HAS_ACTED)
+        ))
+
+    fields = {
+        "game_id": game_id,
+        "small_blind": small_blind,
+        "big_blind": big_blind,
+        "pot": pot,
+        "current_bet": current_bet,
+        "current_player_idx": current_player_idx,
+        "dealer_idx": dealer_idx,
+        "state": _STATES[state],
+        "deck": deck,
+        "community_cards": community,
+        "players": players,
+        "action_history": [],
+        "last_winners": [],
+        "player_types": {},
+        "created_at": None,
+        "state_seq": 0,
+        "hand_no": 0,
+    }
+
+    # 分段
+    while offset < len(view):
+        tag, length = _SECTION.unpack_from(view, offset)
+        offset += _SECTION.size
+        section = view[offset:offset + length]
+        offset += length
+
+        if tag == _SECTION_ACTIONS:
+            if action_ids:
+                records = action_struct.iter_unpack(section)
+            else:
+                seats = {player.position: player.player_id for player in players}
+                records = ((seats[row[0]],) + row for row in action_struct.iter_unpack(section))
+            fields["action_history"] = [
+                {
+                    "player_id": player_id,
+                    "position": position,
+                    "street": _STREETS[code >> 4],
+                    "action": ACTIONS[code & 15],
+                    "amount": amount,
+                    "pot_after": pot_after
+                }
+                for player_id, position, code, amount, pot_after in records
+            ]
+        elif tag == _SECTION_WINNERS:
+            pos = 1
+            for _ in range(section[0]):
+                player_id, winnings, card1, card2 = winner_struct.unpack_from(section, pos)
+                pos += winner_struct.size
+                length = section[pos]
+                hand_rank = bytes(section[pos + 1:pos + 1 + length]).decode("utf-8")
+                pos += 1 + length
+                (length,) = struct.unpack_from("<H", section, pos)
+                description = bytes(section[pos + 2:pos + 2 + length]).decode("utf-8")
+                pos += 2 + length
+                fields["last_winners"].append({
+                    "player_id": player_id,
+                    "hand_description": description,
+                    "hand_rank": hand_rank,
+                    "winnings": winnings,
+                    "hole_cards": cards_to_dicts(_hole_list(card1, card2))
+                })
+        elif tag == _SECTION_PLAYER_TYPES:
+            pos = 1
+            for _ in range(section[0]):
+                (player_id,) = _PLAYER_TYPE.unpack_from(section, pos)
+                pos += _PLAYER_TYPE.size
+                length = section[pos]
+                fields["player_types"][player_id] = bytes(section[pos + 1:pos + 1 + length]).decode("utf-8")
+                pos += 1 + length
+        elif tag == _SECTION_CREATED_AT:
+            (fields["created_at"],) = _TIMESTAMP.unpack_from(section)
+        elif tag == _SECTION_STATE_SEQ:
+            (fields["state_seq"],) = _STATE_SEQ.unpack_from(section)
+        elif tag == _SECTION_HAND_NO:
+            (fields["hand_no"],) = _HAND_NO.unpack_from(section)
+        # 未知标签: 更新版本写入的新分段, 直接跳过
+
+    return fields
+
+
+_DECODERS = {1: _decode_v1}
+
+
+def _build_game(fields: dict) -> PokerGame:
+    deck = Deck()
+    deck.cards = fields["deck"]
+    game = PokerGame(
+        game_id=fields["game_id"],
+        small_blind=fields["small_blind"],
+        big_blind=fields["big_blind"],
+        deck=deck,
+        players=fields["players"],
+        community_cards=fields["community_cards"],
+        pot=fields["pot"],
+        current_bet=fields["current_bet"],
+        current_player_idx=fields["current_player_idx"],
+        dealer_idx=fields["dealer_idx"],
+        state=fields["state"],
+        last_winners=fields["last_winners"],
+        action_history=fields["action_history"]
+    )
+    if fields["player_types"]:
+        game._player_types = fields["player_types"]
+    if fields["created_at"] is not None:
+        game.created_at = fields["created_at"]
+    game.state_seq = fields["state_seq"]
+    game.hand_no = fields["hand_no"]
+    return game
+
+
+def _migrate_legacy_pickle(game: PokerGame) -> PokerGame:
+    """旧版 pickle 快照: 补齐后来新增的字段, Card 对象转换为整数牌"""
+    def to_int(cards):
+        return [c.to_int() if isinstance(c, Card) else c for c in cards]
+
+    defaults = {
+        "action_history": [], "last_winners": [], "hand_cache": {},
+        "created_at": time.time(), "state_seq": 0, "hand_no": 0
+    }
+    for name, value in defaults.items():
+        if name not in game.__dict__:
+            setattr(game, name, value)
+
+    game.deck.cards = to_int(game.deck.cards)
+    game.community_cards = to_int(game.community_cards)
+    for player in game.players:
+        player.hole_cards = to_int(player.hole_cards)
+    return game
+
+
+def decode_game(data: bytes) -> PokerGame:
+    """解码二进制快照 (兼容旧版 pickle 快照)"""
+    view = memoryview(data)
+    if len(view) < _HEADER.size or bytes(view[:3]) != MAGIC:
+        return _migrate_legacy_pickle(pickle.loads(data))
+
+    _, version, flags = _HEADER.unpack_from(view, 0)
+    if version > FORMAT_VERSION:
+        raise SnapshotError(f"快照版本 {version} 高于当前支持的版本 {FORMAT_VERSION}")
+    decoder = _DECODERS.get(version)
+    if decoder is None:
+        raise SnapshotError(f"不支持的快照版本: {version}")
+
+    try:
+        fields = decoder(view, _HEADER.size, flags)
+    except (struct.error, IndexError, KeyError, UnicodeDecodeError) as e:
+        raise SnapshotError(f"快照数据损坏: {e}")
+
+    while version < FORMAT_VERSION:
+        fields = _MIGRATIONS[version](fields)
+        version += 1
+
+    return _build_game(fields)
+
+
+def encode_action_event(record: dict) -> bytes:
+    """把一条动作记录 (action_history 中的元素) 编码为动作事件"""
+    return _EVENT.pack(
+        record["player_id"], record["position"],
+        _STREET_INDEX[record["street"]] << 4 | _ACTION_INDEX[record["action"]],
+        record["amount"], record["pot_after"]
+    )
+
+
+def decode_action_event(data: bytes) -> dict:
+    """解码动作事件 (金额为整数时还原为 int)"""
+    try:
+        player_id, position, code, amount, pot_after = _EVENT.unpack(data)
+        return {
+            "player_id": player_id,
+            "position": position,
+            "street": _STREETS[code >> 4],
+            "action": ACTIONS[code & 15],
+            "amount": int(amount) if amount.is_integer() else amount,
+            "pot_after": int(pot_after) if pot_after.is_integer() else pot_after
+        }
+    except (struct.error, IndexError) as e:
+        raise SnapshotError(f"动作事件损坏: {e}")
+
+
+def replay_actions(game: PokerGame, records: List[dict]) -> PokerGame:
+    """
+    在游戏快照上依次重放动作
+
+    动作记录中加注的金额是本次投入的筹码, 重放时换算回 player_action 的加注目标额.
+    重放结果与记录不一致 (底池不符) 时抛出 SnapshotError
+    """
+    verbose, game.verbose = game.verbose, False
+    try:
+        for record in records:
+            player = game._get_player(record["player_id"])
+            if player is None or record["street"] != game.state.value:
+                raise SnapshotError(f"动作事件与快照不符: {record}")
+            amount = player.current_bet + record["amount"] if record["action"] == "raise" else 0
+            try:
+                game.player_action(record["player_id"], record["action"], amount)
+            except ValueError as e:
+                raise SnapshotError(f"重放动作失败: {record}: {e}")
+            if game.pot != record["pot_after"]:
+                raise SnapshotError(f"重放后底池不符: {game.pot} != {record['pot_after']}")
+    finally:
+        game.verbose = verbose
+    return game
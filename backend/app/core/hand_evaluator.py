@@ -1,12 +1,17 @@
 """
 德州扑克牌型评估器
 实现完整的德州扑克牌型判断和大小比较
+
+输入为整数牌 (见 poker.py: card = suit * 13 + rank), 评估基于启动时预计算的查找表:
+- 非同花牌型只取决于点数多重集, 以 5 进制点数键 (每个点数最多 4 张) 查表
+- 同花/同花顺只取决于同花色牌的点数位图, 以 13 位掩码查表
+两张表直接给出可比较的整数强度, 单次评估只需一次遍历和一次查表
 """
 
 from typing import List, Tuple, Dict
-from collections import Counter
 from enum import IntEnum
-from .poker import Card
+import numpy as np
+from .poker import CARD_RANKS, CARD_SUITS, CARD_BITS
 
 
 class HandRank(IntEnum):
@@ -23,6 +28,172 @@ class HandRank(IntEnum):
     ROYAL_FLUSH = 10    # 皇家同花顺
 
 
+# 牌型中文名 (不含点数)
+HAND_RANK_NAMES = {
+    HandRank.HIGH_CARD: "高牌",
+    HandRank.ONE_PAIR: "一对",
+    HandRank.TWO_PAIR: "两对",
+    HandRank.THREE_OF_KIND: "三条",
+    HandRank.STRAIGHT: "顺子",
+    HandRank.FLUSH: "同花",
+    HandRank.FULL_HOUSE: "葫芦",
+    HandRank.FOUR_OF_KIND: "四条",
+    HandRank.STRAIGHT_FLUSH: "同花顺",
+    HandRank.ROYAL_FLUSH: "皇家同花顺",
+}
+
+
+# 强度编码: 牌型等级占高位, 5 个决定性点数各占 4 位
+# 整数大小关系与 (牌型等级, 决定性点数列表) 的字典序完全一致
+_RANK_SHIFT = 20
+
+# 点数键: 5 进制, 每个点数一位 (同一点数最多 4 张)
+_RANK_KEYS = [5 ** r for r in range(13)]
+
+# 花色键: 8 进制, 每个花色一位 (7 张牌内同一花色最多 7 张)
+_SUIT_KEYS = [8 ** s for s in range(4)]
+
+# 按整数牌预先展开的键, 评估时免去点数/花色拆分
+_CARD_RANK_KEYS = [_RANK_KEYS[rank] for rank in CARD_RANKS]
+_CARD_SUIT_KEYS = [_SUIT_KEYS[suit] for suit in CARD_SUITS]
+
+
+def _encode_strength(rank: HandRank, values: List[int]) -> int:
+    """将 (牌型等级, 决定性点数) 编码为单个整数强度"""
+    strength = int(rank)
+    for v in values:
+        strength = (strength << 4) | v
+    return strength
+
+
+def _straight_high(mask: int) -> int:
+    """返回点数位图中最大顺子的最高点 (2-14), A-2-3-4-5 返回 5, 无顺子返回 0"""
+    for high in range(12, 3, -1):
+        window = 0b11111 << (high - 4)
+        if mask & window == window:
+            return high + 2
+    if mask & 0b1000000001111 == 0b1000000001111:
+        return 5
+    return 0
+
+
+def _straight_values(high: int) -> List[int]:
+    """顺子的决定性点数"""
+    if high == 5:
+        return [5, 4, 3, 2, 1]
+    return [high, high - 1, high - 2, high - 3, high - 4]
+
+
+def _best_flush(mask: int) -> int:
+    """同一花色 5-7 张牌 (点数位图) 的最佳牌型强度"""
+    high = _straight_high(mask)
+    if high == 14:
+        return _encode_strength(HandRank.ROYAL_FLUSH, [14, 13, 12, 11, 10])
+    if high:
+        return _encode_strength(HandRank.STRAIGHT_FLUSH, _straight_values(high))
+    values = [r + 2 for r in range(12, -1, -1) if mask >> r & 1][:5]
+    return _encode_strength(HandRank.FLUSH, values)
+
+
+def _best_by_ranks(counts: List[int]) -> int:
+    """不考虑同花时, 点数多重集 (5-7 张) 的最佳牌型强度"""
+    # groups[n]: 恰好出现 n 次的点数 (2-14, 从大到小)
+    groups = [[], [], [], [], []]
+    desc = []
+    mask = 0
+    for r in range(12, -1, -1):
+        if counts[r]:
+            groups[counts[r]].append(r + 2)
+            desc.append(r + 2)
+            mask |= 1 << r
+    pairs, trips, quads = groups[2], groups[3], groups[4]
+
+    if quads:
+        kicker = next(v for v in desc if v != quads[0])
+        return _encode_strength(HandRank.FOUR_OF_KIND, [quads[0]] * 4 + [kicker])
+
+    if trips and (len(trips) > 1 or pairs):
+        pair = max(trips[1:] + pairs)
+        return _encode_strength(HandRank.FULL_HOUSE, [trips[0]] * 3 + [pair] * 2)
+
+    high = _straight_high(mask)
+    if high:
+        return _encode_strength(HandRank.STRAIGHT, _straight_values(high))
+
+    if trips:
+        kickers = [v for v in desc if v != trips[0]][:2]
+        return _encode_strength(HandRank.THREE_OF_KIND, [trips[0]] * 3 + kickers)
+
+    if len(pairs) >= 2:
+        kicker = next(v for v in desc if v != pairs[0] and v != pairs[1])
+        return _encode_strength(
+            HandRank.TWO_PAIR, [pairs[0], pairs[0], pairs[1], pairs[1], kicker]
+        )
+
+    if pairs:
+        kickers = [v for v in desc if v != pairs[0]][:3]
+        return _encode_strength(HandRank.ONE_PAIR, [pairs[0]] * 2 + kickers)
+
+    return _encode_strength(HandRank.HIGH_CARD, desc[:5])
+
+
+def _build_rank_table() -> Dict[int, int]:
+    """点数键 -> 强度, 覆盖所有 5/6/7 张牌的点数多重集"""
+    table = {}
+    counts = [0] * 13
+
+    def fill(rank: int, remaining: int, key: int):
+        if rank == 13:
+            if remaining <= 2:
+                table[key] = _best_by_ranks(counts)
+            return
+        for n in range(min(4, remaining) + 1):
+            counts[rank] = n
+            fill(rank + 1, remaining - n, key + n * _RANK_KEYS[rank])
+        counts[rank] = 0
+
+    fill(0, 7, 0)
+    return table
+
+
+def _build_flush_table() -> List[int]:
+    """同花色点数位图 -> 强度 (不足 5 张的位图为 0)"""
+    return [
+        _best_flush(mask) if bin(mask).count("1") >= 5 else 0
+        for mask in range(1 << 13)
+    ]
+
+
+def _build_flush_suit_table() -> List[int]:
+    """花色键 -> 达到 5 张的花色 (没有同花为 -1)"""
+    table = []
+    for key in range(8 ** 4):
+        flush_suit = -1
+        for suit in range(4):
+            if (key >> (3 * suit)) & 7 >= 5:
+                flush_suit = suit
+        table.append(flush_suit)
+    return table
+
+
+_RANK_TABLE = _build_rank_table()
+_FLUSH_TABLE = _build_flush_table()
+_FLUSH_SUIT_TABLE = _build_flush_suit_table()
+
+# 批量评估使用的 NumPy 版本查找表
+# 点数键空间过大无法直接索引, 改为在有序键数组上二分查找
+_NP_CARD_RANK_KEYS = np.array(_CARD_RANK_KEYS, dtype=np.int64)
+_NP_CARD_SUIT_KEYS = np.array(_CARD_SUIT_KEYS, dtype=np.int64)
+_NP_CARD_BITS = np.array(CARD_BITS, dtype=np.uint64)
+_NP_RANK_KEYS = np.array(sorted(_RANK_TABLE), dtype=np.int64)
+_NP_RANK_STRENGTHS = np.array([_RANK_TABLE[k] for k in _NP_RANK_KEYS.tolist()], dtype=np.int32)
+_NP_FLUSH_TABLE = np.array(_FLUSH_TABLE, dtype=np.int32)
+_NP_FLUSH_SUIT_TABLE = np.array(_FLUSH_SUIT_TABLE, dtype=np.int8)
+
+# 批量评估每块的行数, 限制中间数组的内存占用
+_BATCH_CHUNK = 1 << 18
+
+
 class HandEvaluator:
     """德州扑克手牌评估器"""
 
@@ -33,139 +204,168 @@ class HandEvaluator:
     }
 
     @staticmethod
-    def evaluate_hand(hole_cards: List[Card], community_cards: List[Card]) -> Tuple[HandRank, List[int]]:
+    def evaluate_strength(cards: List[int]) -> int:
         """
-        评估最佳手牌
+        评估 5-7 张牌的最佳牌型强度
 
         Args:
-            hole_cards: 玩家底牌（2张）
-            community_cards: 公共牌（3-5张）
+            cards: 所有可用的整数牌（5-7张）
 
         Returns:
-            (牌型等级, 决定性点数列表)
-            例如: (HandRank.TWO_PAIR, [13, 13, 8, 8, 7]) 表示KK88带7
-        """
-        # 合并所有可用的牌
-        all_cards = hole_cards + community_cards
+            可直接比较大小的整数强度（越大越强，相等即平局）
 
-        if len(all_cards) < 5:
-            raise ValueError("至少需要5张牌才能评估手牌")
+        Raises:
+            ValueError: 有重复的牌或牌不在 0-51 之间
+        """
+        rank_key = 0
+        suit_key = 0
+        mask = 0
+        try:
+            for card in cards:
+                # 负数会被当作从末尾取的下标, 须显式检查
+                if not 0 <= card < 52:
+                    raise ValueError("手牌中存在无效或重复的牌")
+                rank_key += _CARD_RANK_KEYS[card]
+                suit_key += _CARD_SUIT_KEYS[card]
+                mask |= CARD_BITS[card]
+        except (IndexError, TypeError):
+            raise ValueError("手牌中存在无效或重复的牌")
+        # 重复的牌在位图中只占一位
+        if mask.bit_count() != len(cards):
+            raise ValueError("手牌中存在无效或重复的牌")
+
+        flush_suit = _FLUSH_SUIT_TABLE[suit_key]
+        if flush_suit < 0:
+            return _RANK_TABLE[rank_key]
+
+        # 7 张牌内出现同花时不可能再组成四条或葫芦, 同花表结果即最终牌型
+        return _FLUSH_TABLE[(mask >> (13 * flush_suit)) & 0x1FFF]
 
-        # 从所有牌中找出最佳的5张牌组合
-        best_rank = HandRank.HIGH_CARD
-        best_values = []
+    @staticmethod
+    def partial_keys(cards: List[int], keys: Tuple[int, int, int] = (0, 0, 0)) -> Tuple[int, int, int]:
+        """
+        在已有的部分状态上累加牌的查表键
 
-        # 如果是7张牌，需要遍历所有C(7,5)=21种组合
-        # 简化处理：直接评估所有7张牌中最强的组合
-        from itertools import combinations
+        查表键 (点数键, 花色键, 位图) 对牌是可加的, 新发一张公共牌时
+        只需在上一条街的结果上累加, 无需从头计算
 
-        for five_cards in combinations(all_cards, 5):
-            rank, values = HandEvaluator._evaluate_five_cards(list(five_cards))
+        Args:
+            cards: 新加入的整数牌
+            keys: 之前累加的 (点数键, 花色键, 位图)
 
-            # 比较并保留最佳组合
-            if rank > best_rank or (rank == best_rank and values > best_values):
-                best_rank = rank
-                best_values = values
+        Returns:
+            新的 (点数键, 花色键, 位图)
+        """
+        rank_key, suit_key, mask = keys
+        for card in cards:
+            rank_key += _CARD_RANK_KEYS[card]
+            suit_key += _CARD_SUIT_KEYS[card]
+            mask |= CARD_BITS[card]
+        return rank_key, suit_key, mask
 
-        return best_rank, best_values
+    @staticmethod
+    def strength_from_keys(keys: Tuple[int, int, int]) -> int:
+        """由 5-7 张牌累加的查表键得到牌型强度 (结果与 evaluate_strength 一致)"""
+        rank_key, suit_key, mask = keys
+        flush_suit = _FLUSH_SUIT_TABLE[suit_key]
+        if flush_suit < 0:
+            return _RANK_TABLE[rank_key]
+        return _FLUSH_TABLE[(mask >> (13 * flush_suit)) & 0x1FFF]
 
     @staticmethod
-    def _evaluate_five_cards(cards: List[Card]) -> Tuple[HandRank, List[int]]:
-        """评估固定5张牌的牌型"""
-
-        # 获取点数和花色
-        ranks = [card.value for card in cards]  # card.value 返回 2-14
-        suits = [card.suit for card in cards]
-
-        # 排序（从大到小）
-        ranks_sorted = sorted(ranks, reverse=True)
-
-        # 统计每个点数出现的次数
-        rank_counts = Counter(ranks)
-        count_values = sorted(rank_counts.items(), key=lambda x: (x[1], x[0]), reverse=True)
-
-        # 检查是否同花
-        is_flush = len(set(suits)) == 1
-
-        # 检查是否顺子
-        is_straight, straight_high = HandEvaluator._check_straight(ranks_sorted)
-
-        # 判断牌型
-
-        # 皇家同花顺 (Royal Flush)
-        if is_flush and is_straight and straight_high == 14:
-            return HandRank.ROYAL_FLUSH, [14, 13, 12, 11, 10]
-
-        # 同花顺 (Straight Flush)
-        if is_flush and is_straight:
-            if straight_high == 5:  # A-2-3-4-5 的特殊情况
-                return HandRank.STRAIGHT_FLUSH, [5, 4, 3, 2, 1]
-            return HandRank.STRAIGHT_FLUSH, [straight_high, straight_high-1, straight_high-2, straight_high-3, straight_high-4]
-
-        # 四条 (Four of a Kind)
-        if count_values[0][1] == 4:
-            four_rank = count_values[0][0]
-            kicker = count_values[1][0]
-            return HandRank.FOUR_OF_KIND, [four_rank] * 4 + [kicker]
-
-        # 葫芦 (Full House)
-        if count_values[0][1] == 3 and count_values[1][1] == 2:
-            three_rank = count_values[0][0]
-            pair_rank = count_values[1][0]
-            return HandRank.FULL_HOUSE, [three_rank] * 3 + [pair_rank] * 2
-
-        # 同花 (Flush)
-        if is_flush:
-            return HandRank.FLUSH, ranks_sorted
-
-        # 顺子 (Straight)
-        if is_straight:
-            if straight_high == 5:  # A-2-3-4-5
-                return HandRank.STRAIGHT, [5, 4, 3, 2, 1]
-            return HandRank.STRAIGHT, [straight_high, straight_high-1, straight_high-2, straight_high-3, straight_high-4]
-
-        # 三条 (Three of a Kind)
-        if count_values[0][1] == 3:
-            three_rank = count_values[0][0]
-            kickers = sorted([count_values[1][0], count_values[2][0]], reverse=True)
-            return HandRank.THREE_OF_KIND, [three_rank] * 3 + kickers
-
-        # 两对 (Two Pair)
-        if count_values[0][1] == 2 and count_values[1][1] == 2:
-            pair1 = max(count_values[0][0], count_values[1][0])
-            pair2 = min(count_values[0][0], count_values[1][0])
-            kicker = count_values[2][0]
-            return HandRank.TWO_PAIR, [pair1, pair1, pair2, pair2, kicker]
-
-        # 一对 (One Pair)
-        if count_values[0][1] == 2:
-            pair_rank = count_values[0][0]
-            kickers = sorted([count_values[1][0], count_values[2][0], count_values[3][0]], reverse=True)
-            return HandRank.ONE_PAIR, [pair_rank, pair_rank] + kickers
-
-        # 高牌 (High Card)
-        return HandRank.HIGH_CARD, ranks_sorted
+    def decode_strength(strength: int) -> Tuple[HandRank, List[int]]:
+        """将整数强度还原为 (牌型等级, 决定性点数列表)"""
+        return HandRank(strength >> _RANK_SHIFT), [
+            (strength >> 16) & 15,
+            (strength >> 12) & 15,
+            (strength >> 8) & 15,
+            (strength >> 4) & 15,
+            strength & 15,
+        ]
 
     @staticmethod
-    def _check_straight(ranks: List[int]) -> Tuple[bool, int]:
+    def evaluate_hand(hole_cards: List[int], community_cards: List[int]) -> Tuple[HandRank, List[int]]:
         """
-        检查是否是顺子
+        评估最佳手牌
+
+        Args:
+            hole_cards: 玩家底牌（2张整数牌）
+            community_cards: 公共牌（3-5张整数牌）
 
         Returns:
-            (是否顺子, 顺子最高点)
+            (牌型等级, 决定性点数列表)
+            例如: (HandRank.TWO_PAIR, [13, 13, 8, 8, 7]) 表示KK88带7
+        """
+        all_cards = hole_cards + community_cards
+
+        if len(all_cards) < 5:
+            raise ValueError("至少需要5张牌才能评估手牌")
+        if len(all_cards) > 7:
+            raise ValueError("最多只能评估7张牌")
+
+        return HandEvaluator.decode_strength(HandEvaluator.evaluate_strength(all_cards))
+
+    @staticmethod
+    def evaluate_batch(hole_cards_array: np.ndarray, boards_array: np.ndarray) -> np.ndarray:
         """
-        sorted_ranks = sorted(set(ranks), reverse=True)
+        批量评估 (底牌, 公共牌) 的牌型强度
 
-        # 常规顺子检查
-        if len(sorted_ranks) == 5:
-            if sorted_ranks[0] - sorted_ranks[4] == 4:
-                return True, sorted_ranks[0]
+        Args:
+            hole_cards_array: 形状 (N, 2) 的整数牌数组 (int8)
+            boards_array: 形状 (N, 3-5) 的公共牌数组, 或形状 (3-5,) 的单个公共牌组 (对所有底牌共用)
 
-        # 特殊情况：A-2-3-4-5 (轮子/自行车)
-        if sorted_ranks == [14, 5, 4, 3, 2]:
-            return True, 5  # A在这里作为1，所以最高点是5
+        Returns:
+            形状 (N,) 的 int32 强度数组, 与 evaluate_strength 的结果一致
+        """
+        holes = np.asarray(hole_cards_array, dtype=np.intp)
+        boards = np.asarray(boards_array, dtype=np.intp)
+        if holes.ndim != 2:
+            raise ValueError("底牌数组形状必须为 (N, 2)")
+        if boards.ndim == 1:
+            boards = np.broadcast_to(boards, (holes.shape[0], boards.shape[0]))
+        if boards.ndim != 2 or boards.shape[0] != holes.shape[0]:
+            raise ValueError("公共牌数组与底牌数组的行数不一致")
+        if not 5 <= holes.shape[1] + boards.shape[1] <= 7:
+            raise ValueError("每手牌需要5-7张牌")
+
+        strengths = np.empty(holes.shape[0], dtype=np.int32)
+        for start in range(0, holes.shape[0], _BATCH_CHUNK):
+            end = start + _BATCH_CHUNK
+            cards = np.concatenate([holes[start:end], boards[start:end]], axis=1)
+            strengths[start:end] = HandEvaluator._evaluate_cards_array(cards)
+        return strengths
+
+    @staticmethod
+    def _evaluate_cards_array(cards: np.ndarray) -> np.ndarray:
+        """评估形状 (N, 5-7) 的整数牌数组"""
+        if cards.size and (cards.min() < 0 or cards.max() > 51):
+            raise ValueError("整数牌必须在 0-51 之间")
+        if (np.diff(np.sort(cards, axis=1), axis=1) == 0).any():
+            raise ValueError("手牌中存在无效或重复的牌")
+
+        rank_keys = _NP_CARD_RANK_KEYS[cards].sum(axis=1)
+        suit_keys = _NP_CARD_SUIT_KEYS[cards].sum(axis=1)
+
+        idx = np.searchsorted(_NP_RANK_KEYS, rank_keys)
+        np.minimum(idx, len(_NP_RANK_KEYS) - 1, out=idx)
+        if not np.array_equal(_NP_RANK_KEYS[idx], rank_keys):
+            raise ValueError("手牌中存在无效或重复的牌")
+        strengths = _NP_RANK_STRENGTHS[idx]
+
+        flush_suits = _NP_FLUSH_SUIT_TABLE[suit_keys]
+        flush_rows = np.flatnonzero(flush_suits >= 0)
+        if flush_rows.size:
+            masks = np.bitwise_or.reduce(_NP_CARD_BITS[cards[flush_rows]], axis=1)
+            shifts = flush_suits[flush_rows].astype(np.uint64) * np.uint64(13)
+            suit_masks = (masks >> shifts) & np.uint64(0x1FFF)
+            strengths[flush_rows] = _NP_FLUSH_TABLE[suit_masks.astype(np.intp)]
+
+        return strengths
 
-        return False, 0
+    @staticmethod
+    def batch_hand_ranks(strengths: np.ndarray) -> np.ndarray:
+        """由批量强度数组取出牌型等级 (HandRank 的数值)"""
+        return np.asarray(strengths) >> _RANK_SHIFT
 
     @staticmethod
     def compare_hands(hand1: Tuple[HandRank, List[int]],
@@ -0,0 +1,75 @@
+"""进程内运行指标
+
+计数器与耗时统计只在当前工作进程内累计, 通过 GET /metrics 查看;
+多工作进程部署时由监控系统分别采集各进程后汇总
+"""
+import time
+from collections import defaultdict
+from typing import Dict
+
+
+class Timing:
+    """耗时统计: 次数、总和与最大值 (秒)"""
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000
+        }
+
+
+class Metrics:
+    """计数器与耗时统计"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Timing] = defaultdict(Timing)
+
+    def inc(self, name: str, value: float = 1):
+        """计数器加 value"""
+        self._counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        """记录一次耗时"""
+        self._timings[name].observe(seconds)
+
+    def get(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def rate(self, numerator: str, *denominators: str) -> float:
+        """计数器 numerator 与若干计数器之和的比值 (分母为 0 时为 0)"""
+        total = sum(self.get(name) for name in denominators)
+        return self.get(numerator) / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime": time.time() - self.started_at,
+            "counters": dict(self._counters),
+            "timings": {name: timing.to_dict() for name, timing in self._timings.items()},
+            "rates": {
+                # 保存尝试中因版本号不符被拒绝的比例
+                "game_save_conflict_rate": self.rate("game_save_conflicts", "game_saves", "game_save_conflicts"),
+                # 平均每次修改的重试次数
+                "game_mutation_retry_rate": self.rate("game_mutation_retries", "game_mutations")
+            }
+        }
+
+    def reset(self):
+        self.__init__()
+
+
+# 全局实例
+metrics = Metrics()
@@ -0,0 +1,77 @@
+"""
+MessagePack 响应编码 (内容协商)
+
+REST: 请求头 Accept 含 application/msgpack 时, 使用 NegotiatedRoute 的路由以 MessagePack 返回;
+WebSocket: 连接时带 ?encoding=msgpack, 服务端推送的消息以二进制帧发送 (客户端发来的控制消息仍为 JSON).
+
+编码前把牌的 API 表示 ({"suit", "rank", "display"} 三键字典) 压缩为单字节整数 suit * 13 + rank,
+其余结构与 JSON 响应相同. 错误响应 (HTTPException) 仍为 JSON
+"""
+from contextvars import ContextVar
+from typing import Any, Callable
+
+import msgpack
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from .poker import make_card
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+_CARD_KEYS = frozenset(("suit", "rank", "display"))
+
+# 当前请求是否要求 MessagePack 响应 (由 NegotiatedRoute 设置)
+_use_msgpack: ContextVar[bool] = ContextVar("use_msgpack", default=False)
+
+
+def compact(obj: Any) -> Any:
+    """把牌字典替换为整数牌 (递归)"""
+    if isinstance(obj, dict):
+        if obj.keys() == _CARD_KEYS:
+            return make_card(obj["suit"], obj["rank"])
+        return {key: compact(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [compact(item) for item in obj]
+    return obj
+
+
+def packb(obj: Any) -> bytes:
+    """编码为 MessagePack (牌为整数)"""
+    return msgpack.packb(compact(obj))
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Accept 请求头是否要求 MessagePack"""
+    return MSGPACK_MEDIA_TYPE in accept or "application/x-msgpack" in accept
+
+
+class NegotiatedResponse(JSONResponse):
+    """按内容协商结果以 JSON 或 MessagePack 编码的响应"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 编码取决于 Accept 请求头, 缓存须按该请求头区分
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if _use_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return packb(content)
+        return super().render(content)
+
+
+class NegotiatedRoute(APIRoute):
+    """在处理请求前记录客户端是否接受 MessagePack, 供 NegotiatedResponse 使用"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            token = _use_msgpack.set(wants_msgpack(request.headers.get("accept", "")))
+            try:
+                return await handler(request)
+            finally:
+                _use_msgpack.reset(token)
+
+        return route_handler
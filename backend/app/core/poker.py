@@ -1,5 +1,6 @@
 """德州扑克核心逻辑"""
 import random
+import time
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
@@ -15,11 +16,21 @@ class Suit(Enum):
 
 SUIT_SYMBOLS = ['♠', '♥', '♦', '♣']
 RANK_SYMBOLS = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
+SUIT_LETTERS = ['s', 'h', 'd', 'c']
+
+
+# 引擎内部统一使用整数表示一张牌: card = suit * 13 + rank (0-51)
+# 与 Deck 的初始顺序一致; Card 对象只在 API 边界用于 to_dict()
+CARD_RANKS = [card % 13 for card in range(52)]       # 点数 0-12 (2-A)
+CARD_SUITS = [card // 13 for card in range(52)]      # 花色 0-3
+CARD_VALUES = [rank + 2 for rank in CARD_RANKS]      # 牌面值 2-14
+CARD_BITS = [1 << card for card in range(52)]        # 整手牌位图中的位 (每种花色 13 位)
+CARD_RANK_BITS = [1 << rank for rank in CARD_RANKS]  # 点数位图中的位
 
 
 @dataclass
 class Card:
-    """扑克牌"""
+    """扑克牌（API 边界使用, 引擎内部使用整数牌）"""
     suit: int  # 0-3
     rank: int  # 0-12 (2-A)
 
@@ -38,27 +49,67 @@ class Card:
         """牌面值 (2-14)"""
         return self.rank + 2
 
+    def to_int(self) -> int:
+        """转换为整数牌"""
+        return self.suit * 13 + self.rank
+
+    @classmethod
+    def from_int(cls, card: int) -> "Card":
+        """由整数牌构造"""
+        return cls(CARD_SUITS[card], CARD_RANKS[card])
+
+
+def make_card(suit: int, rank: int) -> int:
+    """由花色和点数构造整数牌"""
+    return suit * 13 + rank
+
+
+def card_to_str(card: int) -> str:
+    """整数牌的显示字符串, 如 'A♠'"""
+    return f"{RANK_SYMBOLS[CARD_RANKS[card]]}{SUIT_SYMBOLS[CARD_SUITS[card]]}"
+
+
+def card_to_dict(card: int) -> dict:
+    """整数牌转换为 API 响应格式"""
+    return Card.from_int(card).to_dict()
+
+
+def cards_to_dicts(cards: List[int]) -> List[dict]:
+    """整数牌列表转换为 API 响应格式"""
+    return [Card.from_int(card).to_dict() for card in cards]
+
+
+def parse_card(text: str) -> int:
+    """解析牌的文本表示, 如 'As', 'Td', '9c' (花色 s/h/d/c)"""
+    if len(text) != 2 or text[0].upper() not in RANK_SYMBOLS or text[1].lower() not in SUIT_LETTERS:
+        raise ValueError(f"无法识别的牌: {text}")
+    return make_card(SUIT_LETTERS.index(text[1].lower()), RANK_SYMBOLS.index(text[0].upper()))
+
+
+def hand_mask(cards: List[int]) -> int:
+    """整数牌列表的 52 位位图表示"""
+    mask = 0
+    for card in cards:
+        mask |= CARD_BITS[card]
+    return mask
+
 
 class Deck:
-    """牌堆"""
+    """牌堆（整数牌）"""
 
     def __init__(self):
-        self.cards: List[Card] = []
+        self.cards: List[int] = []
         self.reset()
 
     def reset(self):
         """重置牌堆"""
-        self.cards = [
-            Card(suit, rank)
-            for suit in range(4)
-            for rank in range(13)
-        ]
+        self.cards = list(range(52))
 
-    def shuffle(self):
-        """洗牌"""
-        random.shuffle(self.cards)
+    def shuffle(self, rng: Optional[random.Random] = None):
+        """洗牌 (可传入独立的随机数生成器以复现牌序)"""
+        (rng or random).shuffle(self.cards)
 
-    def deal(self, n: int = 1) -> List[Card]:
+    def deal(self, n: int = 1) -> List[int]:
         """发牌"""
         if len(self.cards) < n:
             raise ValueError("牌堆牌数不足")
@@ -78,7 +129,7 @@ class PlayerState:
     player_id: int
     position: int
     chips: float
-    hole_cards: List[Card] = field(default_factory=list)
+    hole_cards: List[int] = field(default_factory=list)
     current_bet: float = 0
     total_bet: float = 0
     is_active: bool = True
@@ -105,7 +156,7 @@ class PokerGame:
     big_blind: float = 2.0
     deck: Deck = field(default_factory=Deck)
     players: List[PlayerState] = field(default_factory=list)
-    community_cards: List[Card] = field(default_factory=list)
+    community_cards: List[int] = field(default_factory=list)
     pot: float = 0
     current_bet: float = 0
     current_player_idx: int = 0
@@ -113,6 +164,11 @@ class PokerGame:
     state: GameState = GameState.WAITING
     last_winners: List[dict] = field(default_factory=list)  # 存储上一手牌的获胜者信息
     action_history: List[dict] = field(default_factory=list)  # 记录所有玩家动作
+    hand_cache: Dict[int, tuple] = field(default_factory=dict, repr=False)  # 每名玩家的增量牌型评估缓存
+    verbose: bool = True  # 是否打印调试日志 (无头模拟时关闭)
+    created_at: float = field(default_factory=time.time)  # 创建时间 (Unix 时间戳)
+    state_seq: int = 0  # 状态序号, 每次修改游戏的命令加一 (WebSocket 增量协议)
+    hand_no: int = 0  # 手牌序号, 每开始一手牌加一 (手牌记录按 game_id + hand_no 幂等写入)
 
     def add_player(self, player_id: int, chips: float = 1000) -> PlayerState:
         """添加玩家"""
@@ -125,12 +181,18 @@ class PokerGame:
         self.players.append(player)
         return player
 
-    def start_hand(self):
-        """开始一手牌"""
+    def start_hand(self, rng: Optional[random.Random] = None):
+        """
+        开始一手牌
+
+        Args:
+            rng: 洗牌使用的随机数生成器（模拟时传入以复现牌局）, 默认使用全局随机
+        """
         # 移除没有筹码的玩家
         players_to_remove = [p for p in self.players if p.chips <= 0]
         for player in players_to_remove:
-            print(f"[StartHand] Removing player {player.player_id} (no chips)")
+            if self.verbose:
+                print(f"[StartHand] Removing player {player.player_id} (no chips)")
             self.players.remove(player)
 
         # 重新分配位置
@@ -145,13 +207,15 @@ class PokerGame:
             self.dealer_idx = 0
 
         # 重置状态
+        self.hand_no += 1
         self.deck.reset()
-        self.deck.shuffle()
+        self.deck.shuffle(rng)
         self.community_cards = []
         self.pot = 0
         self.current_bet = 0
         self.last_winners = []  # 清空上一手牌的获胜者信息
         self.action_history = []  # 清空动作历史
+        self.hand_cache = {}  # 底牌变化, 清空牌型缓存
 
         # 重置玩家状态
         for player in self.players:
@@ -215,7 +279,7 @@ class PokerGame:
         # 从大盲注后一位开始行动
         self.current_player_idx = (bb_idx + 1) % len(self.players)
 
-    def deal_flop(self) -> List[Card]:
+    def deal_flop(self) -> List[int]:
         """发翻牌"""
         if self.state != GameState.PREFLOP:
             raise ValueError("当前不是翻牌前阶段")
@@ -227,7 +291,7 @@ class PokerGame:
         self._reset_betting_round()
         return flop
 
-    def deal_turn(self) -> Card:
+    def deal_turn(self) -> int:
         """发转牌"""
         if self.state != GameState.FLOP:
             raise ValueError("当前不是翻牌阶段")
@@ -239,7 +303,7 @@ class PokerGame:
         self._reset_betting_round()
         return turn
 
-    def deal_river(self) -> Card:
+    def deal_river(self) -> int:
         """发河牌"""
         if self.state != GameState.TURN:
             raise ValueError("当前不是转牌阶段")
@@ -258,9 +322,10 @@ class PokerGame:
             player.current_bet = 0
             player.has_acted = False
 
-        # 从庄家后第一个活跃玩家开始
+        # 从庄家后第一个活跃且未 all-in 的玩家开始 (all-in 玩家无法行动)
         self.current_player_idx = (self.dealer_idx + 1) % len(self.players)
-        while not self.players[self.current_player_idx].is_active:
+        while (not self.players[self.current_player_idx].is_active
+               or self.players[self.current_player_idx].is_all_in):
             self.current_player_idx = (self.current_player_idx + 1) % len(self.players)
 
     def player_action(self, player_id: int, action: str, amount: float = 0) -> dict:
@@ -340,11 +405,14 @@ class PokerGame:
             "pot_after": self.pot
         }
         self.action_history.append(action_record)
-        print(f"[Action] Recorded: {action_record}")
+        if self.verbose:
+            print(f"[Action] Recorded: {action_record}")
 
-        print(f"[Action] Player {player_id} {action} completed, calling _next_player()")
+        if self.verbose:
+            print(f"[Action] Player {player_id} {action} completed, calling _next_player()")
         self._next_player()
-        print(f"[Action] _next_player() returned, current_player_idx now: {self.current_player_idx}")
+        if self.verbose:
+            print(f"[Action] _next_player() returned, current_player_idx now: {self.current_player_idx}")
 
         return result
 
@@ -355,6 +423,10 @@ class PokerGame:
                 return player
         return None
 
+    def active_opponents(self, player: PlayerState) -> int:
+        """仍在这手牌中 (未弃牌, 含全下) 的对手数"""
+        return sum(1 for p in self.players if p.is_active and p is not player)
+
     def get_current_player(self) -> Optional[PlayerState]:
         """获取当前应该行动的玩家"""
         if not self.players:
@@ -383,17 +455,20 @@ class PokerGame:
                 return player
 
         # 如果当前玩家不需要行动，说明下注轮已结束
-        print(f"[GetCurrent] Player at current_player_idx={self.current_player_idx} doesn't need to act")
+        if self.verbose:
+            print(f"[GetCurrent] Player at current_player_idx={self.current_player_idx} doesn't need to act")
         return None
 
     def _next_player(self):
         """移动到下一个玩家"""
-        print(f"[Next] Called from position {self.current_player_idx}, state: {self.state.value}")
+        if self.verbose:
+            print(f"[Next] Called from position {self.current_player_idx}, state: {self.state.value}")
 
         # 首先检查是否只剩一个或零个活跃玩家
         active_players = [p for p in self.players if p.is_active and not p.is_all_in]
         if len(active_players) <= 1:
-            print(f"[Next] Only {len(active_players)} active player(s) remaining, advancing state immediately")
+            if self.verbose:
+                print(f"[Next] Only {len(active_players)} active player(s) remaining, advancing state immediately")
             self._advance_state()
             return
 
@@ -403,20 +478,24 @@ class PokerGame:
             # 玩家需要行动：活跃、未all-in、且(未行动过 或 需要跟注)
             if player.is_active and not player.is_all_in:
                 if not player.has_acted or player.current_bet < self.current_bet:
-                    print(f"[Next] Moving to player {player.player_id} (position {self.current_player_idx})")
+                    if self.verbose:
+                        print(f"[Next] Moving to player {player.player_id} (position {self.current_player_idx})")
                     return
 
         # 检查是否进入下一阶段
-        print(f"[Next] No next player found, checking if betting round complete...")
-        print(f"[Next] Player states: {[(p.player_id, p.is_active, p.is_all_in, p.has_acted, p.current_bet) for p in self.players]}")
-        print(f"[Next] Current bet: {self.current_bet}")
+        if self.verbose:
+            print(f"[Next] No next player found, checking if betting round complete...")
+            print(f"[Next] Player states: {[(p.player_id, p.is_active, p.is_all_in, p.has_acted, p.current_bet) for p in self.players]}")
+            print(f"[Next] Current bet: {self.current_bet}")
 
         if self._is_betting_round_complete():
-            print(f"[Next] Advancing state from {self.state.value}")
+            if self.verbose:
+                print(f"[Next] Advancing state from {self.state.value}")
             self._advance_state()
         else:
-            print(f"[Next] ERROR: Betting round not complete but no next player found!")
-            print(f"[Next] This should not happen - setting current_player to -1")
+            if self.verbose:
+                print(f"[Next] ERROR: Betting round not complete but no next player found!")
+                print(f"[Next] This should not happen - setting current_player to -1")
             self.current_player_idx = -1
 
     def _is_betting_round_complete(self) -> bool:
@@ -424,18 +503,22 @@ class PokerGame:
         active_players = [p for p in self.players if p.is_active and not p.is_all_in]
 
         if len(active_players) <= 1:
-            print(f"[Betting] Round complete: only {len(active_players)} active player(s)")
+            if self.verbose:
+                print(f"[Betting] Round complete: only {len(active_players)} active player(s)")
             return True
 
         for player in active_players:
             if not player.has_acted:
-                print(f"[Betting] Round NOT complete: player {player.player_id} has not acted")
+                if self.verbose:
+                    print(f"[Betting] Round NOT complete: player {player.player_id} has not acted")
                 return False
             if player.current_bet < self.current_bet:
-                print(f"[Betting] Round NOT complete: player {player.player_id} bet {player.current_bet} < {self.current_bet}")
+                if self.verbose:
+                    print(f"[Betting] Round NOT complete: player {player.player_id} bet {player.current_bet} < {self.current_bet}")
                 return False
 
-        print(f"[Betting] Round complete: all {len(active_players)} players have acted and matched bet")
+        if self.verbose:
+            print(f"[Betting] Round complete: all {len(active_players)} players have acted and matched bet")
         return True
 
     def _advance_state(self):
@@ -444,11 +527,13 @@ class PokerGame:
         active_players = [p for p in self.players if p.is_active and not p.is_all_in]
         active_count = len(active_players)
         total_active = sum(1 for p in self.players if p.is_active)  # 包括all-in的
-        print(f"[Advance] Called: active_not_allin={active_count}, total_active={total_active}, state={self.state.value}")
+        if self.verbose:
+            print(f"[Advance] Called: active_not_allin={active_count}, total_active={total_active}, state={self.state.value}")
 
         # 如果只剩一个或零个活跃且未all-in的玩家，直接结束并分配底池
         if active_count <= 1:
-            print(f"[Advance] Only {active_count} active player(s), ending hand and distributing pot")
+            if self.verbose:
+                print(f"[Advance] Only {active_count} active player(s), ending hand and distributing pot")
 
             # 找出获胜者（唯一活跃的玩家）
             winner = None
@@ -461,7 +546,8 @@ class PokerGame:
             if winner:
                 winnings = self.pot
                 winner.chips += winnings
-                print(f"[Advance] Player {winner.player_id} wins pot of {winnings}")
+                if self.verbose:
+                    print(f"[Advance] Player {winner.player_id} wins pot of {winnings}")
 
                 # 存储获胜者信息供前端显示
                 self.last_winners = [{
@@ -469,31 +555,73 @@ class PokerGame:
                     "hand_description": "其他玩家弃牌",
                     "hand_rank": "WIN_BY_FOLD",
                     "winnings": winnings,
-                    "hole_cards": [c.to_dict() for c in winner.hole_cards] if winner.hole_cards else []
+                    "hole_cards": cards_to_dicts(winner.hole_cards) if winner.hole_cards else []
                 }]
 
                 self.pot = 0
 
             self.state = GameState.FINISHED
             self.current_player_idx = -1  # 没有当前玩家
-            print(f"[Advance] Set current_player_idx to -1, state is now {self.state.value}")
+            if self.verbose:
+                print(f"[Advance] Set current_player_idx to -1, state is now {self.state.value}")
             return
 
         # 正常推进游戏阶段
         if self.state == GameState.PREFLOP:
-            print(f"[Advance] PREFLOP -> FLOP")
+            if self.verbose:
+                print(f"[Advance] PREFLOP -> FLOP")
             self.deal_flop()
         elif self.state == GameState.FLOP:
-            print(f"[Advance] FLOP -> TURN")
+            if self.verbose:
+                print(f"[Advance] FLOP -> TURN")
             self.deal_turn()
         elif self.state == GameState.TURN:
-            print(f"[Advance] TURN -> RIVER")
+            if self.verbose:
+                print(f"[Advance] TURN -> RIVER")
             self.deal_river()
         elif self.state == GameState.RIVER:
-            print(f"[Advance] RIVER -> SHOWDOWN, setting current_player to -1")
+            if self.verbose:
+                print(f"[Advance] RIVER -> SHOWDOWN, setting current_player to -1")
             self.state = GameState.SHOWDOWN
             self.current_player_idx = -1  # 没有当前玩家
 
+    def evaluate_player_hand(self, player: PlayerState) -> tuple:
+        """
+        评估玩家当前 (底牌 + 公共牌) 的最佳牌型, 结果按玩家缓存
+
+        公共牌只会在 deal_flop/deal_turn/deal_river 中增加, 缓存记录已累加的
+        公共牌张数和查表键, 进入新的一条街时只累加新发的牌再查一次表;
+        同一条街内重复调用 (get_state、摊牌) 直接返回缓存结果
+
+        Returns:
+            (整数强度, 牌型等级, 决定性点数列表, 牌型描述)
+        """
+        from .hand_evaluator import HandEvaluator
+
+        board = self.community_cards
+        hole = tuple(player.hole_cards)
+        cached = self.hand_cache.get(player.player_id)
+
+        if cached and cached[0] == hole:
+            _, board_count, keys, result = cached
+            if board_count == len(board):
+                return result
+            keys = HandEvaluator.partial_keys(board[board_count:], keys)
+        else:
+            keys = HandEvaluator.partial_keys(player.hole_cards + board)
+
+        if not 5 <= len(hole) + len(board) <= 7:
+            raise ValueError("需要5-7张牌才能评估手牌")
+        try:
+            strength = HandEvaluator.strength_from_keys(keys)
+        except (KeyError, IndexError):
+            raise ValueError("手牌中存在无效或重复的牌")
+
+        hand_rank, hand_values = HandEvaluator.decode_strength(strength)
+        result = (strength, hand_rank, hand_values, HandEvaluator.hand_to_string(hand_rank, hand_values))
+        self.hand_cache[player.player_id] = (hole, len(board), keys, result)
+        return result
+
     def showdown(self) -> dict:
         """
         摊牌阶段 - 评估所有手牌并确定获胜者
@@ -519,11 +647,7 @@ class PokerGame:
                     raise ValueError(f"公共牌不足（当前 {len(self.community_cards)} 张，需要 5 张）")
 
                 try:
-                    hand_rank, hand_values = HandEvaluator.evaluate_hand(
-                        player.hole_cards,
-                        self.community_cards
-                    )
-                    hand_description = HandEvaluator.hand_to_string(hand_rank, hand_values)
+                    _, hand_rank, hand_values, hand_description = self.evaluate_player_hand(player)
                 except Exception as e:
                     raise ValueError(f"评估玩家 {player.player_id} 手牌时出错: {str(e)}")
 
@@ -538,23 +662,26 @@ class PokerGame:
             raise ValueError("没有玩家参与摊牌")
 
         # 打印所有玩家手牌评估结果
-        print(f"[Showdown] Evaluating {len(player_hands)} players:")
-        print(f"[Showdown] Community cards: {[str(c) for c in self.community_cards]}")
-        for ph in player_hands:
-            print(f"  Player {ph['player'].player_id}: {ph['description']} - Rank={ph['rank'].name}({ph['rank'].value}), Values={ph['values']}")
-            print(f"    Hole cards: {[str(c) for c in ph['player'].hole_cards]}")
+        if self.verbose:
+            print(f"[Showdown] Evaluating {len(player_hands)} players:")
+            print(f"[Showdown] Community cards: {[card_to_str(c) for c in self.community_cards]}")
+            for ph in player_hands:
+                print(f"  Player {ph['player'].player_id}: {ph['description']} - Rank={ph['rank'].name}({ph['rank'].value}), Values={ph['values']}")
+                print(f"    Hole cards: {[card_to_str(c) for c in ph['player'].hole_cards]}")
 
         # 找出获胜者（可能有多个平局）
-        print(f"[Showdown] Sorting by (rank, values)...")
+        if self.verbose:
+            print(f"[Showdown] Sorting by (rank, values)...")
         player_hands.sort(
             key=lambda x: (x["rank"], x["values"]),
             reverse=True
         )
 
-        print(f"[Showdown] After sorting:")
-        for i, ph in enumerate(player_hands):
-            print(f"  #{i+1}: Player {ph['player'].player_id} - {ph['description']} (rank={ph['rank'].value}, values={ph['values']})")
-        print(f"[Showdown] Winner: Player {player_hands[0]['player'].player_id}")
+        if self.verbose:
+            print(f"[Showdown] After sorting:")
+            for i, ph in enumerate(player_hands):
+                print(f"  #{i+1}: Player {ph['player'].player_id} - {ph['description']} (rank={ph['rank'].value}, values={ph['values']})")
+            print(f"[Showdown] Winner: Player {player_hands[0]['player'].player_id}")
 
         winners = [player_hands[0]]
         best_rank = player_hands[0]["rank"]
@@ -580,7 +707,7 @@ class PokerGame:
                 "player_id": w["player"].player_id,
                 "hand_description": w["description"],
                 "hand_rank": w["rank"].name,
-                "hole_cards": [c.to_dict() for c in w["player"].hole_cards],
+                "hole_cards": cards_to_dicts(w["player"].hole_cards),
                 "winnings": winnings[w["player"].player_id]
             }
             for w in winners
@@ -598,7 +725,7 @@ class PokerGame:
                     "player_id": h["player"].player_id,
                     "hand_description": h["description"],
                     "hand_rank": h["rank"].name,
-                    "hole_cards": [c.to_dict() for c in h["player"].hole_cards]
+                    "hole_cards": cards_to_dicts(h["player"].hole_cards)
                 }
                 for h in player_hands
             ],
@@ -650,19 +777,15 @@ class PokerGame:
             }
             # 如果是调试模式或者游戏结束，包含底牌
             if include_hole_cards or self.state in [GameState.SHOWDOWN, GameState.FINISHED]:
-                player_dict["hole_cards"] = [c.to_dict() for c in p.hole_cards]
+                player_dict["hole_cards"] = cards_to_dicts(p.hole_cards)
 
             # 如果有公共牌且玩家有底牌，评估当前牌型
             if (len(self.community_cards) >= 3 and
                 p.hole_cards and len(p.hole_cards) == 2 and
                 (p.is_active or p.is_all_in)):
                 try:
-                    from .hand_evaluator import HandEvaluator
-                    hand_rank, hand_values = HandEvaluator.evaluate_hand(
-                        p.hole_cards,
-                        self.community_cards
-                    )
-                    player_dict["current_hand"] = HandEvaluator.hand_to_string(hand_rank, hand_values)
+                    _, hand_rank, _, hand_description = self.evaluate_player_hand(p)
+                    player_dict["current_hand"] = hand_description
                     player_dict["hand_rank"] = hand_rank.name
                 except:
                     pass  # 如果评估失败，不添加牌型信息
@@ -676,7 +799,7 @@ class PokerGame:
             "current_bet": self.current_bet,
             "current_player": self.current_player_idx,
             "dealer": self.dealer_idx,
-            "community_cards": [c.to_dict() for c in self.community_cards],
+            "community_cards": cards_to_dicts(self.community_cards),
             "players": players_data,
             "last_winners": self.last_winners  # 包含上一手牌的获胜者信息
         }
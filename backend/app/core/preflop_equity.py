@@ -0,0 +1,163 @@
+"""
+169 类起手牌的翻牌前权益表
+
+离线生成 (scripts/build_preflop_equity.py) 的二进制表, 启动时内存映射,
+提供 O(1) 查询:
+- equity: 对抗 1-9 个随机对手全下到河牌的真实权益
+- strength: 在同一对手数下按权益归一化到 0-1 的强度 (最弱起手牌 0, AA 为 1)
+
+文件格式 (小端序):
+    头部: magic "PFEQ" | 版本 u8 | 类别数 u8 | 最大对手数 u8 | 保留 u8 | 样本数 u32 | 种子 u32
+    数据: 类别数 x 最大对手数 个 u16, 权益 = 值 / 65535
+"""
+import mmap
+import struct
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from .poker import RANK_SYMBOLS, CARD_RANKS, CARD_SUITS, make_card
+
+MAGIC = b"PFEQ"
+FORMAT_VERSION = 1
+NUM_CLASSES = 169
+MAX_OPPONENTS = 9
+
+_HEADER = struct.Struct("<4sBBBBII")
+_SCALE = 65535
+
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parent.parent / "data" / "preflop_equity.bin"
+
+
+def class_index(card1: int, card2: int) -> int:
+    """
+    两张底牌所属的起手牌类别 (0-168)
+
+    13x13 网格: 对子在对角线, 同花为 (高, 低), 杂色为 (低, 高)
+    """
+    rank1, rank2 = CARD_RANKS[card1], CARD_RANKS[card2]
+    high, low = (rank1, rank2) if rank1 >= rank2 else (rank2, rank1)
+    if CARD_SUITS[card1] == CARD_SUITS[card2]:
+        return high * 13 + low
+    return low * 13 + high
+
+
+# 按整数牌对预先展开的类别索引
+_CLASS_INDEX = [class_index(c1, c2) for c1 in range(52) for c2 in range(52)]
+
+
+def class_name(index: int) -> str:
+    """类别名称, 如 'AA', 'AKs', 'T9o'"""
+    row, col = divmod(index, 13)
+    if row == col:
+        return RANK_SYMBOLS[row] * 2
+    if row > col:
+        return f"{RANK_SYMBOLS[row]}{RANK_SYMBOLS[col]}s"
+    return f"{RANK_SYMBOLS[col]}{RANK_SYMBOLS[row]}o"
+
+
+def class_representative(index: int) -> List[int]:
+    """类别的一组代表性底牌 (用于生成权益表)"""
+    row, col = divmod(index, 13)
+    if row == col:
+        return [make_card(0, row), make_card(1, row)]
+    if row > col:
+        return [make_card(0, row), make_card(0, col)]
+    return [make_card(0, col), make_card(1, row)]
+
+
+def write_table(path: Path, equities: Sequence[Sequence[float]], samples: int, seed: int):
+    """
+    写出权益表
+
+    Args:
+        path: 输出文件
+        equities: equities[类别][对手数 - 1]
+        samples: 每个格子的蒙特卡洛样本数
+        seed: 生成使用的随机种子
+    """
+    data = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, NUM_CLASSES, MAX_OPPONENTS, 0, samples, seed))
+    for row in equities:
+        for equity in row:
+            data += struct.pack("<H", round(min(max(equity, 0.0), 1.0) * _SCALE))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(bytes(data))
+
+
+class PreflopEquityTable:
+    """内存映射的翻牌前权益表"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DEFAULT_TABLE_PATH
+        self._mm: Optional[mmap.mmap] = None
+        self._min: List[float] = []
+        self._range: List[float] = []
+        self._strengths: List[List[float]] = []
+        self._load_failed = False
+        self.samples = 0
+        self.seed = 0
+
+    def load(self):
+        """映射表文件并校验头部"""
+        if self._mm is not None:
+            return
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < _HEADER.size:
+            mm.close()
+            raise ValueError(f"翻牌前权益表格式不正确: {self.path}")
+
+        magic, version, classes, max_opponents, _, samples, seed = _HEADER.unpack_from(mm, 0)
+        expected_size = _HEADER.size + classes * max_opponents * 2
+        if (magic != MAGIC or version != FORMAT_VERSION or classes != NUM_CLASSES
+                or max_opponents != MAX_OPPONENTS or len(mm) != expected_size):
+            mm.close()
+            raise ValueError(f"翻牌前权益表格式不正确: {self.path}")
+
+        self._mm = mm
+        self.samples = samples
+        self.seed = seed
+
+        # 每种对手数下的最小/最大权益, 用于归一化强度
+        for n in range(1, MAX_OPPONENTS + 1):
+            column = [self._raw(i, n) for i in range(NUM_CLASSES)]
+            self._min.append(min(column))
+            self._range.append(max(column) - min(column))
+
+        # 归一化强度按 (对手数, 整数牌对) 预先展开, 查询只需一次列表索引
+        self._strengths = [
+            [(self._raw(index, n) - self._min[n - 1]) / self._range[n - 1] for index in _CLASS_INDEX]
+            for n in range(1, MAX_OPPONENTS + 1)
+        ]
+
+    @property
+    def available(self) -> bool:
+        """表是否可用 (按需加载, 文件缺失或损坏时返回 False)"""
+        if self._mm is None and not self._load_failed:
+            try:
+                self.load()
+            except (OSError, ValueError) as e:
+                print(f"⚠️  翻牌前权益表不可用: {e}")
+                self._load_failed = True
+        return self._mm is not None
+
+    def _raw(self, index: int, num_opponents: int) -> float:
+        offset = _HEADER.size + (index * MAX_OPPONENTS + num_opponents - 1) * 2
+        return struct.unpack_from("<H", self._mm, offset)[0] / _SCALE
+
+    def equity(self, card1: int, card2: int, num_opponents: int = 1) -> float:
+        """两张底牌对抗 num_opponents 个随机对手的翻牌前权益"""
+        if self._mm is None:
+            self.load()
+        num_opponents = min(max(num_opponents, 1), MAX_OPPONENTS)
+        return self._raw(_CLASS_INDEX[card1 * 52 + card2], num_opponents)
+
+    def strength(self, card1: int, card2: int, num_opponents: int = 1) -> float:
+        """归一化强度 (0-1): 同一对手数下最弱起手牌为 0, 最强为 1"""
+        if self._mm is None:
+            self.load()
+        num_opponents = min(max(num_opponents, 1), MAX_OPPONENTS)
+        return self._strengths[num_opponents - 1][card1 * 52 + card2]
+
+
+# 全局权益表 (应用启动时加载)
+preflop_table = PreflopEquityTable()
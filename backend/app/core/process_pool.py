@@ -0,0 +1,46 @@
+"""计算密集任务的进程池
+
+权益计算、批量模拟等纯 CPU 任务放到独立进程中执行, 避免阻塞事件循环
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool_size() -> int:
+    """进程池工作进程数 (默认每个 CPU 核一个)"""
+    return settings.PROCESS_POOL_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """获取 (必要时创建) 全局进程池"""
+    global _executor
+    if _executor is None:
+        workers = process_pool_size()
+        # spawn 启动的子进程不会继承事件循环和连接等父进程状态
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def run_in_process(func: Callable, *args, **kwargs) -> Any:
+    """在进程池中执行函数并等待结果 (函数及参数必须可序列化)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(func, *args, **kwargs))
+
+
+def shutdown_process_pool():
+    """关闭进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,35 +1,337 @@
-"""Redis 游戏状态存储"""
-import pickle
-import redis
-from typing import Optional
-from fastapi import HTTPException
+"""
+Redis 游戏状态存储
 
-from .poker import PokerGame
+除完整快照 (game:{id}) 外, 每次保存同时维护一份游戏摘要和二级索引,
+列表与统计接口只读取摘要和计数器, 不再加载完整游戏:
+    game_summary:{id}     摘要 JSON (状态、底池、盲注、玩家筹码、创建时间)
+    games:by_created      按创建时间排序的游戏 ID (有序集合)
+    games:state:{state}   按状态分组、按创建时间排序的游戏 ID (有序集合)
+    games:expiry          快照过期时间 (有序集合), 用于清理已过期游戏的摘要
+    games:counters        统计计数器 (哈希), 随每次保存按增量更新
+    games:player_refs     玩家 ID -> 所在游戏数 (哈希)
+
+摘要中的 version 在每次写入 Redis 时加一, 用于校验进程内缓存是否过期,
+也用于乐观并发控制: 写入时比对读取时的版本号 (WATCH 摘要键 + 比较), 不符说明
+期间已有其他请求写入, 抛出 GameConflictError 而不是覆盖; mutate_game 在冲突时
+重新加载并重新执行修改, 最多重试 GAME_CAS_RETRIES 次. 冲突率见 GET /metrics.
+
+热点游戏缓存: 连接 Redis 时, 进程内以 LRU 缓存最近使用的 PokerGame 对象,
+加载直接命中缓存, 保存只标记为脏, 由后台任务每 GAME_CACHE_FLUSH_INTERVAL 秒
+合并写回 (一手牌结束时立即写回). 这要求同一游戏只由一个工作进程修改;
+多工作进程部署时开启 GAME_CACHE_VALIDATE: 每次加载先比对 Redis 中的版本号,
+过期则重新加载, 且保存改为立即写回
+
+事件溯源 (缓存模式, GAME_EVENT_SOURCING): 每个新动作以定长动作事件追加到
+game_events:{id} (Redis Stream, 事件 ID 为 0-序号), 同一条街内的保存只追加事件,
+不再重写完整快照; 换街、新一手牌等其他变化时才写快照. 摘要中 events 为已写入的事件数,
+snapshot_events 为快照已包含的事件数, 加载时在快照上重放其后的事件
+(只改变状态序号 state_seq 的保存同样只追加事件, 序号以摘要为准).
+事件流同时作为动作审计日志 (写快照时也追加)
+"""
+import asyncio
+import json
+import random
+import time
+import weakref
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import WatchError
+
+from .config import settings
+from .metrics import metrics
+from .poker import PokerGame, GameState
+from .game_codec import encode_game, decode_game, encode_action_event, decode_action_event, replay_actions, SnapshotError
+
+_SUMMARY_PREFIX = "game_summary:"
+_BY_CREATED = "games:by_created"
+_STATE_PREFIX = "games:state:"
+_EXPIRY = "games:expiry"
+_COUNTERS = "games:counters"
+_PLAYER_REFS = "games:player_refs"
+_EVENTS_PREFIX = "game_events:"
+
+COUNTER_FIELDS = ("total_games", "active_games", "finished_games", "total_hands", "total_pot")
+
+# 每次列表/统计请求最多清理的过期游戏数
+_PRUNE_BATCH = 100
+
+
+class GameConflictError(Exception):
+    """游戏在读取之后已被其他请求修改 (保存时版本号不符)"""
+
+
+@dataclass
+class _CachedGame:
+    """热点缓存条目"""
+    game: PokerGame
+    version: int          # 最近一次加载或写回时 Redis 中的版本号
+    ttl: int = 3600
+    dirty: bool = False   # 有尚未写回 Redis 的修改
+    seq: int = 0          # 保存次数, 用于判断写回期间是否又有新的修改
+    mark: Optional[tuple] = None  # 最近一次写回时的 _write_mark, 用于判断能否只追加动作事件
+
+
+def _baseline(game: PokerGame) -> tuple:
+    """
+    动作之外的状态特征: 不变时, 自上次写回以来的变化都可由重放动作得到
+
+    动作只在玩家筹码与底池之间转移, 其总额变化说明有动作以外的修改 (补充筹码、手动改底池等)
+    """
+    return (
+        game.state, len(game.deck.cards), game.dealer_idx,
+        round(sum(p.chips for p in game.players) + game.pot, 6),
+        tuple(p.player_id for p in game.players),
+        tuple(sorted(getattr(game, "_player_types", {}).items()))
+    )
+
+
+def _write_mark(game: PokerGame) -> tuple:
+    """写回时的标记: (状态特征, 已写入的动作数, 最后一条已写入的动作)"""
+    history = game.action_history
+    return _baseline(game), len(history), dict(history[-1]) if history else None
+
+
+def _plan_write(game: PokerGame, mark: Optional[tuple]):
+    """
+    决定本次写回的方式
+
+    Returns:
+        (是否写快照, 需要追加的动作记录)
+    """
+    if mark is None or not settings.GAME_EVENT_SOURCING:
+        return True, []
+    baseline, count, last = mark
+    history = game.action_history
+    if len(history) >= count and (count == 0 or history[count - 1] == last):
+        return baseline != _baseline(game), history[count:]
+    # 动作历史已重置 (新的一手牌)
+    return True, history
+
+
+def game_summary(game: PokerGame) -> dict:
+    """游戏摘要 (列表接口的返回项)"""
+    return {
+        "game_id": game.game_id,
+        "num_players": len(game.players),
+        "state": game.state.value,
+        "pot": game.pot,
+        "current_bet": game.current_bet,
+        "small_blind": game.small_blind,
+        "big_blind": game.big_blind,
+        "created_at": game.created_at,
+        "players": [
+            {
+                "player_id": p.player_id,
+                "chips": p.chips,
+                "is_active": p.is_active
+            }
+            for p in game.players
+        ]
+    }
+
+
+def _summary_counts(summary: Optional[dict]) -> dict:
+    """一局游戏对各计数器的贡献"""
+    if summary is None:
+        return dict.fromkeys(COUNTER_FIELDS, 0)
+    state = summary["state"]
+    return {
+        "total_games": 1,
+        "active_games": int(state not in (GameState.WAITING.value, GameState.FINISHED.value)),
+        "finished_games": int(state == GameState.FINISHED.value),
+        "total_hands": int(state != GameState.WAITING.value),
+        "total_pot": summary["pot"],
+    }
+
+
+def _counter_deltas(old: Optional[dict], new: Optional[dict]) -> dict:
+    """摘要从 old 变为 new 时各计数器的增量"""
+    old_counts, new_counts = _summary_counts(old), _summary_counts(new)
+    return {name: new_counts[name] - old_counts[name] for name in COUNTER_FIELDS}
+
+
+def _player_deltas(old: Optional[dict], new: Optional[dict]) -> Counter:
+    """摘要从 old 变为 new 时各玩家 ID 引用数的增量"""
+    deltas = Counter(p["player_id"] for p in new["players"]) if new else Counter()
+    if old:
+        deltas.subtract(p["player_id"] for p in old["players"])
+    return Counter({player_id: delta for player_id, delta in deltas.items() if delta})
 
 
 class RedisGameStorage:
-    """Redis 游戏状态存储"""
+    """
+    Redis 游戏状态存储 (异步)
 
-    def __init__(self, redis_url: str = "redis://redis:6379/0"):
+    所有请求共享一个连接池, Redis 往返不再阻塞事件循环;
+    Redis 不可用时退回进程内存储
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        validate_cache: Optional[bool] = None
+    ):
         """
-        初始化 Redis 存储
+        初始化 Redis 存储 (连接在 connect() 中建立)
 
         Args:
-            redis_url: Redis 连接 URL
+            redis_url: Redis 连接 URL, 默认使用配置中的 REDIS_URL
+            max_connections: 连接池大小, 默认使用配置中的 REDIS_MAX_CONNECTIONS
+            cache_size: 热点游戏缓存容量 (0 表示不缓存), 默认使用 GAME_CACHE_SIZE
+            flush_interval: 脏游戏写回间隔 (秒), 默认使用 GAME_CACHE_FLUSH_INTERVAL
+            validate_cache: 是否按版本号校验缓存 (多工作进程), 默认使用 GAME_CACHE_VALIDATE
         """
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.max_connections = max_connections or settings.REDIS_MAX_CONNECTIONS
+        self.redis_client: Optional[redis.Redis] = None
+
+        # 热点游戏缓存 (仅在连接 Redis 时使用)
+        self.cache_size = settings.GAME_CACHE_SIZE if cache_size is None else cache_size
+        self.flush_interval = flush_interval or settings.GAME_CACHE_FLUSH_INTERVAL
+        self.validate_cache = settings.GAME_CACHE_VALIDATE if validate_cache is None else validate_cache
+        self._cache: "OrderedDict[str, _CachedGame]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # 内存备份（Redis 不可用时使用）
+        self._memory_storage: Dict[str, PokerGame] = {}
+        self._memory_summaries: Dict[str, dict] = {}
+        self._memory_counters: Dict[str, float] = dict.fromkeys(COUNTER_FIELDS, 0)
+        self._memory_player_refs: Counter = Counter()
+
+        # 每个游戏一把锁, 保证同一进程内对同一游戏的 加载-修改-保存 串行执行
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def connect(self):
+        """建立连接池并测试连接"""
         try:
-            self.redis_client = redis.from_url(redis_url, decode_responses=False)
-            # 测试连接
-            self.redis_client.ping()
-            print(f"✅ Redis 游戏存储初始化成功: {redis_url}")
+            pool = redis.ConnectionPool.from_url(
+                self.redis_url,
+                max_connections=self.max_connections,
+                decode_responses=False
+            )
+            client = redis.Redis(connection_pool=pool)
+            await client.ping()
+            self.redis_client = client
+            print(f"✅ Redis 游戏存储初始化成功: {self.redis_url} (连接池 {self.max_connections})")
         except Exception as e:
             print(f"⚠️  Redis 连接失败，使用内存存储: {e}")
             self.redis_client = None
+            return
 
-        # 内存备份（Redis 不可用时使用）
-        self._memory_storage = {}
+        if self.cache_size and not self.validate_cache:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """停止写回任务, 写回全部脏游戏后关闭连接池"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self.redis_client:
+            await self.flush()
+            await self.redis_client.aclose()
+            self.redis_client = None
+        self._cache.clear()
+
+    def _lock(self, game_id: str) -> asyncio.Lock:
+        """游戏对应的锁 (没有时创建)"""
+        lock = self._locks.get(game_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[game_id] = lock
+        return lock
+
+    def _cache_put(self, game_id: str, entry: _CachedGame):
+        self._cache[game_id] = entry
+        self._cache.move_to_end(game_id)
+
+    async def _evict(self):
+        """
+        缓存超出容量时淘汰最久未使用的游戏 (脏游戏先写回)
+
+        正在被修改 (持有锁) 的游戏跳过, 避免写回修改到一半的状态
+        """
+        for _ in range(len(self._cache)):
+            if len(self._cache) <= self.cache_size:
+                return
+            game_id, entry = next(iter(self._cache.items()))
+            lock = self._locks.get(game_id)
+            if lock is not None and lock.locked():
+                self._cache.move_to_end(game_id)
+                continue
+            if entry.dirty:
+                await self._flush_entry(game_id, entry)
+            if self._cache.get(game_id) is entry and not entry.dirty:
+                del self._cache[game_id]
 
-    def save_game(self, game_id: str, game: PokerGame, ttl: int = 3600):
+    async def _flush_entry(self, game_id: str, entry: _CachedGame, raise_conflict: bool = False):
+        """
+        把一个缓存游戏写回 Redis, 失败时保持为脏, 下次重试
+
+        Redis 中的版本号与缓存不符时 (其他进程已写入) 放弃本地修改并移出缓存, 不覆盖对方的写入
+
+        Args:
+            raise_conflict: 版本冲突时抛出 GameConflictError (由调用方重新执行修改)
+        """
+        seq = entry.seq
+        try:
+            entry.version = await self._save_redis(game_id, entry.game, entry.ttl, entry, expected_version=entry.version)
+        except GameConflictError:
+            if self._cache.get(game_id) is entry:
+                del self._cache[game_id]
+            if raise_conflict:
+                raise
+            print(f"⚠️  游戏 {game_id} 已被其他进程修改, 放弃未写回的修改")
+            return
+        except Exception as e:
+            print(f"⚠️  Redis 写回失败，稍后重试: {e}")
+            return
+        if entry.seq == seq:
+            entry.dirty = False
+
+    async def flush(self):
+        """写回全部脏游戏"""
+        for game_id, entry in list(self._cache.items()):
+            if entry.dirty:
+                async with self._lock(game_id):
+                    if entry.dirty:
+                        await self._flush_entry(game_id, entry)
+
+    def cached_game_ids(self) -> List[str]:
+        """当前在热点缓存中的游戏 ID"""
+        return list(self._cache)
+
+    async def release(self, game_id: str):
+        """写回并移出缓存 (游戏归属转移到其他工作进程时), 写回失败时保留在缓存中"""
+        async with self._lock(game_id):
+            entry = self._cache.get(game_id)
+            if entry is None:
+                return
+            if entry.dirty:
+                await self._flush_entry(game_id, entry)
+            if not entry.dirty:
+                del self._cache[game_id]
+
+    async def _flush_loop(self):
+        """后台写回任务: 每个间隔把期间的多次保存合并为一次写入"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️  游戏缓存写回失败: {e}")
+
+    async def save_game(self, game_id: str, game: PokerGame, ttl: int = 3600, expected_version: Optional[int] = None):
         """
         保存游戏状态
 
@@ -37,24 +339,156 @@ class RedisGameStorage:
             game_id: 游戏 ID
             game: 游戏对象
             ttl: 过期时间（秒），默认 1 小时
+            expected_version: 读取时的版本号, Redis 中的版本号不同时抛出 GameConflictError
+                (缓存模式按缓存条目的版本号比对)
+
+        Raises:
+            GameConflictError: 版本冲突
         """
-        key = f"game:{game_id}"
+        if self.redis_client and self.cache_size:
+            await self._save_cached(game_id, game, ttl)
+            return
+
+        summary = game_summary(game)
 
         try:
             if self.redis_client:
-                # 使用 Redis 存储
-                serialized = pickle.dumps(game)
-                self.redis_client.setex(key, ttl, serialized)
+                # 使用 Redis 存储 (紧凑二进制快照 + 摘要索引)
+                await self._save_redis(game_id, game, ttl, expected_version=expected_version)
             else:
                 # 使用内存存储
-                self._memory_storage[game_id] = game
+                self._save_memory(game_id, game, summary)
+        except GameConflictError:
+            raise
         except Exception as e:
             import traceback
             print(f"⚠️  Redis 保存失败，使用内存备份: {e}")
             print(traceback.format_exc())
+            self._save_memory(game_id, game, summary)
+
+    async def _save_cached(self, game_id: str, game: PokerGame, ttl: int):
+        """
+        缓存模式的保存: 标记为脏, 由后台任务合并写回
+
+        一手牌结束或开启版本校验时立即写回
+        """
+        entry = self._cache.get(game_id)
+        if entry is None or entry.game is not game:
+            entry = _CachedGame(game=game, version=entry.version if entry else 0)
+        entry.ttl = ttl
+        entry.dirty = True
+        entry.seq += 1
+        self._cache_put(game_id, entry)
+
+        if self.validate_cache or game.state == GameState.FINISHED:
+            await self._flush_entry(game_id, entry, raise_conflict=True)
+        await self._evict()
+
+    async def _save_redis(
+        self,
+        game_id: str,
+        game: PokerGame,
+        ttl: int,
+        entry: Optional[_CachedGame] = None,
+        expected_version: Optional[int] = None
+    ) -> int:
+        """
+        在一个事务中写入快照 (或只追加动作事件)、摘要、索引与计数器增量
+
+        计数器增量与事件序号依赖旧摘要, 因此 WATCH 摘要键, 其他进程并发修改同一游戏时重试
+
+        Args:
+            entry: 缓存条目, 据其写回标记决定能否只追加动作事件; 不传时总是写快照
+            expected_version: 比较并写入: 摘要中的版本号不等于该值时不写入
+
+        Raises:
+            GameConflictError: 版本号不符
+
+        Returns:
+            写入后的版本号
+        """
+        key = f"game:{game_id}"
+        summary_key = f"{_SUMMARY_PREFIX}{game_id}"
+        events_key = f"{_EVENTS_PREFIX}{game_id}"
+        summary = game_summary(game)
+        created_at = summary["created_at"]
+        mark = _write_mark(game)
+        snapshot, records = _plan_write(game, entry.mark if entry else None)
+        data = encode_game(game) if snapshot else None
+        events = [encode_action_event(record) for record in records]
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(summary_key)
+                    raw = await pipe.get(summary_key)
+                    old = json.loads(raw) if raw else None
+                    current = (old or {}).get("version", 0)
+                    if expected_version is not None and current != expected_version:
+                        await pipe.unwatch()
+                        metrics.inc("game_save_conflicts")
+                        raise GameConflictError(f"游戏 {game_id} 版本冲突: 期望 {expected_version}, 实际 {current}")
+                    version = current + 1
+                    seq = (old or {}).get("events", 0)
+                    cursor = (old or {}).get("snapshot_events", 0)
+
+                    pipe.multi()
+                    if old is None:
+                        # 新游戏 (或摘要已丢失): 事件序号从 1 开始
+                        pipe.delete(events_key)
+                    if events:
+                        for event in events:
+                            seq += 1
+                            pipe.xadd(events_key, {"e": event}, id=f"0-{seq}",
+                                      maxlen=settings.GAME_EVENT_LOG_MAXLEN, approximate=True)
+                        pipe.expire(events_key, ttl)
+                    if data is not None or old is None:
+                        pipe.setex(key, ttl, data if data is not None else encode_game(game))
+                        cursor = seq
+                    else:
+                        pipe.expire(key, ttl)
+                    pipe.set(summary_key, json.dumps(dict(
+                        summary, version=version, events=seq, snapshot_events=cursor, state_seq=game.state_seq
+                    )))
+                    pipe.zadd(_BY_CREATED, {game_id: created_at})
+                    if old and old["state"] != summary["state"]:
+                        pipe.zrem(f"{_STATE_PREFIX}{old['state']}", game_id)
+                    pipe.zadd(f"{_STATE_PREFIX}{summary['state']}", {game_id: created_at})
+                    pipe.zadd(_EXPIRY, {game_id: time.time() + ttl})
+                    self._queue_deltas(pipe, old, summary)
+                    await pipe.execute()
+                    metrics.inc("game_saves")
+                    if entry is not None:
+                        entry.mark = mark
+                    return version
+                except WatchError:
+                    metrics.inc("game_save_watch_retries")
+                    continue
+
+    @staticmethod
+    def _queue_deltas(pipe, old: Optional[dict], new: Optional[dict]):
+        """把计数器与玩家引用数的增量加入事务"""
+        for name, delta in _counter_deltas(old, new).items():
+            if delta:
+                pipe.hincrbyfloat(_COUNTERS, name, delta)
+        for player_id, delta in _player_deltas(old, new).items():
+            pipe.hincrby(_PLAYER_REFS, player_id, delta)
+
+    def _save_memory(self, game_id: str, game: PokerGame, summary: Optional[dict]):
+        """内存存储: 保存游戏并更新摘要与计数器 (summary 为 None 表示删除)"""
+        old = self._memory_summaries.get(game_id)
+        for name, delta in _counter_deltas(old, summary).items():
+            self._memory_counters[name] += delta
+        self._memory_player_refs.update(_player_deltas(old, summary))
+
+        if summary is None:
+            self._memory_storage.pop(game_id, None)
+            self._memory_summaries.pop(game_id, None)
+        else:
             self._memory_storage[game_id] = game
+            self._memory_summaries[game_id] = summary
 
-    def load_game(self, game_id: str) -> Optional[PokerGame]:
+    async def load_game(self, game_id: str) -> Optional[PokerGame]:
         """
         加载游戏状态
 
@@ -64,52 +498,323 @@ class RedisGameStorage:
         Returns:
             游戏对象，如果不存在返回 None
         """
-        key = f"game:{game_id}"
+        game, _ = await self._load_versioned(game_id)
+        return game
+
+    async def _load_versioned(self, game_id: str) -> tuple:
+        """
+        加载游戏状态及其版本号 (供保存时比较并写入)
 
+        Returns:
+            (游戏对象或 None, 版本号); 缓存模式 (按缓存条目比对) 与内存存储的版本号为 None
+        """
         try:
+            if self.redis_client and self.cache_size:
+                return await self._load_cached(game_id), None
+
             if self.redis_client:
-                # 从 Redis 加载
-                data = self.redis_client.get(key)
-                if data:
-                    game = pickle.loads(data)
-                    # 确保 action_history 存在
-                    if not hasattr(game, 'action_history'):
-                        game.action_history = []
-                    return game
+                # 从 Redis 加载 (快照 + 重放之后的动作事件)
+                loaded = await self._fetch([game_id])
+                if game_id in loaded:
+                    return loaded[game_id]
 
             # 从内存加载
-            game = self._memory_storage.get(game_id)
-            if game and not hasattr(game, 'action_history'):
-                game.action_history = []
-            return game
+            return self._memory_storage.get(game_id), None
         except Exception as e:
             import traceback
             print(f"⚠️  Redis 加载失败，尝试内存: {e}")
             print(traceback.format_exc())
-            game = self._memory_storage.get(game_id)
-            if game and not hasattr(game, 'action_history'):
-                game.action_history = []
-            return game
+            return self._memory_storage.get(game_id), None
 
-    def delete_game(self, game_id: str):
+    async def _load_cached(self, game_id: str) -> Optional[PokerGame]:
+        """
+        缓存模式的加载: 命中缓存直接返回 (开启校验时先比对版本号), 否则从 Redis 加载并放入缓存
+        """
+        summary_key = f"{_SUMMARY_PREFIX}{game_id}"
+        entry = self._cache.get(game_id)
+
+        if entry is not None:
+            if not self.validate_cache or entry.dirty:
+                self._cache.move_to_end(game_id)
+                return entry.game
+            raw = await self.redis_client.get(summary_key)
+            if raw and json.loads(raw).get("version", 0) == entry.version:
+                self._cache.move_to_end(game_id)
+                return entry.game
+            # 其他工作进程已修改该游戏, 缓存作废
+            self._cache.pop(game_id, None)
+
+        loaded = await self._fetch([game_id])
+        if game_id not in loaded:
+            return self._memory_storage.get(game_id)
+
+        game, version = loaded[game_id]
+        self._cache_put(game_id, _CachedGame(game=game, version=version, mark=_write_mark(game)))
+        await self._evict()
+        return game
+
+    async def _fetch(self, game_ids: List[str]) -> Dict[str, tuple]:
+        """
+        从 Redis 批量读取快照与摘要, 在快照上重放其后的动作事件
+
+        旧版 pickle 快照在解码时统一迁移
+
+        Returns:
+            {游戏 ID: (游戏对象, 版本号)}, 不存在的游戏不包含在结果中
+        """
+        keys = [f"game:{game_id}" for game_id in game_ids] + [f"{_SUMMARY_PREFIX}{game_id}" for game_id in game_ids]
+        values = await self.redis_client.mget(keys)
+        snapshots, summaries = values[:len(game_ids)], values[len(game_ids):]
+
+        loaded, pending, summaries_by_id = {}, [], {}
+        for game_id, data, raw in zip(game_ids, snapshots, summaries):
+            if not data:
+                continue
+            summary = summaries_by_id[game_id] = json.loads(raw) if raw else {}
+            loaded[game_id] = (decode_game(data), summary.get("version", 0))
+            cursor, events = summary.get("snapshot_events", 0), summary.get("events", 0)
+            if events > cursor:
+                pending.append((game_id, cursor, events))
+
+        if pending:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for game_id, cursor, events in pending:
+                    pipe.xrange(f"{_EVENTS_PREFIX}{game_id}", min=f"0-{cursor + 1}", max=f"0-{events}")
+                streams = await pipe.execute()
+            for (game_id, cursor, events), entries in zip(pending, streams):
+                if len(entries) != events - cursor:
+                    raise SnapshotError(f"游戏 {game_id} 的动作事件不完整: {len(entries)}/{events - cursor}")
+                replay_actions(loaded[game_id][0], [decode_action_event(fields[b"e"]) for _, fields in entries])
+
+        # 只追加事件的保存不重写快照, 状态序号以摘要为准
+        for game_id, (game, _) in loaded.items():
+            game.state_seq = max(game.state_seq, summaries_by_id[game_id].get("state_seq", 0))
+        return loaded
+
+    async def load_games(self, game_ids: List[str]) -> Dict[str, PokerGame]:
+        """
+        批量加载游戏状态 (一次 MGET 往返, 有未合并进快照的动作事件时再一次 XRANGE 往返)
+
+        Returns:
+            {游戏 ID: 游戏对象}, 不存在的游戏不包含在结果中
+        """
+        if not game_ids:
+            return {}
+
+        try:
+            if self.redis_client:
+                games = {}
+                if self.cache_size and not self.validate_cache:
+                    games = {game_id: self._cache[game_id].game for game_id in game_ids if game_id in self._cache}
+                    game_ids = [game_id for game_id in game_ids if game_id not in games]
+                    if not game_ids:
+                        return games
+                loaded = await self._fetch(game_ids)
+                for game_id in game_ids:
+                    if game_id in loaded:
+                        games[game_id] = loaded[game_id][0]
+                    elif game_id in self._memory_storage:
+                        games[game_id] = self._memory_storage[game_id]
+                return games
+        except Exception as e:
+            print(f"⚠️  Redis 批量加载失败，尝试内存: {e}")
+
+        return {
+            game_id: self._memory_storage[game_id]
+            for game_id in game_ids if game_id in self._memory_storage
+        }
+
+    @asynccontextmanager
+    async def update_game(self, game_id: str, ttl: int = 3600) -> AsyncIterator[Optional[PokerGame]]:
+        """
+        加载-修改-保存
+
+        同一进程内对同一游戏的修改按顺序执行, 不会互相覆盖;
+        代码块正常结束时保存, 抛出异常时不保存并丢弃改了一半的对象. 游戏不存在时得到 None.
+        其他进程在此期间修改了该游戏时保存抛出 GameConflictError (需要自动重试时用 mutate_game)
+
+        用法:
+            async with game_storage.update_game(game_id) as game:
+                game.player_action(...)
+        """
+        async with self._lock(game_id):
+            game, version = await self._load_versioned(game_id)
+            # 有未写回修改的缓存游戏与内存存储中的游戏没有其他副本, 先留一份快照用于回滚
+            backup = encode_game(game) if self._is_unsaved(game_id, game) else None
+            try:
+                yield game
+            except BaseException:
+                self._rollback(game_id, game, backup)
+                raise
+            if game is not None:
+                await self.save_game(game_id, game, ttl, expected_version=version)
+
+    def _is_unsaved(self, game_id: str, game: Optional[PokerGame]) -> bool:
+        """该游戏对象是否有 Redis 中没有的修改 (脏缓存条目或内存存储)"""
+        if game is None:
+            return False
+        entry = self._cache.get(game_id)
+        if entry is not None and entry.game is game:
+            return entry.dirty
+        return self._memory_storage.get(game_id) is game
+
+    def _rollback(self, game_id: str, game: Optional[PokerGame], backup: Optional[bytes]):
+        """
+        丢弃修改到一半的游戏对象: 有快照时还原为修改前的状态, 否则移出缓存 (下次从 Redis 重新加载)
+        """
+        entry = self._cache.get(game_id)
+        if entry is not None and entry.game is game:
+            if backup is None:
+                del self._cache[game_id]
+            else:
+                entry.game = decode_game(backup)
+        if backup is not None and self._memory_storage.get(game_id) is game:
+            self._memory_storage[game_id] = decode_game(backup)
+
+    async def mutate_game(self, game_id: str, func: Callable[[Optional[PokerGame]], Awaitable[Any]],
+                          ttl: int = 3600, retries: Optional[int] = None) -> Any:
+        """
+        乐观并发的 加载-修改-保存: 版本冲突时重新加载并重新执行 func
+
+        func 可能被执行多次, 每次拿到的都是最新加载的游戏对象
+
+        Args:
+            func: async def func(game) -> 结果, 游戏不存在时 game 为 None
+            retries: 冲突后的最大重试次数, 默认使用配置中的 GAME_CAS_RETRIES
+
+        Returns:
+            func 的返回值
+
+        Raises:
+            GameConflictError: 重试次数用尽仍然冲突
+        """
+        retries = settings.GAME_CAS_RETRIES if retries is None else retries
+        metrics.inc("game_mutations")
+        for attempt in range(retries + 1):
+            try:
+                async with self.update_game(game_id, ttl) as game:
+                    return await func(game)
+            except GameConflictError:
+                if attempt == retries:
+                    metrics.inc("game_mutation_failures")
+                    raise
+                metrics.inc("game_mutation_retries")
+                # 随机退避, 避免冲突双方同时重试
+                await asyncio.sleep(random.uniform(0, 0.005 * (attempt + 1)))
+
+    async def delete_game(self, game_id: str):
         """
         删除游戏状态
 
         Args:
             game_id: 游戏 ID
         """
-        key = f"game:{game_id}"
+        self._cache.pop(game_id, None)
 
         try:
             if self.redis_client:
-                self.redis_client.delete(key)
+                await self._remove_redis(game_id, only_expired=False)
 
             if game_id in self._memory_storage:
-                del self._memory_storage[game_id]
+                self._save_memory(game_id, None, None)
         except Exception as e:
             print(f"⚠️  Redis 删除失败: {e}")
 
-    def exists(self, game_id: str) -> bool:
+    async def _remove_redis(self, game_id: str, only_expired: bool):
+        """
+        删除游戏及其摘要, 从索引中移除并回退计数器
+
+        Args:
+            only_expired: 只在快照已过期时删除 (清理过期摘要时使用)
+        """
+        key = f"game:{game_id}"
+        summary_key = f"{_SUMMARY_PREFIX}{game_id}"
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(summary_key, key)
+                    if only_expired and await pipe.exists(key):
+                        # 快照在清理前被重新保存, 过期时间已更新
+                        await pipe.unwatch()
+                        return
+                    raw = await pipe.get(summary_key)
+                    old = json.loads(raw) if raw else None
+
+                    pipe.multi()
+                    pipe.delete(key, summary_key, f"{_EVENTS_PREFIX}{game_id}")
+                    pipe.zrem(_BY_CREATED, game_id)
+                    pipe.zrem(_EXPIRY, game_id)
+                    if old:
+                        pipe.zrem(f"{_STATE_PREFIX}{old['state']}", game_id)
+                    self._queue_deltas(pipe, old, None)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        # 长时间无人访问、快照已过期的游戏同时移出缓存
+        entry = self._cache.get(game_id)
+        if entry is not None and not entry.dirty:
+            del self._cache[game_id]
+
+    async def _prune_expired(self):
+        """清理快照已过期 (TTL 到期) 的游戏的摘要与计数, 每次最多处理 _PRUNE_BATCH 个"""
+        expired = await self.redis_client.zrangebyscore(_EXPIRY, "-inf", time.time(), start=0, num=_PRUNE_BATCH)
+        for game_id in expired:
+            await self._remove_redis(game_id.decode(), only_expired=True)
+
+    async def list_games(self, offset: int = 0, limit: int = 10, state: Optional[str] = None) -> List[dict]:
+        """
+        分页列出游戏摘要 (按创建时间倒序), 开销与页大小成正比
+
+        Args:
+            offset: 跳过的条数
+            limit: 每页条数
+            state: 只列出该状态的游戏
+        """
+        try:
+            if self.redis_client:
+                await self._prune_expired()
+                index = f"{_STATE_PREFIX}{state}" if state else _BY_CREATED
+                game_ids = await self.redis_client.zrevrange(index, offset, offset + limit - 1)
+                if not game_ids:
+                    return []
+                values = await self.redis_client.mget([_SUMMARY_PREFIX.encode() + gid for gid in game_ids])
+                return [json.loads(value) for value in values if value]
+        except Exception as e:
+            print(f"⚠️  Redis 获取失败，使用内存: {e}")
+
+        summaries = [
+            summary for summary in self._memory_summaries.values()
+            if not state or summary["state"] == state
+        ]
+        summaries.sort(key=lambda summary: summary["created_at"], reverse=True)
+        return summaries[offset:offset + limit]
+
+    async def get_stats(self) -> dict:
+        """读取持续维护的统计计数器"""
+        counters, refs = self._memory_counters, self._memory_player_refs.values()
+        try:
+            if self.redis_client:
+                await self._prune_expired()
+                raw = await self.redis_client.hgetall(_COUNTERS)
+                counters = {name: float(raw.get(name.encode(), 0)) for name in COUNTER_FIELDS}
+                refs = [int(ref) for ref in await self.redis_client.hvals(_PLAYER_REFS)]
+        except Exception as e:
+            print(f"⚠️  Redis 获取失败，使用内存: {e}")
+            counters, refs = self._memory_counters, self._memory_player_refs.values()
+
+        return {
+            "total_games": int(counters["total_games"]),
+            "active_games": int(counters["active_games"]),
+            "finished_games": int(counters["finished_games"]),
+            "total_players": sum(1 for ref in refs if ref > 0),
+            "total_hands": int(counters["total_hands"]),
+            "total_pot": counters["total_pot"]
+        }
+
+    async def exists(self, game_id: str) -> bool:
         """
         检查游戏是否存在
 
@@ -120,33 +825,90 @@ class RedisGameStorage:
             是否存在
         """
         key = f"game:{game_id}"
+        if game_id in self._cache:
+            return True
 
         try:
             if self.redis_client:
-                return self.redis_client.exists(key) > 0
+                return await self.redis_client.exists(key) > 0
 
             return game_id in self._memory_storage
         except Exception as e:
             print(f"⚠️  Redis 检查失败: {e}")
             return game_id in self._memory_storage
 
-    def get_all_game_ids(self) -> list:
+    async def iter_game_id_pages(self, page_size: Optional[int] = None) -> AsyncIterator[List[str]]:
         """
-        获取所有游戏 ID
+        分页遍历所有游戏 ID
+
+        基于 SCAN 游标, 每次只取一页, 不会像 KEYS 那样长时间阻塞 Redis,
+        内存占用与页大小成正比. 遍历期间新增或删除的游戏可能出现也可能不出现,
+        SCAN 也可能重复返回同一个键, 调用方需能容忍
+
+        Args:
+            page_size: 每页扫描的键数 (SCAN COUNT), 默认使用配置中的 REDIS_SCAN_COUNT
+
+        Raises:
+            Exception: 已返回过 Redis 中的页之后 SCAN 失败 (此时改用内存会混入另一份数据)
+        """
+        page_size = page_size or settings.REDIS_SCAN_COUNT
+
+        if self.redis_client:
+            cursor, yielded = 0, False
+            while True:
+                try:
+                    cursor, keys = await self.redis_client.scan(cursor, match="game:*", count=page_size)
+                except Exception as e:
+                    if yielded:
+                        raise
+                    print(f"⚠️  Redis 遍历失败，使用内存: {e}")
+                    break
+                if keys:
+                    yielded = True
+                    yield [key.decode()[5:] for key in keys]
+                if cursor == 0:
+                    return
+
+        game_ids = list(self._memory_storage)
+        for start in range(0, len(game_ids), page_size):
+            yield game_ids[start:start + page_size]
+
+    async def iter_game_ids(self, page_size: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        逐个遍历所有游戏 ID (见 iter_game_id_pages)
+
+        用法:
+            async for game_id in game_storage.iter_game_ids():
+                ...
+        """
+        async for page in self.iter_game_id_pages(page_size):
+            for game_id in page:
+                yield game_id
+
+    async def rebuild_index(self, page_size: Optional[int] = None) -> int:
+        """
+        为缺少摘要的游戏补建摘要、索引与计数 (例如引入摘要索引之前保存的游戏)
 
         Returns:
-            游戏 ID 列表
+            补建的游戏数
         """
-        try:
-            if self.redis_client:
-                keys = self.redis_client.keys("game:*")
-                return [k.decode().replace("game:", "") for k in keys]
+        if not self.redis_client:
+            return 0
 
-            return list(self._memory_storage.keys())
-        except Exception as e:
-            print(f"⚠️  Redis 获取失败: {e}")
-            return list(self._memory_storage.keys())
+        rebuilt = 0
+        async for page in self.iter_game_id_pages(page_size):
+            summaries = await self.redis_client.mget([f"{_SUMMARY_PREFIX}{game_id}" for game_id in page])
+            for game_id, summary in zip(page, summaries):
+                if summary:
+                    continue
+                key = f"game:{game_id}"
+                data, ttl = await self.redis_client.get(key), await self.redis_client.ttl(key)
+                if not data or ttl <= 0:
+                    continue
+                await self._save_redis(game_id, decode_game(data), ttl)
+                rebuilt += 1
+        return rebuilt
 
 
-# 全局实例
+# 全局实例 (应用启动时 connect)
 game_storage = RedisGameStorage()
@@ -0,0 +1,52 @@
+"""
+游戏状态差分 (WebSocket 增量协议)
+
+客户端连接时收到完整快照, 之后每次游戏状态变化只收到补丁:
+    {"type": "snapshot", "seq": 12, "state": {...}}
+    {"type": "patch", "seq": 13, "ops": [[["pot"], 30], [["players", 2, "chips"], 970]]}
+
+每个操作为 [路径, 新值] (设置) 或 [路径] (删除), 路径是从状态根开始的键或下标列表.
+字典逐键比较, 等长列表逐项比较, 长度变化的列表 (发公共牌、玩家加入) 整体替换.
+补丁的 seq 必须等于客户端当前 seq + 1, 否则客户端发送 {"type": "resync"} 重新获取快照
+"""
+from typing import Any, List
+
+
+def diff_state(old: Any, new: Any, path: tuple = ()) -> List[list]:
+    """计算把 old 变为 new 的补丁操作"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append([list(path + (key,)), value])
+            else:
+                ops.extend(diff_state(old[key], value, path + (key,)))
+        ops.extend([list(path + (key,))] for key in old if key not in new)
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for index, (a, b) in enumerate(zip(old, new)):
+            ops.extend(diff_state(a, b, path + (index,)))
+        return ops
+
+    if old == new and type(old) is type(new):
+        return []
+    return [[list(path), new]]
+
+
+def apply_patch(state: Any, ops: List[list]) -> Any:
+    """在状态上应用补丁操作 (原地修改), 返回新的状态 (根路径被替换时)"""
+    for op in ops:
+        path = op[0]
+        if not path:
+            state = op[1]
+            continue
+        target = state
+        for key in path[:-1]:
+            target = target[key]
+        if len(op) == 1:
+            del target[path[-1]]
+        else:
+            target[path[-1]] = op[1]
+    return state
@@ -6,7 +6,14 @@ from contextlib import asynccontextmanager
 from .core.config import settings
 from .core.database import init_db
 from .core.redis import redis_client
-from .routers import games, players, simulation, analytics
+from .core.redis_storage import game_storage
+from .core.game_actors import game_actors
+from .core.broadcast import ws_manager
+from .core.process_pool import shutdown_process_pool
+from .core.metrics import metrics
+from .core.preflop_equity import preflop_table
+from .services.hand_history_queue import hand_history_queue
+from .routers import games, players, simulation, analytics, equity
 
 
 @asynccontextmanager
@@ -22,11 +29,24 @@ async def lifespan(app: FastAPI):
     # 连接Redis
     await redis_client.connect()
     print("✅ Redis连接成功")
+    await game_storage.connect()
+    await game_actors.start()
+    await ws_manager.start(game_storage.redis_client)
+    await hand_history_queue.start(game_storage.redis_client)
+
+    # 映射翻牌前权益表
+    if preflop_table.available:
+        print(f"✅ 翻牌前权益表加载完成 (每格 {preflop_table.samples} 样本)")
 
     yield
 
     # 关闭时
     await redis_client.disconnect()
+    await ws_manager.stop()
+    await game_actors.stop()
+    await hand_history_queue.stop()
+    await game_storage.close()
+    shutdown_process_pool()
     print("👋 服务已关闭")
 
 
@@ -52,6 +72,7 @@ app.include_router(games.router)
 app.include_router(players.router)
 app.include_router(simulation.router)
 app.include_router(analytics.router)
+app.include_router(equity.router)
 
 
 @app.get("/")
@@ -70,6 +91,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """本工作进程的运行指标 (游戏保存次数、版本冲突率、各游戏 WebSocket 发送延迟、手牌记录队列深度等)"""
+    return dict(metrics.snapshot(), websocket=ws_manager.stats(), hand_history=await hand_history_queue.stats())
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,5 +1,5 @@
 """数据库模型"""
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .core.database import Base
@@ -46,6 +46,11 @@ class PlayerStats(Base):
 class Game(Base):
     """游戏记录表"""
     __tablename__ = "games"
+    # 游戏历史按 (started_at, id) 倒序键集分页
+    __table_args__ = (
+        Index("ix_games_started_at_id", "started_at", "id"),
+        Index("ix_games_status_started_at_id", "status", "started_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     game_uuid = Column(String(36), unique=True, nullable=False, index=True)
@@ -65,13 +70,22 @@ class Game(Base):
 class Hand(Base):
     """手牌记录表"""
     __tablename__ = "hands"
+    __table_args__ = (
+        # 每个游戏的每手牌每名玩家一条手牌记录 (写入时 ON CONFLICT 的键)
+        UniqueConstraint("game_id", "hand_no", "player_id", name="uq_hands_game_hand_player"),
+        # 牌型与位置统计按最近 N 手、时间范围或玩家筛选
+        Index("ix_hands_created_at", "created_at"),
+        Index("ix_hands_player_id_created_at", "player_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     game_id = Column(Integer, ForeignKey("games.id"))
+    hand_no = Column(Integer, nullable=False, default=0, server_default="0")  # 该游戏中的第几手牌 (PokerGame.hand_no)
     player_id = Column(Integer)  # 虚拟玩家ID（不关联players表）
     position = Column(Integer)  # 座位位置 0-9
     hole_cards = Column(String(10))  # 底牌, 如 "AhKd"
     final_hand = Column(String(30))  # 最终牌型
+    hand_category = Column(SmallInteger, index=True)  # 获胜牌型类别: HandRank 的值, 其他玩家弃牌获胜为 0, 未获胜为空
     profit_loss = Column(Float, default=0.0)
     is_winner = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
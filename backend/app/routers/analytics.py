@@ -1,6 +1,7 @@
 """数据分析API路由"""
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import Optional
 
 from ..core.database import get_db
@@ -13,18 +14,24 @@ router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 async def get_game_history(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     status: Optional[str] = Query(None, regex="^(finished|playing|waiting)$")
 ):
     """
-    获取游戏历史记录
+    获取游戏历史记录 (按开始时间倒序)
+
+    键集分页: 响应中的 next_cursor 作为下一页的 cursor (为 null 表示没有更多).
+    与旧版 offset 分页不兼容: 不再接受 offset 参数, 响应不再包含 total 与 offset
 
     Args:
         limit: 返回数量 (1-200)
-        offset: 偏移量
+        cursor: 下一页游标 (上一页响应中的 next_cursor)
         status: 游戏状态筛选 (finished/playing/waiting)
     """
-    return await AnalyticsService.get_game_history(db, limit, offset, status)
+    try:
+        return await AnalyticsService.get_game_history(db, limit, cursor, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/games/{game_id}")
@@ -78,26 +85,38 @@ async def get_overall_statistics(
 @router.get("/hand-types")
 async def get_hand_type_distribution(
     db: AsyncSession = Depends(get_db),
-    limit: int = Query(100, ge=10, le=1000)
+    limit: Optional[int] = Query(None, ge=1, le=10_000_000),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    player_id: Optional[int] = Query(None)
 ):
     """
-    获取手牌类型分布统计
+    获取获胜牌型分布统计
 
     Args:
-        limit: 统计最近多少局游戏 (10-1000)
+        limit: 统计最近多少手获胜手牌 (与时间范围都不指定时为 100)
+        start: 开始时间 (含)
+        end: 结束时间 (不含)
+        player_id: 只统计该玩家
     """
-    return await AnalyticsService.get_hand_type_distribution(db, limit)
+    return await AnalyticsService.get_hand_type_distribution(db, limit, start, end, player_id)
 
 
 @router.get("/positions")
 async def get_position_analysis(
     db: AsyncSession = Depends(get_db),
-    limit: int = Query(100, ge=10, le=1000)
+    limit: Optional[int] = Query(None, ge=1, le=10_000_000),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    player_id: Optional[int] = Query(None)
 ):
     """
     获取位置分析（各位置的胜率）
 
     Args:
-        limit: 统计最近多少局 (10-1000)
+        limit: 统计最近多少手 (与时间范围都不指定时为 100)
+        start: 开始时间 (含)
+        end: 结束时间 (不含)
+        player_id: 只统计该玩家
     """
-    return await AnalyticsService.get_position_analysis(db, limit)
+    return await AnalyticsService.get_position_analysis(db, limit, start, end, player_id)
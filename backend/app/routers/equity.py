@@ -0,0 +1,48 @@
+"""权益计算API路由"""
+from fastapi import APIRouter, HTTPException
+
+from ..schemas import EquityRequest
+from ..core.poker import parse_card
+from ..core.equity import calculate_equity, estimate_work
+from ..core.process_pool import run_in_process
+
+router = APIRouter(prefix="/api/equity", tags=["equity"])
+
+# 需要评估的手牌数超过该值时交给进程池, 避免阻塞事件循环
+INLINE_WORK_LIMIT = 50_000
+
+
+@router.post("")
+async def calculate_equity_route(request: EquityRequest):
+    """
+    计算手牌权益
+
+    转牌/河牌等剩余情形较少时精确枚举, 否则按样本预算进行蒙特卡洛抽样,
+    返回胜/平/负概率和置信区间
+    """
+    try:
+        kwargs = {
+            "hole_cards": [parse_card(c) for c in request.hole_cards],
+            "board": [parse_card(c) for c in request.board],
+            "num_opponents": request.num_opponents,
+            "opponent_ranges": request.opponent_ranges,
+            "samples": request.samples,
+        }
+        work = estimate_work(**kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    kwargs["seed"] = request.seed
+    kwargs["confidence"] = request.confidence
+
+    try:
+        if work <= INLINE_WORK_LIMIT:
+            result = calculate_equity(**kwargs)
+        else:
+            result = await run_in_process(calculate_equity, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result["hole_cards"] = request.hole_cards
+    result["board"] = request.board
+    return result
@@ -1,52 +1,30 @@
 """游戏相关API路由"""
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
 from typing import Dict, List
 import uuid
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..schemas import (
     CreateGameRequest, GameResponse, CardResponse,
     PlayerActionRequest, GameStateResponse
 )
-from ..core.poker import PokerGame, GameState
-from ..core.database import get_db
+from ..core.poker import PokerGame, GameState, card_to_dict, cards_to_dicts
+from ..core.database import AsyncSessionLocal
 from ..core.redis_storage import game_storage
+from ..core.game_actors import game_actors
+from ..core.broadcast import ws_manager
+from ..core.msgpack_encoding import NegotiatedRoute, NegotiatedResponse
 from ..services.game_service import GameService
+from ..services.hand_history_queue import hand_history_queue
 from ..ai.smart_dealer import smart_dealer
 from ..ai.decision_maker import ai_decision_maker
 
-router = APIRouter(prefix="/api/games", tags=["games"])
-
-# WebSocket连接管理
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, game_id: str, websocket: WebSocket):
-        await websocket.accept()
-        if game_id not in self.active_connections:
-            self.active_connections[game_id] = []
-        self.active_connections[game_id].append(websocket)
-
-    def disconnect(self, game_id: str, websocket: WebSocket):
-        if game_id in self.active_connections:
-            self.active_connections[game_id].remove(websocket)
-
-    async def broadcast(self, game_id: str, message: dict):
-        if game_id in self.active_connections:
-            for connection in self.active_connections[game_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    pass
-
-
-ws_manager = ConnectionManager()
-
-
-def save_game_state(game_id: str, game: PokerGame):
-    """保存游戏状态到 Redis"""
-    game_storage.save_game(game_id, game)
+# 响应支持 MessagePack (Accept: application/msgpack)
+router = APIRouter(
+    prefix="/api/games",
+    tags=["games"],
+    route_class=NegotiatedRoute,
+    default_response_class=NegotiatedResponse
+)
 
 
 @router.post("", response_model=GameResponse)
@@ -64,8 +42,8 @@ async def create_game(request: CreateGameRequest):
     for i in range(request.num_players):
         game.add_player(player_id=i + 1, chips=1000)
 
-    # 保存到 Redis
-    game_storage.save_game(game_id, game)
+    # 保存到 Redis (由游戏所属的工作进程接管)
+    await game_actors.create(game)
 
     return GameResponse(
         game_id=game_id,
@@ -79,147 +57,63 @@ async def create_game(request: CreateGameRequest):
 
 @router.get("/stats")
 async def get_game_stats():
-    """获取游戏统计数据"""
-    game_ids = game_storage.get_all_game_ids()
-    total_games = len(game_ids)
-
-    active_games = 0
-    finished_games = 0
-    all_players = set()
-    total_hands = 0
-    total_pot = 0
-
-    for game_id in game_ids:
-        game = game_storage.load_game(game_id)
-        if not game:
-            continue
-
-        if game.state not in [GameState.WAITING, GameState.FINISHED]:
-            active_games += 1
-        if game.state == GameState.FINISHED:
-            finished_games += 1
-
-        for player in game.players:
-            all_players.add(player.player_id)
-        if game.state != GameState.WAITING:
-            total_hands += 1
-        total_pot += game.pot
-
-    return {
-        "total_games": total_games,
-        "active_games": active_games,
-        "finished_games": finished_games,
-        "total_players": len(all_players),
-        "total_hands": total_hands,
-        "total_pot": total_pot
-    }
+    """获取游戏统计数据 (读取随每次保存更新的计数器)"""
+    return await game_storage.get_stats()
 
 
 @router.get("/list")
-async def list_games(limit: int = 10, state: str = None):
-    """获取游戏列表"""
-    game_list = []
-    game_ids = game_storage.get_all_game_ids()
-
-    for game_id in game_ids:
-        game = game_storage.load_game(game_id)
-        if not game:
-            continue
-
-        # 状态过滤
-        if state and game.state.value != state:
-            continue
-
-        game_info = {
-            "game_id": game_id,
-            "num_players": len(game.players),
-            "state": game.state.value,
-            "pot": game.pot,
-            "current_bet": game.current_bet,
-            "small_blind": game.small_blind,
-            "big_blind": game.big_blind,
-            "players": [
-                {
-                    "player_id": p.player_id,
-                    "chips": p.chips,
-                    "is_active": p.is_active
-                }
-                for p in game.players
-            ]
-        }
-        game_list.append(game_info)
-
-    # 按创建时间排序（最新的在前）
-    game_list.reverse()
-
-    return game_list[:limit]
-
-
-@router.get("/{game_id}")
-async def get_game(game_id: str, include_hole_cards: bool = False):
-    """获取游戏状态
+async def list_games(limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0), state: str = None):
+    """
+    获取游戏列表 (游戏摘要, 按创建时间倒序分页)
 
     Args:
-        game_id: 游戏ID
-        include_hole_cards: 是否包含所有玩家底牌（调试用）
+        limit: 每页条数
+        offset: 跳过的条数
+        state: 状态过滤
     """
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
+    return await game_storage.list_games(offset=offset, limit=limit, state=state)
+
+
+# ==================== 游戏命令 ====================
+# 修改游戏的逻辑注册为游戏命令, 由游戏所属工作进程上的 Actor 依次执行 (见 core/game_actors.py);
+# 下面的路由只负责调用命令与广播结果
+
+
+@game_actors.command("state", readonly=True)
+async def _state_command(game: PokerGame, include_hole_cards: bool = False):
     return game.get_state(include_hole_cards=include_hole_cards)
 
 
-@router.post("/{game_id}/start")
-async def start_game(game_id: str, db: AsyncSession = Depends(get_db)):
-    """开始游戏"""
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
+@game_actors.command("snapshot", readonly=True)
+async def _snapshot_command(game: PokerGame):
+    return {"seq": game.state_seq, "state": game.get_state()}
+
+
+@game_actors.on_change
+async def _publish_patch(game_id: str, seq: int, ops: list):
+    """游戏状态变化时向所有连接广播补丁"""
+    await ws_manager.broadcast(game_id, {"type": "patch", "seq": seq, "ops": ops})
+
 
+@game_actors.command("start")
+async def _start_command(game: PokerGame):
     try:
         game.start_hand()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # 创建游戏记录
-    try:
-        await GameService.create_game_record(db, game)
-        print(f"[Database] Game {game_id} record created")
-    except Exception as e:
-        # 数据库保存失败不影响游戏
-        import traceback
-        print(f"[Database] Failed to create game record: {str(e)}")
-        print(traceback.format_exc())
-
-    # 保存游戏状态
-    save_game_state(game_id, game)
-
-    # 广播游戏开始
-    await ws_manager.broadcast(game_id, {
-        "type": "game_started",
-        "state": game.get_state()
-    })
-
+    # 命令可能因版本冲突被重新执行, 游戏记录由路由在保存成功后创建
     return {
         "message": "游戏开始",
         "state": game.state.value,
-        "pot": game.pot
+        "pot": game.pot,
+        "game_state": game.get_state(),
+        "game_record": GameService.build_game_record(game)
     }
 
 
-@router.post("/{game_id}/deal")
-async def deal_hole_cards(game_id: str, smart: bool = False):
-    """
-    发底牌
-
-    Args:
-        game_id: 游戏ID
-        smart: 是否使用智能发牌
-    """
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
-
+@game_actors.command("deal")
+async def _deal_command(game: PokerGame, smart: bool = False):
     if game.state != GameState.WAITING:
         raise HTTPException(status_code=400, detail="游戏已经开始")
 
@@ -245,156 +139,69 @@ async def deal_hole_cards(game_id: str, smart: bool = False):
         for i, player in enumerate(game.players):
             player.hole_cards = hole_cards[i]
 
+        game.hand_no += 1
+
         game.state = GameState.PREFLOP
     else:
         game.start_hand()
 
-    # 构建响应
-    response = {
+    return {
         "hole_cards": [
-            [card.to_dict() for card in player.hole_cards]
+            cards_to_dicts(player.hole_cards)
             for player in game.players
         ],
         "deck_remaining": len(game.deck.cards)
     }
 
-    # 保存游戏状态
-    save_game_state(game_id, game)
-
-    # 广播发牌结果
-    await ws_manager.broadcast(game_id, {
-        "type": "cards_dealt",
-        "data": response
-    })
-
-    return response
-
-
-@router.post("/{game_id}/flop")
-async def deal_flop(game_id: str):
-    """发翻牌"""
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
 
+@game_actors.command("flop")
+async def _flop_command(game: PokerGame):
     try:
         flop = game.deal_flop()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return {"cards": cards_to_dicts(flop), "street": "flop"}
 
-    response = {
-        "cards": [card.to_dict() for card in flop],
-        "street": "flop"
-    }
-
-    # 保存游戏状态
-    save_game_state(game_id, game)
-
-    await ws_manager.broadcast(game_id, {
-        "type": "community_cards",
-        "data": response
-    })
-
-    return response
-
-
-@router.post("/{game_id}/turn")
-async def deal_turn(game_id: str):
-    """发转牌"""
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
 
+@game_actors.command("turn")
+async def _turn_command(game: PokerGame):
     try:
         turn = game.deal_turn()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return {"card": card_to_dict(turn), "street": "turn"}
 
-    response = {
-        "card": turn.to_dict(),
-        "street": "turn"
-    }
-
-    # 保存游戏状态
-    save_game_state(game_id, game)
-
-    await ws_manager.broadcast(game_id, {
-        "type": "community_cards",
-        "data": response
-    })
-
-    return response
-
-
-@router.post("/{game_id}/river")
-async def deal_river(game_id: str):
-    """发河牌"""
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
 
+@game_actors.command("river")
+async def _river_command(game: PokerGame):
     try:
         river = game.deal_river()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return {"card": card_to_dict(river), "street": "river"}
 
-    response = {
-        "card": river.to_dict(),
-        "street": "river"
-    }
-
-    # 保存游戏状态
-    save_game_state(game_id, game)
-
-    await ws_manager.broadcast(game_id, {
-        "type": "community_cards",
-        "data": response
-    })
-
-    return response
-
-
-@router.post("/{game_id}/action")
-async def player_action(game_id: str, action: PlayerActionRequest):
-    """处理玩家动作"""
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
 
+@game_actors.command("player_action")
+async def _player_action_command(game: PokerGame, player_id: int, action: str, amount: float = 0):
     try:
         result = game.player_action(
-            player_id=action.player_id,
-            action=action.action,
-            amount=action.amount or 0
+            player_id=player_id,
+            action=action,
+            amount=amount or 0
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    response = {
-        "player_id": action.player_id,
-        "action": action.action,
+    return {
+        "player_id": player_id,
+        "action": action,
         "amount": result.get("amount", 0),
         "game_state": game.get_state()
     }
 
-    # 保存游戏状态
-    save_game_state(game_id, game)
-
-    await ws_manager.broadcast(game_id, {
-        "type": "player_action",
-        "data": response
-    })
-
-    return response
-
-
-@router.post("/{game_id}/showdown")
-async def showdown(game_id: str, db: AsyncSession = Depends(get_db)):
-    """执行摊牌并确定获胜者"""
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
 
+@game_actors.command("showdown")
+async def _showdown_command(game: PokerGame):
     try:
         result = game.showdown()
     except ValueError as e:
@@ -411,54 +218,18 @@ async def showdown(game_id: str, db: AsyncSession = Depends(get_db)):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"摊牌时发生错误: {str(e)}")
 
-    # 保存游戏数据到数据库
-    try:
-        await GameService.finish_game(db, game, result["winners"])
-        print(f"[Database] Game {game_id} data saved successfully")
-    except Exception as e:
-        # 数据库保存失败不影响游戏结果
-        import traceback
-        print(f"[Database] Failed to save game data: {str(e)}")
-        print(traceback.format_exc())
+    # 命令可能因版本冲突被重新执行, 手牌记录由路由在保存成功后放入写入队列
+    return dict(result, hand_record=GameService.build_hand_record(game, result["winners"]))
 
-    # 广播摊牌结果
-    await ws_manager.broadcast(game_id, {
-        "type": "showdown",
-        "data": result
-    })
-
-    return result
-
-
-@router.post("/{game_id}/finish")
-async def finish_game_route(game_id: str, db: AsyncSession = Depends(get_db)):
-    """
-    结束游戏并保存数据（用于非showdown路径，如所有人弃牌）
-    """
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
 
+@game_actors.command("finish", readonly=True)
+async def _finish_command(game: PokerGame):
     # 检查游戏是否已结束
     if game.state.value != 'finished':
         raise HTTPException(status_code=400, detail="游戏尚未结束")
 
-    # 检查数据库中是否已经保存（避免重复保存）
-    from sqlalchemy import select
-    from ..models import Game as GameModel
-    result = await db.execute(
-        select(GameModel).where(GameModel.game_uuid == game_id)
-    )
-    existing_game = result.scalar_one_or_none()
-
-    if existing_game and existing_game.status == "finished":
-        print(f"[Database] Game {game_id} already finished and saved, skipping")
-        # 返回已保存的获胜者信息
-        winners = game.last_winners if hasattr(game, 'last_winners') and game.last_winners else []
-        return {"success": True, "winners": winners, "already_saved": True}
-
     # 获取获胜者信息（已在_advance_state中设置）
-    winners = game.last_winners if hasattr(game, 'last_winners') and game.last_winners else []
+    winners = game.last_winners or []
 
     if not winners:
         # 如果没有winners信息，尝试从当前状态推断
@@ -469,40 +240,20 @@ async def finish_game_route(game_id: str, db: AsyncSession = Depends(get_db)):
                 "player_id": winner.player_id,
                 "hand_description": "其他玩家弃牌",
                 "winnings": 0,  # 底池已经分配
-                "hole_cards": [c.to_dict() for c in winner.hole_cards] if winner.hole_cards else []
+                "hole_cards": cards_to_dicts(winner.hole_cards) if winner.hole_cards else []
             }]
 
-    # 打印调试信息
-    print(f"[Database Debug] Game {game_id} - Players hole cards:")
-    for player in game.players:
-        has_cards = player.hole_cards is not None and len(player.hole_cards) > 0
-        cards_str = str([f"{c.rank}{c.suit}" for c in player.hole_cards]) if has_cards else "None"
-        print(f"  Player {player.player_id}: has_hole_cards={has_cards}, cards={cards_str}")
-
-    print(f"[Database Debug] Game {game_id} - action_history count: {len(game.action_history) if hasattr(game, 'action_history') else 0}")
-
-    # 保存游戏数据到数据库
-    try:
-        await GameService.finish_game(db, game, winners)
-        print(f"[Database] Game {game_id} finished and data saved successfully")
-        return {"success": True, "winners": winners}
-    except Exception as e:
-        import traceback
-        print(f"[Database] Failed to save finished game data: {str(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"保存游戏数据失败: {str(e)}")
-
+    # 手牌记录由路由放入写入队列
+    return {
+        "success": True,
+        "winners": winners,
+        "queued": True,
+        "hand_record": GameService.build_hand_record(game, winners)
+    }
 
-@router.post("/{game_id}/ai-action")
-async def ai_single_action(game_id: str):
-    """
-    让当前玩家执行一次AI决策
 
-    用于前端自动游戏功能
-    """
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
+@game_actors.command("ai_action")
+async def _ai_action_command(game: PokerGame):
     current_player = game.get_current_player()
 
     if not current_player:
@@ -530,36 +281,17 @@ async def ai_single_action(game_id: str):
         player_chips=current_player.chips,
         pot=game.pot,
         game_state=game.state.value,
-        position=current_player.position
+        position=current_player.position,
+        num_opponents=game.active_opponents(current_player)
     )
 
     # 执行动作
     try:
-        result = game.player_action(
+        game.player_action(
             current_player.player_id,
             action,
             amount or 0
         )
-
-        response = {
-            "success": True,
-            "player_id": current_player.player_id,
-            "player_type": player_type,
-            "action": action,
-            "amount": amount or 0,
-            "game_state": game.get_state()
-        }
-
-        # 保存游戏状态
-        save_game_state(game_id, game)
-
-        # 广播AI动作
-        await ws_manager.broadcast(game_id, {
-            "type": "player_action",
-            "data": response
-        })
-
-        return response
     except ValueError as e:
         # 记录详细错误信息
         print(f"[AI Action Error] Player {current_player.player_id}, Action: {action}, Amount: {amount}")
@@ -567,13 +299,209 @@ async def ai_single_action(game_id: str):
         print(f"[AI Action Error] Error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+    return {
+        "success": True,
+        "player_id": current_player.player_id,
+        "player_type": player_type,
+        "action": action,
+        "amount": amount or 0,
+        "game_state": game.get_state()
+    }
+
+
+# ==================== 路由 ====================
+
+
+@router.get("/{game_id}")
+async def get_game(game_id: str, include_hole_cards: bool = False):
+    """获取游戏状态
+
+    Args:
+        game_id: 游戏ID
+        include_hole_cards: 是否包含所有玩家底牌（调试用）
+    """
+    return await game_actors.call(game_id, "state", include_hole_cards=include_hole_cards)
+
+
+@router.post("/{game_id}/start")
+async def start_game(game_id: str):
+    """开始游戏"""
+    response = await game_actors.call(game_id, "start")
+    response.pop("game_state")
+
+    # 创建游戏记录 (命令已保存成功)
+    record = response.pop("game_record")
+    try:
+        async with AsyncSessionLocal() as db:
+            await GameService.create_game_record(db, record)
+        print(f"[Database] Game {game_id} record created")
+    except Exception as e:
+        # 数据库保存失败不影响游戏
+        import traceback
+        print(f"[Database] Failed to create game record: {str(e)}")
+        print(traceback.format_exc())
+
+    # 广播游戏开始 (状态变化已经以补丁广播)
+    await ws_manager.broadcast(game_id, {"type": "game_started"})
+
+    return response
+
+
+@router.post("/{game_id}/deal")
+async def deal_hole_cards(game_id: str, smart: bool = False):
+    """
+    发底牌
+
+    Args:
+        game_id: 游戏ID
+        smart: 是否使用智能发牌
+    """
+    response = await game_actors.call(game_id, "deal", smart=smart)
+
+    # 广播发牌结果
+    await ws_manager.broadcast(game_id, {
+        "type": "cards_dealt",
+        "data": response
+    })
+
+    return response
+
+
+@router.post("/{game_id}/flop")
+async def deal_flop(game_id: str):
+    """发翻牌"""
+    response = await game_actors.call(game_id, "flop")
+
+    await ws_manager.broadcast(game_id, {
+        "type": "community_cards",
+        "data": response
+    })
+
+    return response
+
+
+@router.post("/{game_id}/turn")
+async def deal_turn(game_id: str):
+    """发转牌"""
+    response = await game_actors.call(game_id, "turn")
+
+    await ws_manager.broadcast(game_id, {
+        "type": "community_cards",
+        "data": response
+    })
+
+    return response
+
+
+@router.post("/{game_id}/river")
+async def deal_river(game_id: str):
+    """发河牌"""
+    response = await game_actors.call(game_id, "river")
+
+    await ws_manager.broadcast(game_id, {
+        "type": "community_cards",
+        "data": response
+    })
+
+    return response
+
+
+def _action_event(response: dict) -> dict:
+    """动作广播只带动作本身和游戏阶段, 完整状态已经以补丁广播"""
+    event = {key: value for key, value in response.items() if key != "game_state"}
+    event["state"] = response["game_state"]["state"]
+    return event
+
+
+@router.post("/{game_id}/action")
+async def player_action(game_id: str, action: PlayerActionRequest):
+    """处理玩家动作"""
+    response = await game_actors.call(
+        game_id, "player_action",
+        player_id=action.player_id,
+        action=action.action,
+        amount=action.amount or 0
+    )
+
+    await ws_manager.broadcast(game_id, {
+        "type": "player_action",
+        "data": _action_event(response)
+    })
+
+    return response
+
+
+@router.post("/{game_id}/showdown")
+async def showdown(game_id: str):
+    """执行摊牌并确定获胜者"""
+    result = await game_actors.call(game_id, "showdown")
+
+    # 手牌记录放入写入队列, 由后台任务批量保存到数据库
+    await hand_history_queue.enqueue(result.pop("hand_record"))
+
+    # 广播摊牌结果
+    await ws_manager.broadcast(game_id, {
+        "type": "showdown",
+        "data": result
+    })
+
+    return result
+
+
+@router.post("/{game_id}/finish")
+async def finish_game_route(game_id: str):
+    """
+    结束游戏并保存数据（用于非showdown路径，如所有人弃牌）
+    """
+    response = await game_actors.call(game_id, "finish")
+
+    # 手牌记录放入写入队列 (按 game_uuid + hand_no 幂等, 已保存的手牌由写入任务跳过)
+    record = response.pop("hand_record")
+    await hand_history_queue.enqueue(record)
+    print(f"[Database] Game {game_id} hand history queued ({len(record['actions'])} actions)")
+    return response
+
+
+@router.post("/{game_id}/ai-action")
+async def ai_single_action(game_id: str):
+    """
+    让当前玩家执行一次AI决策
+
+    用于前端自动游戏功能
+    """
+    response = await game_actors.call(game_id, "ai_action")
+
+    # 广播AI动作
+    await ws_manager.broadcast(game_id, {
+        "type": "player_action",
+        "data": _action_event(response)
+    })
+
+    return response
+
 
 @router.websocket("/ws/{game_id}")
 async def game_websocket(websocket: WebSocket, game_id: str):
-    """游戏WebSocket连接"""
-    await ws_manager.connect(game_id, websocket)
+    """
+    游戏WebSocket连接
+
+    连接后先收到完整快照 (snapshot), 之后状态变化以带序号的补丁 (patch) 推送;
+    客户端发现序号不连续时发送 resync 重新获取快照 (协议见 core/state_diff.py).
+    连接时带 ?encoding=msgpack 则推送的消息以 MessagePack 二进制帧发送
+    """
+    binary = websocket.query_params.get("encoding") == "msgpack"
+    await ws_manager.connect(game_id, websocket, binary=binary)
+
+    async def send_snapshot():
+        try:
+            snapshot = await game_actors.call(game_id, "snapshot")
+        except HTTPException:
+            return
+        ws_manager.send(game_id, websocket, dict(snapshot, type="snapshot"))
 
     try:
+        await send_snapshot()
+
         while True:
             data = await websocket.receive_json()
 
@@ -581,17 +509,12 @@ async def game_websocket(websocket: WebSocket, game_id: str):
             msg_type = data.get("type")
 
             if msg_type == "ping":
-                await websocket.send_json({"type": "pong"})
+                ws_manager.send(game_id, websocket, {"type": "pong"})
 
-            elif msg_type == "get_state":
-                game = game_storage.load_game(game_id)
-                if game:
-                    await websocket.send_json({
-                        "type": "game_state",
-                        "data": game.get_state()
-                    })
+            elif msg_type in ("resync", "get_state"):
+                await send_snapshot()
 
     except WebSocketDisconnect:
-        ws_manager.disconnect(game_id, websocket)
+        await ws_manager.disconnect(game_id, websocket)
     except Exception as e:
-        ws_manager.disconnect(game_id, websocket)
+        await ws_manager.disconnect(game_id, websocket)
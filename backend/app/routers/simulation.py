@@ -5,15 +5,34 @@
 """
 
 from fastapi import APIRouter, HTTPException
-from typing import Dict, List
 import asyncio
 
-from ..core.poker import PokerGame, Card
+from ..core.poker import PokerGame, GameState, cards_to_dicts
 from ..ai.decision_maker import ai_decision_maker
-from ..core.redis_storage import game_storage
+from ..ai.smart_dealer import smart_dealer, audit_fairness
+from ..ai.simulator import PLAYER_TYPES
+from ..core.game_actors import game_actors
+from ..core.process_pool import run_in_process
+from ..services.simulation_service import simulation_jobs
+from ..schemas import DealerAuditRequest, SimulationBatchRequest
 
 router = APIRouter(prefix="/api/simulation", tags=["simulation"])
 
+_BETTING_STATES = (GameState.PREFLOP, GameState.FLOP, GameState.TURN, GameState.RIVER)
+
+# 自动运行一手牌的最大动作数 (防止无限循环)
+_MAX_AUTO_PLAY_ACTIONS = 200
+
+# 发牌审计需要评估的手牌数 (发牌次数 × 玩家数) 超过该值时交给进程池, 避免阻塞事件循环
+INLINE_WORK_LIMIT = 20_000
+
+# 进入各条街时记录的日志类型
+_STREET_LOG_TYPES = {
+    GameState.FLOP: "flop_dealt",
+    GameState.TURN: "turn_dealt",
+    GameState.RIVER: "river_dealt",
+}
+
 
 @router.post("/{game_id}/auto-play")
 async def auto_play_game(game_id: str, speed: float = 1.0):
@@ -27,230 +46,92 @@ async def auto_play_game(game_id: str, speed: float = 1.0):
     Returns:
         完整的游戏记录
     """
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
-
-    # 游戏记录
-    game_log = {
-        "game_id": game_id,
-        "actions": [],
-        "winners": []
-    }
-
+    # 开局、每个 AI 动作与摊牌各是一条游戏命令, 间隔在 Actor 之外等待:
+    # 客户端每个动作收到一次补丁, 期间该游戏的其他命令不必等整局结束
     try:
-        # 为每个玩家分配AI类型
-        player_types = {}
-        for player in game.players:
-            player_types[player.player_id] = ai_decision_maker.assign_player_type(
-                player.player_id
-            )
-            game_log["actions"].append({
-                "type": "player_type_assigned",
-                "player_id": player.player_id,
-                "player_type": player_types[player.player_id]
-            })
-
-        # 开始游戏
-        game.start_game()
-        game_log["actions"].append({
-            "type": "game_started",
-            "state": game.state.value
-        })
-
-        await asyncio.sleep(0.5 / speed)
-
-        # 发底牌
-        game.deal_hole_cards()
-        game_log["actions"].append({
-            "type": "hole_cards_dealt",
-            "state": game.state.value
-        })
-
+        started = await game_actors.call(game_id, "auto_play_start")
+        game_log = {
+            "game_id": game_id,
+            "actions": started["actions"],
+            "winners": []
+        }
         await asyncio.sleep(0.5 / speed)
 
-        # 翻牌前下注轮
-        await _run_betting_round(game, game_log, player_types, speed)
-
-        # 发翻牌
-        if game.state.value == "preflop":
-            flop = game.deal_flop()
-            game_log["actions"].append({
-                "type": "flop_dealt",
-                "cards": [c.to_dict() for c in flop],
-                "state": game.state.value
-            })
-            await asyncio.sleep(0.5 / speed)
-
-            # 翻牌圈下注
-            await _run_betting_round(game, game_log, player_types, speed)
-
-        # 发转牌
-        if game.state.value == "flop":
-            turn = game.deal_turn()
-            game_log["actions"].append({
-                "type": "turn_dealt",
-                "card": turn.to_dict(),
-                "state": game.state.value
-            })
-            await asyncio.sleep(0.5 / speed)
-
-            # 转牌圈下注
-            await _run_betting_round(game, game_log, player_types, speed)
-
-        # 发河牌
-        if game.state.value == "turn":
-            river = game.deal_river()
-            game_log["actions"].append({
-                "type": "river_dealt",
-                "card": river.to_dict(),
-                "state": game.state.value
-            })
-            await asyncio.sleep(0.5 / speed)
+        # 逐街下注; 下注轮结束时 PokerGame 会自动发出下一条街的公共牌
+        state = GameState(started["state"])
+        iterations = 0
+        while state in _BETTING_STATES and iterations < _MAX_AUTO_PLAY_ACTIONS:
+            iterations += 1
+            step = await game_actors.call(game_id, "auto_play_step")
+            if step["idle"]:
+                break  # 没有玩家需要行动, 避免死循环
+            game_log["actions"].extend(step["actions"])
+            await asyncio.sleep(0.3 / speed)
 
-            # 河牌圈下注
-            await _run_betting_round(game, game_log, player_types, speed)
-
-        # 摊牌
-        if game.state.value == "river" or game.state.value == "showdown":
-            result = game.showdown()
-            game_log["actions"].append({
-                "type": "showdown",
-                "result": result
-            })
-            game_log["winners"] = result["winners"]
+            street, state = state, GameState(step["state"])
+            if state != street and state in _STREET_LOG_TYPES:
+                community = step["community_cards"]
+                street_log = {"type": _STREET_LOG_TYPES[state], "state": state.value}
+                if state == GameState.FLOP:
+                    street_log["cards"] = community[:3]
+                else:
+                    street_log["card"] = community[-1]
+                game_log["actions"].append(street_log)
+                await asyncio.sleep(0.5 / speed)
+
+        finished = await game_actors.call(game_id, "auto_play_finish")
+        game_log["actions"].extend(finished["actions"])
+        game_log["winners"] = finished["winners"]
 
         return {
             "success": True,
             "game_log": game_log,
-            "final_state": game.get_state()
+            "final_state": finished["final_state"]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"游戏模拟失败: {str(e)}")
 
 
-async def _run_betting_round(
-    game: PokerGame,
-    game_log: Dict,
-    player_types: Dict[int, str],
-    speed: float
-):
-    """运行一轮下注"""
-    max_iterations = 50  # 防止无限循环
-    iteration = 0
-
-    while game.state.value in ["preflop", "flop", "turn", "river"] and iteration < max_iterations:
-        iteration += 1
-
-        current_player = game.get_current_player()
-        if not current_player:
-            break
-
-        # 检查是否需要继续下注
-        active_players = [p for p in game.players if p.is_active and not p.is_all_in]
-        if len(active_players) <= 1:
-            break
-
-        # 检查当前下注轮是否结束
-        if game._is_betting_round_complete():
-            break
-
-        # AI决策
-        player_type = player_types.get(current_player.player_id, "REGULAR")
-        action, amount = ai_decision_maker.make_decision(
-            player_id=current_player.player_id,
-            player_type=player_type,
-            hole_cards=current_player.hole_cards,
-            community_cards=game.community_cards,
-            current_bet=game.current_bet,
-            player_bet=current_player.current_bet,
-            player_chips=current_player.chips,
-            pot=game.pot,
-            game_state=game.state.value,
-            position=current_player.position
+@game_actors.command("auto_play_start")
+async def _auto_play_start_command(game: PokerGame):
+    """为每个玩家分配 AI 类型并开始一手牌 (洗牌、发底牌、收盲注)"""
+    actions = []
+    game._player_types = {}
+    for player in game.players:
+        game._player_types[player.player_id] = ai_decision_maker.assign_player_type(
+            player.player_id
         )
-
-        # 执行动作
-        try:
-            result = game.player_action(
-                current_player.player_id,
-                action,
-                amount or 0
-            )
-
-            game_log["actions"].append({
-                "type": "player_action",
-                "player_id": current_player.player_id,
-                "player_type": player_type,
-                "action": action,
-                "amount": amount or 0,
-                "chips_remaining": current_player.chips,
-                "pot": game.pot
-            })
-
-            await asyncio.sleep(0.3 / speed)
-
-        except ValueError as e:
-            # 如果动作无效，尝试弃牌
-            game_log["actions"].append({
-                "type": "invalid_action",
-                "player_id": current_player.player_id,
-                "attempted_action": action,
-                "error": str(e)
-            })
-
-            try:
-                game.player_action(current_player.player_id, "fold", 0)
-                game_log["actions"].append({
-                    "type": "player_action",
-                    "player_id": current_player.player_id,
-                    "action": "fold",
-                    "amount": 0
-                })
-            except:
-                pass
-
-    # 如果只剩一个活跃玩家，直接结束
-    active_players = [p for p in game.players if p.is_active]
-    if len(active_players) == 1:
-        # 赢家获得底池
-        winner = active_players[0]
-        winner.chips += game.pot
-        game_log["actions"].append({
-            "type": "early_win",
-            "winner_id": winner.player_id,
-            "pot": game.pot
+        actions.append({
+            "type": "player_type_assigned",
+            "player_id": player.player_id,
+            "player_type": game._player_types[player.player_id]
         })
 
-
-@router.post("/{game_id}/single-action")
-async def single_ai_action(game_id: str):
-    """
-    让当前玩家执行一次AI决策
-
-    用于逐步控制游戏进程
-    """
-    game = game_storage.load_game(game_id)
-    if not game:
-        raise HTTPException(status_code=404, detail="游戏不存在")
+    game.start_hand()
+    actions.append({
+        "type": "game_started",
+        "state": game.state.value
+    })
+    actions.append({
+        "type": "hole_cards_dealt",
+        "state": game.state.value
+    })
+    return {"actions": actions, "state": game.state.value}
+
+
+@game_actors.command("auto_play_step")
+async def _auto_play_step_command(game: PokerGame):
+    """当前玩家执行一次 AI 决策, 动作无效时改为弃牌"""
+    actions = []
     current_player = game.get_current_player()
-
-    if not current_player:
-        raise HTTPException(status_code=400, detail="没有当前玩家")
-
-    # 分配玩家类型（如果还没有）
-    if not hasattr(game, '_player_types'):
-        game._player_types = {}
-
-    if current_player.player_id not in game._player_types:
-        game._player_types[current_player.player_id] = ai_decision_maker.assign_player_type(
-            current_player.player_id
-        )
-
-    player_type = game._player_types[current_player.player_id]
+    if game.state not in _BETTING_STATES or not current_player:
+        return {"idle": True, "actions": actions, "state": game.state.value}
 
     # AI决策
+    player_type = getattr(game, "_player_types", {}).get(current_player.player_id, "REGULAR")
     action, amount = ai_decision_maker.make_decision(
         player_id=current_player.player_id,
         player_type=player_type,
@@ -261,24 +142,141 @@ async def single_ai_action(game_id: str):
         player_chips=current_player.chips,
         pot=game.pot,
         game_state=game.state.value,
-        position=current_player.position
+        position=current_player.position,
+        num_opponents=game.active_opponents(current_player)
     )
 
     # 执行动作
     try:
-        result = game.player_action(
+        game.player_action(
             current_player.player_id,
             action,
             amount or 0
         )
 
-        return {
-            "success": True,
+        actions.append({
+            "type": "player_action",
             "player_id": current_player.player_id,
             "player_type": player_type,
             "action": action,
             "amount": amount or 0,
-            "game_state": game.get_state()
-        }
+            "chips_remaining": current_player.chips,
+            "pot": game.pot
+        })
+
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        # 如果动作无效，尝试弃牌
+        actions.append({
+            "type": "invalid_action",
+            "player_id": current_player.player_id,
+            "attempted_action": action,
+            "error": str(e)
+        })
+
+        try:
+            game.player_action(current_player.player_id, "fold", 0)
+            actions.append({
+                "type": "player_action",
+                "player_id": current_player.player_id,
+                "action": "fold",
+                "amount": 0
+            })
+        except:
+            pass
+
+    return {
+        "idle": False,
+        "actions": actions,
+        "state": game.state.value,
+        "community_cards": cards_to_dicts(game.community_cards)
+    }
+
+
+@game_actors.command("auto_play_finish")
+async def _auto_play_finish_command(game: PokerGame):
+    """摊牌 (其他玩家全部弃牌时底池已在 PokerGame 中分配)"""
+    actions = []
+    winners = []
+    if game.state == GameState.SHOWDOWN:
+        result = game.showdown()
+        actions.append({
+            "type": "showdown",
+            "result": result
+        })
+        winners = result["winners"]
+    elif game.state == GameState.FINISHED and game.last_winners:
+        winner = game.last_winners[0]
+        actions.append({
+            "type": "early_win",
+            "winner_id": winner["player_id"],
+            "pot": winner["winnings"]
+        })
+        winners = game.last_winners
+
+    return {
+        "actions": actions,
+        "winners": winners,
+        "final_state": game.get_state()
+    }
+
+
+@router.post("/{game_id}/single-action")
+async def single_ai_action(game_id: str):
+    """
+    让当前玩家执行一次AI决策
+
+    用于逐步控制游戏进程
+    """
+    # 与 /api/games/{game_id}/ai-action 相同的游戏命令
+    return await game_actors.call(game_id, "ai_action")
+
+
+@router.post("/dealer-audit")
+async def audit_smart_dealer(request: DealerAuditRequest):
+    """
+    智能发牌公平性审计
+
+    按给定玩家状态批量模拟发牌并一次性评估所有摊牌,
+    返回各座位胜率与公平性约束的对比
+    """
+    player_states = [state.model_dump() for state in request.player_states]
+    if request.num_deals * len(player_states) <= INLINE_WORK_LIMIT:
+        return smart_dealer.audit_fairness(player_states, request.num_deals)
+    return await run_in_process(audit_fairness, player_states, request.num_deals, smart_dealer.config)
+
+
+@router.post("/batch")
+async def start_batch_simulation(request: SimulationBatchRequest):
+    """
+    提交批量无头模拟任务
+
+    按 shard_size 切分为多个分片在进程池中并行模拟, 每个分片的种子由任务种子
+    确定性派生 (相同请求与种子得到相同结果). 返回任务 ID, 用于查询进度与取消
+    """
+    if request.player_types:
+        invalid = [t for t in request.player_types if t not in PLAYER_TYPES]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"未知的玩家类型: {invalid}")
+    if request.small_blind > request.big_blind:
+        raise HTTPException(status_code=400, detail="小盲注不能大于大盲注")
+
+    job = simulation_jobs.submit(**request.model_dump())
+    return job.to_dict()
+
+
+@router.get("/batch/{job_id}")
+async def get_batch_simulation(job_id: str):
+    """查询批量模拟任务的进度与 (已完成分片的) 合并结果"""
+    job = simulation_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="模拟任务不存在")
+    return job.to_dict()
+
+
+@router.post("/batch/{job_id}/cancel")
+async def cancel_batch_simulation(job_id: str):
+    """取消批量模拟任务, 保留已完成分片的结果"""
+    job = simulation_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="模拟任务不存在")
+    return job.to_dict()
@@ -93,6 +93,46 @@ class CommunityCardsResponse(BaseModel):
     street: str  # flop, turn, river
 
 
+class DealerPlayerState(BaseModel):
+    """智能发牌使用的玩家状态"""
+    player_id: int
+    activity_score: float = Field(default=1.0, ge=0, le=1)  # 活跃度 (0-1)
+    loss_streak: int = Field(default=0, ge=0)  # 连续输牌次数
+    skill_level: float = Field(default=50, ge=0)  # 技术水平
+
+
+class DealerAuditRequest(BaseModel):
+    """智能发牌公平性审计请求"""
+    player_states: List[DealerPlayerState] = Field(..., min_length=2, max_length=10)
+    num_deals: int = Field(default=2000, ge=100, le=50000)
+
+
+class SimulationBatchRequest(BaseModel):
+    """批量模拟任务请求"""
+    hands: int = Field(..., ge=100, le=100_000_000)
+    num_players: int = Field(default=6, ge=2, le=10)
+    shard_size: int = Field(default=2000, ge=100, le=1_000_000)
+    seed: Optional[int] = Field(default=None, ge=0)
+    player_types: Optional[List[str]] = Field(default=None, min_length=1, max_length=10)  # TAG/LAG/PASSIVE/FISH/REGULAR
+    smart_dealing: bool = False
+    starting_chips: float = Field(default=1000, gt=0)
+    small_blind: float = Field(default=1.0, gt=0)
+    big_blind: float = Field(default=2.0, gt=0)
+
+
+# ==================== 权益计算 ====================
+
+class EquityRequest(BaseModel):
+    """权益计算请求"""
+    hole_cards: List[str] = Field(..., min_length=2, max_length=2)  # 如 ["As", "Kd"]
+    board: List[str] = Field(default_factory=list, max_length=5)
+    num_opponents: int = Field(default=1, ge=1, le=9)
+    opponent_ranges: Optional[List[str]] = Field(default=None, min_length=1, max_length=9)  # 如 ["QQ+,AKs", "random"]
+    samples: int = Field(default=20000, ge=1000, le=1000000)
+    seed: Optional[int] = None
+    confidence: float = Field(default=0.95, gt=0, lt=1)
+
+
 # ==================== 玩家动作 ====================
 
 class PlayerActionRequest(BaseModel):
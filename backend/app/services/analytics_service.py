@@ -1,11 +1,53 @@
 """游戏数据分析服务"""
+import base64
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, desc
+from sqlalchemy import select, func, and_, desc, tuple_
 from sqlalchemy.orm import selectinload
 
 from ..models import Game, Hand, Action, Player, PlayerStats
+from ..core.hand_evaluator import HAND_RANK_NAMES
+
+# 牌型类别名称 (hands.hand_category)
+_HAND_CATEGORY_NAMES = {0: "其他玩家弃牌", **{rank.value: name for rank, name in HAND_RANK_NAMES.items()}}
+
+# 未指定统计范围时统计最近多少手
+_DEFAULT_HAND_WINDOW = 100
+
+
+def _hand_window(columns: list, limit: Optional[int], start: Optional[datetime], end: Optional[datetime],
+                 player_id: Optional[int], *conditions):
+    """
+    统计范围内手牌的子查询: 时间范围与玩家筛选后的最近 limit 手
+
+    limit 与时间范围都未指定时取最近 _DEFAULT_HAND_WINDOW 手
+    """
+    query = select(*columns).where(*conditions)
+    if start is not None:
+        query = query.where(Hand.created_at >= start)
+    if end is not None:
+        query = query.where(Hand.created_at < end)
+    if player_id is not None:
+        query = query.where(Hand.player_id == player_id)
+    if limit is None and start is None and end is None:
+        limit = _DEFAULT_HAND_WINDOW
+    if limit is not None:
+        query = query.order_by(desc(Hand.created_at)).limit(limit)
+    return query.subquery()
+
+
+def _encode_cursor(started_at: datetime, game_id: int) -> str:
+    """游戏历史分页游标: 一页最后一个游戏的 (开始时间, ID)"""
+    return base64.urlsafe_b64encode(f"{started_at.isoformat()}|{game_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        started_at, game_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(started_at), int(game_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
 
 
 class AnalyticsService:
@@ -15,49 +57,59 @@ class AnalyticsService:
     async def get_game_history(
         db: AsyncSession,
         limit: int = 50,
-        offset: int = 0,
+        cursor: Optional[str] = None,
         status: Optional[str] = None
     ) -> Dict:
         """
-        获取游戏历史记录
+        获取游戏历史记录 (按开始时间倒序, 键集分页)
+
+        一条查询: 先按 (started_at, id) 取一页游戏, 再左连接只统计这一页游戏的手牌数子查询,
+        不加载手牌记录; 翻页用上一页返回的 next_cursor, 不使用 OFFSET, 深翻页同样快.
+        没有开始时间 (started_at 为空) 的游戏无法参与 (started_at, id) 比较, 不在列表中.
+        不再返回 total (需要全表 COUNT) 与 offset
 
         Args:
             db: 数据库会话
             limit: 返回数量
-            offset: 偏移量
+            cursor: 上一页返回的 next_cursor (为空时从最新的游戏开始)
             status: 游戏状态筛选 (finished/playing/waiting)
 
         Returns:
-            游戏历史列表和统计信息
-        """
-        # 构建查询
-        query = select(Game).options(
-            selectinload(Game.hands)
-        ).order_by(desc(Game.started_at))
+            游戏历史列表和下一页游标 (没有更多时为 None)
 
+        Raises:
+            ValueError: 游标无效
+        """
+        page = select(
+            Game.id, Game.game_uuid, Game.num_players, Game.small_blind, Game.big_blind,
+            Game.total_pot, Game.winner_id, Game.status, Game.started_at, Game.ended_at
+        )
+        page = page.where(Game.started_at.isnot(None))
         if status:
-            query = query.where(Game.status == status)
-
-        # 分页
-        query = query.limit(limit).offset(offset)
-
-        result = await db.execute(query)
-        games = result.scalars().all()
+            page = page.where(Game.status == status)
+        if cursor:
+            started_at, game_id = _decode_cursor(cursor)
+            page = page.where(tuple_(Game.started_at, Game.id) < tuple_(started_at, game_id))
+        # 多取一条判断是否还有下一页
+        page = page.order_by(desc(Game.started_at), desc(Game.id)).limit(limit + 1).subquery()
+
+        hands_counts = (
+            select(Hand.game_id, func.count(Hand.id).label("hands_count"))
+            .where(Hand.game_id.in_(select(page.c.id)))
+            .group_by(Hand.game_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(page, func.coalesce(hands_counts.c.hands_count, 0).label("hands_count"))
+            .outerjoin(hands_counts, hands_counts.c.game_id == page.c.id)
+            .order_by(desc(page.c.started_at), desc(page.c.id))
+        )
+        games = result.all()
 
-        # 统计信息
-        total_query = select(func.count(Game.id))
-        if status:
-            total_query = total_query.where(Game.status == status)
-        total_result = await db.execute(total_query)
-        total = total_result.scalar()
-
-        # 为每个游戏查询手牌数量（使用子查询确保准确）
-        from ..models import Hand
-        game_hands_counts = {}
-        for g in games:
-            hands_count_query = select(func.count(Hand.id)).where(Hand.game_id == g.id)
-            hands_count_result = await db.execute(hands_count_query)
-            game_hands_counts[g.id] = hands_count_result.scalar() or 0
+        next_cursor = None
+        if len(games) > limit:
+            games = games[:limit]
+            next_cursor = _encode_cursor(games[-1].started_at, games[-1].id)
 
         return {
             "games": [
@@ -73,13 +125,12 @@ class AnalyticsService:
                     "started_at": g.started_at.isoformat() if g.started_at else None,
                     "ended_at": g.ended_at.isoformat() if g.ended_at else None,
                     "duration": (g.ended_at - g.started_at).total_seconds() if g.ended_at and g.started_at else None,
-                    "hands_count": game_hands_counts.get(g.id, 0)
+                    "hands_count": g.hands_count
                 }
                 for g in games
             ],
-            "total": total,
             "limit": limit,
-            "offset": offset
+            "next_cursor": next_cursor
         }
 
     @staticmethod
@@ -297,89 +348,97 @@ class AnalyticsService:
     @staticmethod
     async def get_hand_type_distribution(
         db: AsyncSession,
-        limit: int = 100
+        limit: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        player_id: Optional[int] = None
     ) -> Dict:
         """
-        获取手牌类型分布统计
+        获取获胜牌型分布统计 (按写入时记录的牌型类别在数据库中分组)
 
         Args:
             db: 数据库会话
-            limit: 统计最近多少局游戏
+            limit: 统计最近多少手获胜手牌
+            start: 开始时间 (含)
+            end: 结束时间 (不含)
+            player_id: 只统计该玩家
 
         Returns:
             手牌类型分布
         """
-        # 获取最近的手牌记录
+        window = _hand_window(
+            [Hand.hand_category], limit, start, end, player_id, Hand.hand_category.isnot(None)
+        )
         result = await db.execute(
-            select(Hand)
-            .where(Hand.final_hand.isnot(None))
-            .order_by(desc(Hand.created_at))
-            .limit(limit)
+            select(window.c.hand_category, func.count().label("count"))
+            .group_by(window.c.hand_category)
+            .order_by(desc("count"), window.c.hand_category)
         )
-        hands = result.scalars().all()
-
-        # 统计牌型分布
-        hand_type_counts = {}
-        for hand in hands:
-            if hand.final_hand:
-                # 提取牌型名称（去掉具体点数）
-                hand_type = hand.final_hand.split('(')[0].strip() if '(' in hand.final_hand else hand.final_hand
-                hand_type_counts[hand_type] = hand_type_counts.get(hand_type, 0) + 1
+        rows = result.all()
+        total = sum(row.count for row in rows)
 
         return {
-            "total_hands": len(hands),
+            "total_hands": total,
             "distribution": [
-                {"hand_type": k, "count": v, "percentage": (v / len(hands) * 100) if hands else 0}
-                for k, v in sorted(hand_type_counts.items(), key=lambda x: x[1], reverse=True)
+                {
+                    "hand_category": row.hand_category,
+                    "hand_type": _HAND_CATEGORY_NAMES.get(row.hand_category, str(row.hand_category)),
+                    "count": row.count,
+                    "percentage": row.count / total * 100
+                }
+                for row in rows
             ]
         }
 
     @staticmethod
     async def get_position_analysis(
         db: AsyncSession,
-        limit: int = 100
+        limit: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        player_id: Optional[int] = None
     ) -> Dict:
         """
-        获取位置分析（各位置的胜率）
+        获取位置分析（各位置的胜率, 在数据库中按位置分组）
 
         Args:
             db: 数据库会话
-            limit: 统计最近多少局
+            limit: 统计最近多少手
+            start: 开始时间 (含)
+            end: 结束时间 (不含)
+            player_id: 只统计该玩家
 
         Returns:
             位置胜率分析
         """
+        window = _hand_window(
+            [Hand.position, Hand.is_winner, Hand.profit_loss], limit, start, end, player_id
+        )
         result = await db.execute(
-            select(Hand)
-            .order_by(desc(Hand.created_at))
-            .limit(limit)
+            select(
+                window.c.position,
+                func.count().label("total"),
+                func.count().filter(window.c.is_winner.is_(True)).label("wins"),
+                func.coalesce(func.sum(window.c.profit_loss), 0.0).label("profit")
+            )
+            .group_by(window.c.position)
+            .order_by(window.c.position)
         )
-        hands = result.scalars().all()
-
-        position_stats = {}
-        for hand in hands:
-            pos = hand.position
-            if pos not in position_stats:
-                position_stats[pos] = {"total": 0, "wins": 0, "profit": 0.0}
-
-            position_stats[pos]["total"] += 1
-            if hand.is_winner:
-                position_stats[pos]["wins"] += 1
-            position_stats[pos]["profit"] += hand.profit_loss
+        rows = result.all()
 
         position_names = {0: "BTN", 1: "SB", 2: "BB", 3: "UTG", 4: "MP", 5: "CO"}
 
         return {
-            "total_hands": len(hands),
+            "total_hands": sum(row.total for row in rows),
             "positions": [
                 {
-                    "position": pos,
-                    "position_name": position_names.get(pos, f"P{pos+1}"),
-                    "total": stats["total"],
-                    "wins": stats["wins"],
-                    "win_rate": (stats["wins"] / stats["total"] * 100) if stats["total"] > 0 else 0,
-                    "avg_profit": stats["profit"] / stats["total"] if stats["total"] > 0 else 0
+                    "position": row.position,
+                    "position_name": position_names.get(row.position, f"P{row.position+1}"),
+                    "total": row.total,
+                    "wins": row.wins,
+                    "win_rate": row.wins / row.total * 100,
+                    "avg_profit": row.profit / row.total
                 }
-                for pos, stats in sorted(position_stats.items())
+                for row in rows
             ]
         }
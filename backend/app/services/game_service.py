@@ -2,60 +2,73 @@
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, bindparam, case
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 
 from ..models import Game, Hand, Action, Player, PlayerStats
-from ..core.poker import PokerGame, GameState
+from ..core.poker import PokerGame, GameState, CARD_RANKS, CARD_SUITS
+from ..core.hand_evaluator import HandRank
+
+
+def _hand_category(winner: dict) -> int:
+    """获胜牌型类别: HandRank 的值, 其他玩家弃牌获胜 (没有比牌) 为 0"""
+    rank = winner.get("hand_rank")
+    return HandRank[rank].value if rank in HandRank.__members__ else 0
 
 
 class GameService:
     """游戏数据持久化服务"""
 
+    @staticmethod
+    def build_game_record(game: PokerGame) -> dict:
+        """
+        开始一手牌时的游戏记录 (纯数据, 可 JSON 序列化)
+
+        Args:
+            game: 扑克游戏实例
+
+        Returns:
+            create_game_record 的参数
+        """
+        # 只含 games 表的列 (手牌序号只随手牌记录写入 hands 表)
+        return {
+            "game_uuid": game.game_id,
+            "num_players": len(game.players),
+            "small_blind": game.small_blind,
+            "big_blind": game.big_blind,
+            "total_pot": game.pot
+        }
+
     @staticmethod
     async def create_game_record(
         db: AsyncSession,
-        game: PokerGame
+        record: dict
     ) -> Game:
         """
         创建游戏记录
 
         Args:
             db: 数据库会话
-            game: 扑克游戏实例
+            record: build_game_record 的结果
 
         Returns:
             Game: 游戏记录
         """
-        try:
-            game_record = Game(
-                game_uuid=game.game_id,
-                num_players=len(game.players),
-                small_blind=game.small_blind,
-                big_blind=game.big_blind,
-                total_pot=game.pot,
-                status="playing",
-                started_at=datetime.utcnow()
-            )
-            db.add(game_record)
-            await db.commit()
-            await db.refresh(game_record)
-            print(f"[Database] Game {game.game_id} record created")
-            return game_record
-        except Exception as e:
-            # 如果记录已存在（重复key），回滚并查询现有记录
-            await db.rollback()
-            if "duplicate key" in str(e) or "UniqueViolation" in str(e):
-                print(f"[Database] Game {game.game_id} already exists, fetching existing record")
-                result = await db.execute(
-                    select(Game).where(Game.game_uuid == game.game_id)
-                )
-                existing_record = result.scalar_one()
-                return existing_record
-            else:
-                # 其他错误继续抛出
-                print(f"[Database] Failed to create game record: {e}")
-                raise
+        # 已存在时 (同一游戏的后续手牌) 不修改, 只返回现有记录
+        stmt = insert(Game).values(
+            **record,
+            status="playing",
+            started_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Game.game_uuid],
+            set_={"game_uuid": stmt.excluded.game_uuid}
+        ).returning(Game)
+        result = await db.execute(stmt)
+        game_record = result.scalar_one()
+        await db.commit()
+        return game_record
 
     @staticmethod
     async def update_game_status(
@@ -75,21 +88,16 @@ class GameService:
             winner_id: 获胜者ID
             total_pot: 总底池
         """
-        result = await db.execute(
-            select(Game).where(Game.game_uuid == game_uuid)
-        )
-        game_record = result.scalar_one_or_none()
-
-        if game_record:
-            game_record.status = status
-            if winner_id is not None:
-                game_record.winner_id = winner_id
-            if total_pot is not None:
-                game_record.total_pot = total_pot
-            if status == "finished":
-                game_record.ended_at = datetime.utcnow()
-
-            await db.commit()
+        values = {"status": status}
+        if winner_id is not None:
+            values["winner_id"] = winner_id
+        if total_pot is not None:
+            values["total_pot"] = total_pot
+        if status == "finished":
+            values["ended_at"] = datetime.utcnow()
+
+        await db.execute(update(Game).where(Game.game_uuid == game_uuid).values(**values))
+        await db.commit()
 
     @staticmethod
     async def save_hand(
@@ -100,10 +108,12 @@ class GameService:
         hole_cards: str,
         final_hand: Optional[str] = None,
         profit_loss: float = 0.0,
-        is_winner: bool = False
+        is_winner: bool = False,
+        hand_category: Optional[int] = None,
+        hand_no: int = 0
     ) -> Hand:
         """
-        保存手牌记录
+        保存手牌记录 (同一游戏同一手牌同一玩家已有记录时覆盖)
 
         Args:
             db: 数据库会话
@@ -114,22 +124,29 @@ class GameService:
             final_hand: 最终牌型
             profit_loss: 盈亏
             is_winner: 是否获胜
+            hand_category: 获胜牌型类别 (HandRank 的值, 其他玩家弃牌获胜为 0)
+            hand_no: 该游戏中的第几手牌 (PokerGame.hand_no)
 
         Returns:
             Hand: 手牌记录
         """
-        hand_record = Hand(
-            game_id=game_id,
-            player_id=player_id,
+        values = dict(
             position=position,
             hole_cards=hole_cards,
             final_hand=final_hand,
             profit_loss=profit_loss,
-            is_winner=is_winner
+            is_winner=is_winner,
+            hand_category=hand_category
         )
-        db.add(hand_record)
+        stmt = insert(Hand).values(game_id=game_id, hand_no=hand_no, player_id=player_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Hand.game_id, Hand.hand_no, Hand.player_id],
+            set_=values
+        ).returning(Hand)
+        # 会话中已加载过该手牌时以覆盖后的行刷新, 而不是返回身份映射中的旧对象
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        hand_record = result.scalar_one()
         await db.commit()
-        await db.refresh(hand_record)
         return hand_record
 
     @staticmethod
@@ -188,40 +205,199 @@ class GameService:
             profit: 盈亏
             played_hand: 是否参与了这手牌
         """
-        # 获取或创建玩家统计
-        result = await db.execute(
-            select(PlayerStats).where(PlayerStats.player_id == player_id)
+        stats = PlayerStats.__table__
+        stmt = insert(stats).values(
+            player_id=player_id,
+            total_games=0,
+            total_hands=1 if played_hand else 0,
+            wins=1 if won else 0,
+            vpip=0.0,
+            pfr=0.0,
+            af=0.0,
+            win_rate=100.0 if won and played_hand else 0.0,
+            total_profit=profit
         )
-        stats = result.scalar_one_or_none()
-
-        if not stats:
-            stats = PlayerStats(
-                player_id=player_id,
-                total_games=0,
-                total_hands=0,
-                wins=0,
-                vpip=0.0,
-                pfr=0.0,
-                af=0.0,
-                win_rate=0.0,
-                total_profit=0.0
-            )
-            db.add(stats)
+        # 已有统计时在原值上累加, 胜率按累加后的值计算
+        total_hands = stats.c.total_hands + stmt.excluded.total_hands
+        wins = stats.c.wins + stmt.excluded.wins
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[stats.c.player_id],
+            set_={
+                "total_hands": total_hands,
+                "wins": wins,
+                "total_profit": stats.c.total_profit + stmt.excluded.total_profit,
+                "win_rate": case((total_hands > 0, wins * 100.0 / total_hands), else_=stats.c.win_rate)
+            }
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+    @staticmethod
+    def build_hand_record(game: PokerGame, winners: List[dict]) -> dict:
+        """
+        把一手牌整理为批量写入用的记录 (纯数据, 可 JSON 序列化)
 
-        # 更新统计
-        if played_hand:
-            stats.total_hands += 1
+        Args:
+            game: 扑克游戏实例
+            winners: 获胜者信息列表
+
+        Returns:
+            {游戏字段..., "hand_no": 手牌序号, "hands": [每名有底牌玩家的手牌], "actions": [这些玩家的动作]}
+        """
+        winner_info = {w["player_id"]: w for w in winners}
+        hands = []
+        for player in game.players:
+            if not player.hole_cards:
+                continue
+            winner = winner_info.get(player.player_id)
+            hands.append({
+                "player_id": player.player_id,
+                "position": player.position,
+                "hole_cards": "".join(f"{CARD_RANKS[c]}{CARD_SUITS[c]}" for c in player.hole_cards),
+                "final_hand": winner["hand_description"] if winner else None,
+                "hand_category": _hand_category(winner) if winner else None,
+                # 盈亏 = 赢得的筹码 - 总投入
+                "profit_loss": (winner["winnings"] if winner else 0.0) - player.total_bet,
+                "is_winner": winner is not None
+            })
+
+        # 只保存已记录手牌的玩家的动作
+        seated = {hand["player_id"] for hand in hands}
+        actions = [
+            {
+                "player_id": action["player_id"],
+                "street": action["street"].lower(),
+                "action_type": action["action"].lower(),
+                "amount": action["amount"],
+                "pot_size": action["pot_after"]
+            }
+            for action in game.action_history if action["player_id"] in seated
+        ]
+
+        return {
+            "game_uuid": game.game_id,
+            "hand_no": game.hand_no,
+            "num_players": len(game.players),
+            "small_blind": game.small_blind,
+            "big_blind": game.big_blind,
+            "total_pot": game.pot,
+            "winner_id": winners[0]["player_id"] if len(winners) == 1 else None,
+            "hands": hands,
+            "actions": actions
+        }
 
-        if won:
-            stats.wins += 1
+    @staticmethod
+    async def save_hand_records(db: AsyncSession, records: List[dict]) -> dict:
+        """
+        在一个事务中批量写入若干手牌记录 (build_hand_record 的结果)
 
-        stats.total_profit += profit
+        每批固定的几次往返, 与玩家数和动作数无关:
+        一条 INSERT ... ON CONFLICT 取得/创建全部游戏记录, 一条多行 INSERT ... RETURNING 写入全部手牌并取回 ID,
+        一次 executemany 写入全部动作, 一次 executemany 更新游戏的最近结果
 
-        # 计算胜率
-        if stats.total_hands > 0:
-            stats.win_rate = (stats.wins / stats.total_hands) * 100
+        同一游戏 (同一 game_id 连续开局) 的每手牌按 (game_uuid, hand_no) 区分, 写入幂等, 重放整批是安全的:
+        同一批中重复的手牌被跳过, 手牌以 ON CONFLICT DO NOTHING 写入, 只为本次新写入的手牌保存动作,
+        已全部写入过的手牌不再更新游戏记录
+
+        Returns:
+            {"records": 写入的手牌记录数, "hands": 玩家手牌数, "actions": 动作数, "skipped": 跳过的记录数}
+        """
+        games = Game.__table__
+        now = datetime.utcnow()
+
+        # 同一批中同一手牌只保留第一条 (入队时还没有 hand_no 的旧记录按 0 处理)
+        total = len(records)
+        pending = {}
+        for record in records:
+            pending.setdefault((record["game_uuid"], record.get("hand_no", 0)), record)
+        if not pending:
+            return {"records": 0, "hands": 0, "actions": 0, "skipped": 0}
+
+        # 游戏记录: 没有的 (开始时未能创建) 创建, 已有的不修改, 一条语句取回全部 ID
+        new_games = {}
+        for record in pending.values():
+            new_games.setdefault(record["game_uuid"], {
+                "game_uuid": record["game_uuid"],
+                "num_players": record["num_players"],
+                "small_blind": record["small_blind"],
+                "big_blind": record["big_blind"],
+                "total_pot": record["total_pot"],
+                "status": "playing",
+                "started_at": now
+            })
+        stmt = insert(games).values(list(new_games.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[games.c.game_uuid],
+            set_={"game_uuid": stmt.excluded.game_uuid}
+        ).returning(games.c.game_uuid, games.c.id)
+        result = await db.execute(stmt)
+        game_ids = dict(result.all())
+
+        # 手牌: 一条多行 INSERT ... ON CONFLICT DO NOTHING RETURNING (只返回新写入的手牌)
+        hand_rows = [
+            # 入队时还没有 hand_category 的旧记录按空值写入
+            dict({"hand_category": None}, **hand, game_id=game_ids[game_uuid], hand_no=hand_no)
+            for (game_uuid, hand_no), record in pending.items() for hand in record["hands"]
+        ]
+        hand_ids = {}
+        if hand_rows:
+            hands = Hand.__table__
+            result = await db.execute(
+                insert(hands).values(hand_rows)
+                .on_conflict_do_nothing(index_elements=[hands.c.game_id, hands.c.hand_no, hands.c.player_id])
+                .returning(hands.c.id, hands.c.game_id, hands.c.hand_no, hands.c.player_id)
+            )
+            hand_ids = {
+                (game_id, hand_no, player_id): hand_id
+                for hand_id, game_id, hand_no, player_id in result.all()
+            }
+
+        # 本次写入了手牌的记录 (其余已在之前写入)
+        written = {(game_id, hand_no) for game_id, hand_no, _ in hand_ids}
+        records = [
+            (game_ids[game_uuid], hand_no, record)
+            for (game_uuid, hand_no), record in pending.items()
+            if (game_ids[game_uuid], hand_no) in written
+        ]
+
+        # 动作: executemany
+        action_rows = []
+        for game_id, hand_no, record in records:
+            for action in record["actions"]:
+                hand_id = hand_ids.get((game_id, hand_no, action["player_id"]))
+                if hand_id is not None:
+                    action_rows.append(dict(action, hand_id=hand_id))
+        if action_rows:
+            await db.execute(insert(Action.__table__), action_rows)
+
+        # 游戏记录更新为最近一手牌的结果
+        if records:
+            await db.execute(
+                update(games)
+                .where(games.c.id == bindparam("b_id"))
+                .values(
+                    status="finished",
+                    winner_id=bindparam("b_winner_id"),
+                    total_pot=bindparam("b_total_pot"),
+                    ended_at=now
+                ),
+                [
+                    {
+                        "b_id": game_id,
+                        "b_winner_id": record["winner_id"],
+                        "b_total_pot": record["total_pot"]
+                    }
+                    for game_id, _, record in sorted(records, key=lambda item: item[:2])
+                ]
+            )
 
         await db.commit()
+        return {
+            "records": len(records),
+            "hands": len(hand_ids),
+            "actions": len(action_rows),
+            "skipped": total - len(records)
+        }
 
     @staticmethod
     async def finish_game(
@@ -230,111 +406,15 @@ class GameService:
         winners: List[dict]
     ):
         """
-        完成游戏并保存所有数据
+        完成游戏并保存所有数据 (游戏、全部手牌与动作在一个事务中批量写入)
 
         Args:
             db: 数据库会话
             game: 扑克游戏实例
             winners: 获胜者信息列表
         """
-        # 获取游戏记录
-        result = await db.execute(
-            select(Game).where(Game.game_uuid == game.game_id)
-        )
-        game_record = result.scalar_one_or_none()
-
-        if not game_record:
-            # 如果没有游戏记录，创建一个
-            game_record = await GameService.create_game_record(db, game)
-
-        # 保存每个玩家的手牌记录
-        saved_hands_count = 0
-        skipped_players_count = 0
-        player_hand_ids = {}  # 记录每个玩家的hand_id，用于后续保存action
-
-        for player in game.players:
-            if not player.hole_cards:
-                print(f"[GameService] Skipping player {player.player_id} - no hole cards")
-                skipped_players_count += 1
-                continue
-
-            # 检查是否是获胜者
-            is_winner = any(w["player_id"] == player.player_id for w in winners)
-            winnings = 0.0
-
-            if is_winner:
-                winner_info = next(w for w in winners if w["player_id"] == player.player_id)
-                winnings = winner_info["winnings"]
-
-            # 计算盈亏（赢得的筹码 - 总投入）
-            profit_loss = winnings - player.total_bet
-
-            # 将底牌转换为字符串格式
-            hole_cards_str = "".join([f"{c.rank}{c.suit}" for c in player.hole_cards])
-
-            # 获取最终牌型
-            final_hand = None
-            if is_winner:
-                winner_info = next(w for w in winners if w["player_id"] == player.player_id)
-                final_hand = winner_info["hand_description"]
-
-            # 保存手牌记录
-            hand_record = await GameService.save_hand(
-                db=db,
-                game_id=game_record.id,
-                player_id=player.player_id,
-                position=player.position,
-                hole_cards=hole_cards_str,
-                final_hand=final_hand,
-                profit_loss=profit_loss,
-                is_winner=is_winner
-            )
-
-            player_hand_ids[player.player_id] = hand_record.id
-            saved_hands_count += 1
-            print(f"[GameService] Saved hand for player {player.player_id}, hand_id={hand_record.id}")
-
-            # 更新玩家统计（仅限真实玩家，虚拟玩家ID 1-10跳过）
-            # 虚拟玩家不需要更新统计数据
-            # if player.player_id > 10:  # 假设真实玩家ID > 10
-            #     await GameService.update_player_stats(
-            #         db=db,
-            #         player_id=player.player_id,
-            #         won=is_winner,
-            #         profit=profit_loss,
-            #         played_hand=True
-            #     )
-
-        print(f"[GameService] Total hands saved: {saved_hands_count}, skipped: {skipped_players_count}")
-
-        # 保存所有玩家动作
-        saved_actions_count = 0
-        if hasattr(game, 'action_history') and game.action_history:
-            print(f"[GameService] Saving {len(game.action_history)} actions...")
-            for action in game.action_history:
-                player_id = action["player_id"]
-                # 只保存已记录手牌的玩家的动作
-                if player_id in player_hand_ids:
-                    await GameService.save_action(
-                        db=db,
-                        hand_id=player_hand_ids[player_id],
-                        player_id=player_id,
-                        street=action["street"],
-                        action_type=action["action"],
-                        amount=action["amount"],
-                        pot_size=action["pot_after"]
-                    )
-                    saved_actions_count += 1
-            print(f"[GameService] Total actions saved: {saved_actions_count}")
+        counts = await GameService.save_hand_records(db, [GameService.build_hand_record(game, winners)])
+        if counts["skipped"]:
+            print(f"[GameService] Game {game.game_id} hand {game.hand_no} already saved, skipping")
         else:
-            print(f"[GameService] No action history to save")
-
-        # 更新游戏状态为已完成
-        winner_id = winners[0]["player_id"] if len(winners) == 1 else None
-        await GameService.update_game_status(
-            db=db,
-            game_uuid=game.game_id,
-            status="finished",
-            winner_id=winner_id,
-            total_pot=game.pot
-        )
+            print(f"[GameService] Game {game.game_id} saved: {counts['hands']} hands, {counts['actions']} actions")
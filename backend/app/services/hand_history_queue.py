@@ -0,0 +1,196 @@
+"""
+手牌记录写入队列
+
+摊牌 / 结束游戏时只把手牌记录 (GameService.build_hand_record) 追加到 Redis 流 hand_history,
+不等待数据库. 每个工作进程有一个后台写入任务, 以消费组 hand_history_writers 读取流,
+把一次读到的多手牌在一个事务中写入 (GameService.save_hand_records), 提交后确认并删除这些条目.
+
+- 写入按 (game_uuid, hand_no) 幂等 (同一游戏连续开局的每手牌分别写入), 失败后整批重试 (指数退避), 超过 HAND_HISTORY_MAX_RETRIES 次
+  的批次移入 hand_history:failed 流, 可在修复后重新追加到 hand_history
+- 工作进程退出时未确认的条目留在流中, 空闲超过 HAND_HISTORY_CLAIM_IDLE 秒后由其他进程接管
+- 队列深度 (流长度) 与最早一条记录的等待时间见 GET /metrics
+
+Redis 不可用时在后台任务中直接写入数据库 (不持久)
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import List, Optional, Set
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.metrics import metrics
+from .game_service import GameService
+
+_STREAM = "hand_history"
+_FAILED_STREAM = "hand_history:failed"
+_GROUP = "hand_history_writers"
+
+
+def _entry_time(entry_id: bytes) -> float:
+    """流条目 ID (毫秒时间戳-序号) 中的追加时间 (秒)"""
+    return int(entry_id.split(b"-", 1)[0]) / 1000
+
+
+class HandHistoryQueue:
+    """手牌记录的持久写入队列与批量写入任务"""
+
+    def __init__(self):
+        self.consumer = uuid.uuid4().hex[:12]
+        self.redis_client = None
+        self._task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+
+    async def start(self, redis_client):
+        """创建消费组并启动写入任务 (连接 Redis 后调用; redis_client 为 None 时直接写数据库)"""
+        if redis_client is None:
+            return
+        try:
+            await redis_client.xgroup_create(_STREAM, _GROUP, id="0", mkstream=True)
+        except Exception as e:
+            # 消费组已存在
+            if "BUSYGROUP" not in str(e):
+                print(f"⚠️  创建手牌记录消费组失败，直接写入数据库: {e}")
+                return
+        self.redis_client = redis_client
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ 手牌记录写入队列已启动: 消费者 {self.consumer}")
+
+    async def stop(self):
+        """停止写入任务 (未写入的条目留在流中), 等待直接写入的后台任务完成"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                # 没有未确认条目时移除本进程的消费者, 避免消费组中积累已退出的消费者
+                pending = await self.redis_client.xpending_range(_STREAM, _GROUP, "-", "+", 1, consumername=self.consumer)
+                if not pending:
+                    await self.redis_client.xgroup_delconsumer(_STREAM, _GROUP, self.consumer)
+            except Exception as e:
+                print(f"⚠️  移除手牌记录消费者失败: {e}")
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        self.redis_client = None
+
+    async def enqueue(self, record: dict):
+        """追加一手牌的记录 (不等待数据库)"""
+        metrics.inc("hand_history_enqueued")
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.xadd(_STREAM, {"record": json.dumps(record)})
+                return
+            except Exception as e:
+                print(f"⚠️  手牌记录入队失败，直接写入数据库: {e}")
+        task = asyncio.create_task(self._save_direct(record))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def stats(self) -> dict:
+        """队列深度与最早一条未写入记录的等待时间 (秒)"""
+        if self.redis_client is None:
+            return {"depth": 0, "oldest_age": 0.0, "failed": 0}
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.xlen(_STREAM)
+                pipe.xrange(_STREAM, count=1)
+                pipe.xlen(_FAILED_STREAM)
+                depth, oldest, failed = await pipe.execute()
+        except Exception as e:
+            return {"error": str(e)}
+        return {
+            "depth": depth,
+            "oldest_age": time.time() - _entry_time(oldest[0][0]) if oldest else 0.0,
+            "failed": failed
+        }
+
+    async def _save(self, records: List[dict]) -> dict:
+        async with AsyncSessionLocal() as db:
+            return await GameService.save_hand_records(db, records)
+
+    async def _save_direct(self, record: dict):
+        try:
+            await self._save([record])
+            metrics.inc("hand_history_written")
+        except Exception as e:
+            metrics.inc("hand_history_failed")
+            print(f"[Database] Failed to save game {record['game_uuid']}: {e}")
+
+    async def _run(self):
+        """写入任务: 先接管其他进程遗留的条目, 再读取新条目, 每次读到的条目在一个事务中写入"""
+        while True:
+            try:
+                entries = await self._claim()
+                if not entries:
+                    response = await self.redis_client.xreadgroup(
+                        _GROUP, self.consumer, {_STREAM: ">"},
+                        count=settings.HAND_HISTORY_BATCH_SIZE,
+                        block=int(settings.HAND_HISTORY_BLOCK * 1000)
+                    )
+                    entries = response[0][1] if response else []
+                if entries:
+                    await self._write(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  读取手牌记录队列失败: {e}")
+                await asyncio.sleep(1)
+
+    async def _claim(self) -> list:
+        """接管空闲超过 HAND_HISTORY_CLAIM_IDLE 秒的未确认条目 (其他进程写入中途退出)"""
+        response = await self.redis_client.xautoclaim(
+            _STREAM, _GROUP, self.consumer,
+            min_idle_time=int(settings.HAND_HISTORY_CLAIM_IDLE * 1000),
+            start_id="0-0",
+            count=settings.HAND_HISTORY_BATCH_SIZE
+        )
+        # 已被删除的条目字段为空
+        return [(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+    async def _write(self, entries: list):
+        """在一个事务中写入一批条目, 失败时退避重试, 成功后确认并删除"""
+        ids = [entry_id for entry_id, _ in entries]
+        records = [json.loads(fields[b"record"]) for _, fields in entries]
+
+        for attempt in range(settings.HAND_HISTORY_MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                counts = await self._save(records)
+                break
+            except Exception as e:
+                metrics.inc("hand_history_write_errors")
+                print(f"⚠️  手牌记录写入失败 (第 {attempt + 1} 次, {len(records)} 手): {e}")
+                if attempt < settings.HAND_HISTORY_MAX_RETRIES:
+                    await asyncio.sleep(min(0.5 * 2 ** attempt, 30))
+        else:
+            # 多次重试仍失败, 移入失败流, 不阻塞后续记录
+            metrics.inc("hand_history_failed", len(records))
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for _, fields in entries:
+                    pipe.xadd(_FAILED_STREAM, fields)
+                pipe.xack(_STREAM, _GROUP, *ids)
+                pipe.xdel(_STREAM, *ids)
+                await pipe.execute()
+            return
+
+        now = time.time()
+        metrics.observe("hand_history_batch", time.perf_counter() - start)
+        metrics.inc("hand_history_batches")
+        metrics.inc("hand_history_written", counts["records"])
+        metrics.inc("hand_history_skipped", counts["skipped"])
+        for entry_id in ids:
+            # 从入队到写入数据库的延迟
+            metrics.observe("hand_history_lag", now - _entry_time(entry_id))
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.xack(_STREAM, _GROUP, *ids)
+            pipe.xdel(_STREAM, *ids)
+            await pipe.execute()
+
+
+# 全局实例 (应用启动时 start)
+hand_history_queue = HandHistoryQueue()
@@ -0,0 +1,200 @@
+"""
+批量模拟服务
+
+把大批量无头模拟拆成若干分片, 分发到进程池 (每核一个工作进程) 并行执行.
+每个分片使用由任务种子派生的确定性种子, 完成后把分片汇总结果回传主进程合并,
+任务支持进度查询与取消. 每个任务同时在途的分片数不超过进程池大小,
+其余分片在前面的分片完成后再提交, 因此不会长期占满进程池队列, 取消也能立即生效
+"""
+import asyncio
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..ai.simulator import SimulationStats, run_simulation
+from ..core.process_pool import get_process_pool, process_pool_size
+
+# 保留的任务数上限, 超出时丢弃最早结束的任务
+MAX_RETAINED_JOBS = 100
+
+
+def shard_seed(seed: int, index: int) -> int:
+    """
+    由任务种子派生第 index 个分片的独立种子 (同一种子总得到相同结果)
+
+    与 SeedSequence(seed).spawn(n)[index] 相同, 但不需要先生成全部 n 个子序列,
+    分片在提交时才计算种子
+    """
+    return int(np.random.SeedSequence(seed, spawn_key=(index,)).generate_state(1)[0])
+
+
+@dataclass
+class SimulationJob:
+    """批量模拟任务"""
+    job_id: str
+    seed: int
+    hands: int
+    shard_size: int
+    params: dict
+    next_shard: int = 0
+    status: str = "running"  # running / completed / cancelled / failed
+    completed_shards: int = 0
+    failed_shards: int = 0
+    hands_completed: int = 0
+    error: Optional[str] = None
+    stats: SimulationStats = field(default_factory=SimulationStats)
+    futures: List[Future] = field(default_factory=list, repr=False)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    wall_time: float = 0.0
+
+    @property
+    def total_shards(self) -> int:
+        return -(-self.hands // self.shard_size)
+
+    def shard_hands(self, index: int) -> int:
+        """第 index 个分片的手数 (最后一个分片为余数)"""
+        return min(self.shard_size, self.hands - index * self.shard_size)
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def to_dict(self) -> dict:
+        wall_time = self.wall_time if self.finished else time.perf_counter() - self.started
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "seed": self.seed,
+            "params": self.params,
+            "progress": self.completed_shards / self.total_shards if self.total_shards else 1.0,
+            "total_shards": self.total_shards,
+            "completed_shards": self.completed_shards,
+            "failed_shards": self.failed_shards,
+            "hands": self.hands,
+            "hands_completed": self.hands_completed,
+            "wall_time": wall_time,
+            "hands_per_sec": self.hands_completed / wall_time if wall_time else 0.0,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "results": self.stats.to_dict()
+        }
+
+
+class SimulationJobManager:
+    """批量模拟任务管理器 (任务状态保存在当前进程内)"""
+
+    def __init__(self):
+        self._jobs: Dict[str, SimulationJob] = {}
+
+    def submit(
+        self,
+        hands: int,
+        shard_size: int = 2000,
+        seed: Optional[int] = None,
+        **params
+    ) -> SimulationJob:
+        """
+        提交批量模拟任务 (需在事件循环中调用)
+
+        Args:
+            hands: 总手数
+            shard_size: 每个分片的手数
+            seed: 任务种子, 不传时随机生成 (结果中返回以便复现)
+            **params: 传给 run_simulation 的桌面参数 (num_players、player_types 等)
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+
+        job = SimulationJob(
+            job_id=str(uuid.uuid4())[:8],
+            seed=seed,
+            hands=hands,
+            shard_size=shard_size,
+            params=params
+        )
+        job.stats.big_blind = params.get("big_blind", job.stats.big_blind)
+
+        loop = asyncio.get_running_loop()
+        for _ in range(min(process_pool_size(), job.total_shards)):
+            self._submit_next(job, loop)
+
+        self._jobs[job.job_id] = job
+        self._prune()
+        print(f"🎲 批量模拟任务 {job.job_id}: {hands} 手, {job.total_shards} 个分片, 种子 {seed}")
+        return job
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        """取消任务: 尚未开始的分片不再执行, 已完成分片的结果保留"""
+        job = self._jobs.get(job_id)
+        if job and not job.finished:
+            for future in job.futures:
+                future.cancel()
+            self._finish(job, "cancelled")
+        return job
+
+    def _submit_next(self, job: SimulationJob, loop: asyncio.AbstractEventLoop):
+        """提交任务的下一个分片"""
+        index = job.next_shard
+        job.next_shard += 1
+        future = get_process_pool().submit(
+            run_simulation,
+            job.shard_hands(index),
+            seed=shard_seed(job.seed, index),
+            **job.params
+        )
+        future.add_done_callback(
+            lambda f: loop.call_soon_threadsafe(self._on_shard_done, job, index, f, loop)
+        )
+        job.futures.append(future)
+
+    def _on_shard_done(self, job: SimulationJob, index: int, future: Future, loop: asyncio.AbstractEventLoop):
+        """分片完成回调 (在事件循环线程中执行), 合并分片结果并提交下一个分片"""
+        if future.cancelled() or job.finished:
+            return
+
+        error = future.exception()
+        if error is not None:
+            job.failed_shards += 1
+            job.error = f"分片 {index} 失败: {error}"
+            for other in job.futures:
+                other.cancel()
+            self._finish(job, "failed")
+            return
+
+        job.futures.remove(future)
+        job.stats.merge(SimulationStats.from_dict(future.result()))
+        job.completed_shards += 1
+        job.hands_completed += job.shard_hands(index)
+        if job.completed_shards == job.total_shards:
+            self._finish(job, "completed")
+        elif job.next_shard < job.total_shards:
+            self._submit_next(job, loop)
+
+    def _finish(self, job: SimulationJob, status: str):
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        job.wall_time = time.perf_counter() - job.started
+        job.futures = []
+        print(f"🎲 批量模拟任务 {job.job_id} {status}: {job.hands_completed}/{job.hands} 手, 耗时 {job.wall_time:.1f}s")
+
+    def _prune(self):
+        """丢弃最早结束的任务, 控制内存占用"""
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(self._jobs) - MAX_RETAINED_JOBS
+        for job in sorted(finished, key=lambda j: j.finished_at)[:max(excess, 0)]:
+            del self._jobs[job.job_id]
+
+
+# 全局实例
+simulation_jobs = SimulationJobManager()
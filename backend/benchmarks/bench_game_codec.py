@@ -0,0 +1,86 @@
+"""
+游戏快照编码基准测试
+
+用无头模拟器打出的真实牌局 (含完整动作历史) 对比二进制快照与 pickle 的
+大小和编解码速度, 以及单个动作事件的大小, 同时校验编码往返后的游戏状态完全一致.
+pickle 同时给出原先牌为 Card 对象时的数据 (旧版快照格式)
+
+用法 (在 backend 目录下):
+    python -m benchmarks.bench_game_codec [牌局数]
+"""
+import copy
+import pickle
+import sys
+import time
+
+from app.ai.simulator import HeadlessSimulator
+from app.core.game_codec import encode_game, decode_game, encode_action_event
+from app.core.poker import Card
+
+
+def sample_games(n: int):
+    """每手牌结束时的游戏快照"""
+    simulator = HeadlessSimulator(seed=1)
+    games = []
+    for _ in range(n):
+        simulator.play_hand()
+        game = copy.deepcopy(simulator.game)
+        game.hand_cache = {}
+        games.append(game)
+    return games
+
+
+def as_card_objects(game):
+    """牌替换为 Card 对象的副本 (原先 pickle 快照的内容)"""
+    legacy = copy.deepcopy(game)
+    legacy.deck.cards = [Card.from_int(c) for c in legacy.deck.cards]
+    legacy.community_cards = [Card.from_int(c) for c in legacy.community_cards]
+    for player in legacy.players:
+        player.hole_cards = [Card.from_int(c) for c in player.hole_cards]
+    return legacy
+
+
+def bench(func, items, repeat: int = 3) -> float:
+    """每秒处理次数 (取多次中最快的一次)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    games = sample_games(n)
+
+    mismatches = sum(
+        1 for game in games
+        if (decode_game(encode_game(game)).get_state(include_hole_cards=True) != game.get_state(include_hole_cards=True)
+            or decode_game(encode_game(game)).action_history != game.action_history
+            or decode_game(encode_game(game)).deck.cards != game.deck.cards)
+    )
+
+    legacy_games = [as_card_objects(game) for game in games]
+    encoded = [encode_game(game) for game in games]
+    codec_size = sum(map(len, encoded)) / n
+    codec_encode = bench(encode_game, games)
+    codec_decode = bench(decode_game, encoded)
+
+    print(f"{n} 个牌局快照 (平均 {sum(len(g.action_history) for g in games) / n:.1f} 个动作):")
+    print(f"  二进制快照: {codec_size:>6,.0f} 字节, 编码 {codec_encode:>8,.0f} 次/秒, 解码 {codec_decode:>8,.0f} 次/秒")
+    for label, items in (("pickle (整数牌)", games), ("pickle (Card 对象, 旧版)", legacy_games)):
+        pickled = [pickle.dumps(game) for game in items]
+        size = sum(map(len, pickled)) / n
+        dumps = bench(pickle.dumps, items)
+        loads = bench(pickle.loads, pickled)
+        print(f"  {label}: {size:>6,.0f} 字节 ({size / codec_size:.1f}x), "
+              f"编码 {dumps:>8,.0f} 次/秒 ({codec_encode / dumps:.1f}x), 解码 {loads:>8,.0f} 次/秒 ({codec_decode / loads:.1f}x)")
+    event_size = sum(len(encode_action_event(r)) for g in games for r in g.action_history) / sum(len(g.action_history) for g in games)
+    print(f"  动作事件 (事件溯源存储每个动作的写入): {event_size:.0f} 字节 (快照的 1/{codec_size / event_size:.0f})")
+    print(f"  往返不一致: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+手牌评估器基准测试
+
+对比查表评估器与原先遍历 C(7,5)=21 种组合的评估方式,
+同时校验两者在随机手牌上的结果完全一致
+
+用法 (在 backend 目录下):
+    python -m benchmarks.bench_hand_evaluator [样本数]
+"""
+import random
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+from typing import List, Tuple
+
+import numpy as np
+
+from app.core.poker import Card
+from app.core.hand_evaluator import HandEvaluator, HandRank
+
+
+def legacy_evaluate_hand(hole_cards: List[Card], community_cards: List[Card]) -> Tuple[HandRank, List[int]]:
+    """原实现: 遍历所有 5 张组合, 每个组合用 Counter 统计并排序"""
+    best_rank = HandRank.HIGH_CARD
+    best_values = []
+    for five_cards in combinations(hole_cards + community_cards, 5):
+        rank, values = _legacy_five_cards(list(five_cards))
+        if rank > best_rank or (rank == best_rank and values > best_values):
+            best_rank = rank
+            best_values = values
+    return best_rank, best_values
+
+
+def _legacy_five_cards(cards: List[Card]) -> Tuple[HandRank, List[int]]:
+    ranks_sorted = sorted((card.value for card in cards), reverse=True)
+    count_values = sorted(Counter(ranks_sorted).items(), key=lambda x: (x[1], x[0]), reverse=True)
+    is_flush = len(set(card.suit for card in cards)) == 1
+
+    unique = sorted(set(ranks_sorted), reverse=True)
+    straight_high = 0
+    if len(unique) == 5 and unique[0] - unique[4] == 4:
+        straight_high = unique[0]
+    elif unique == [14, 5, 4, 3, 2]:
+        straight_high = 5
+    straight = [5, 4, 3, 2, 1] if straight_high == 5 else list(range(straight_high, straight_high - 5, -1))
+
+    if is_flush and straight_high == 14:
+        return HandRank.ROYAL_FLUSH, [14, 13, 12, 11, 10]
+    if is_flush and straight_high:
+        return HandRank.STRAIGHT_FLUSH, straight
+    if count_values[0][1] == 4:
+        return HandRank.FOUR_OF_KIND, [count_values[0][0]] * 4 + [count_values[1][0]]
+    if count_values[0][1] == 3 and count_values[1][1] == 2:
+        return HandRank.FULL_HOUSE, [count_values[0][0]] * 3 + [count_values[1][0]] * 2
+    if is_flush:
+        return HandRank.FLUSH, ranks_sorted
+    if straight_high:
+        return HandRank.STRAIGHT, straight
+    if count_values[0][1] == 3:
+        return HandRank.THREE_OF_KIND, [count_values[0][0]] * 3 + sorted(
+            [count_values[1][0], count_values[2][0]], reverse=True)
+    if count_values[0][1] == 2 and count_values[1][1] == 2:
+        pair1, pair2 = count_values[0][0], count_values[1][0]
+        return HandRank.TWO_PAIR, [pair1, pair1, pair2, pair2, count_values[2][0]]
+    if count_values[0][1] == 2:
+        return HandRank.ONE_PAIR, [count_values[0][0]] * 2 + sorted(
+            [c[0] for c in count_values[1:4]], reverse=True)
+    return HandRank.HIGH_CARD, ranks_sorted
+
+
+def random_hands(n: int, board_size: int = 5, seed: int = 42):
+    """生成 n 手随机 (底牌, 公共牌), 整数牌"""
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(n):
+        cards = rng.sample(range(52), 2 + board_size)
+        hands.append((cards[:2], cards[2:]))
+    return hands
+
+
+def as_card_objects(hands):
+    """原实现使用 Card 对象"""
+    return [
+        ([Card.from_int(c) for c in hole], [Card.from_int(c) for c in board])
+        for hole, board in hands
+    ]
+
+
+def bench(func, hands) -> float:
+    """返回每秒评估手数"""
+    start = time.perf_counter()
+    for hole, board in hands:
+        func(hole, board)
+    return len(hands) / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for board_size in (3, 4, 5):
+        hands = random_hands(n, board_size)
+        legacy_hands = as_card_objects(hands)
+
+        mismatches = sum(
+            1 for (hole, board), (legacy_hole, legacy_board) in zip(hands, legacy_hands)
+            if HandEvaluator.evaluate_hand(hole, board) != legacy_evaluate_hand(legacy_hole, legacy_board)
+        )
+
+        legacy_rate = bench(legacy_evaluate_hand, legacy_hands)
+        table_rate = bench(HandEvaluator.evaluate_hand, hands)
+        strength_rate = bench(lambda h, b: HandEvaluator.evaluate_strength(h + b), hands)
+
+        print(f"{2 + board_size} 张牌, {n} 手:")
+        print(f"  组合遍历 (原实现): {legacy_rate:>12,.0f} 手/秒")
+        print(f"  查表 evaluate_hand: {table_rate:>12,.0f} 手/秒  ({table_rate / legacy_rate:.1f}x)")
+        print(f"  查表 evaluate_strength: {strength_rate:>12,.0f} 手/秒  ({strength_rate / legacy_rate:.1f}x)")
+        print(f"  结果不一致: {mismatches}")
+
+        holes = np.array([hole for hole, _ in hands], dtype=np.int8)
+        boards = np.array([board for _, board in hands], dtype=np.int8)
+        start = time.perf_counter()
+        strengths = HandEvaluator.evaluate_batch(holes, boards)
+        batch_rate = n / (time.perf_counter() - start)
+        batch_mismatches = sum(
+            1 for (hole, board), strength in zip(hands, strengths.tolist())
+            if HandEvaluator.evaluate_strength(hole + board) != strength
+        )
+        print(f"  NumPy evaluate_batch: {batch_rate:>12,.0f} 手/秒  ({batch_rate / legacy_rate:.1f}x), 不一致: {batch_mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+游戏推送消息编码基准测试
+
+用无头模拟器打出的 9 人桌牌局, 对比 JSON 与 MessagePack (牌为单字节整数) 编码
+完整状态 (get_state 快照) 和动作事件的大小与序列化速度, 同时校验 MessagePack 解码后
+与压缩后的 JSON 内容一致
+
+用法 (在 backend 目录下):
+    python -m benchmarks.bench_payload_encoding [牌局数]
+"""
+import copy
+import json
+import sys
+import time
+
+import msgpack
+
+from app.ai.simulator import HeadlessSimulator
+from app.core.msgpack_encoding import compact, packb
+
+
+def sample_states(n: int):
+    """每手牌结束时的游戏状态与动作事件"""
+    simulator = HeadlessSimulator(num_players=9, seed=1)
+    states, actions = [], []
+    for _ in range(n):
+        simulator.play_hand()
+        game = copy.deepcopy(simulator.game)
+        game.hand_cache = {}
+        states.append({"type": "snapshot", "seq": 1, "state": game.get_state()})
+        actions.extend(
+            {"type": "player_action", "data": dict(record, state=game.state.value)}
+            for record in game.action_history
+        )
+    return states, actions
+
+
+def bench(func, items, repeat: int = 3) -> float:
+    """每秒处理次数 (取多次中最快的一次)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    states, actions = sample_states(n)
+
+    mismatches = sum(1 for message in states if msgpack.unpackb(packb(message), strict_map_key=False) != compact(message))
+    print(f"{n} 手 9 人桌牌局:")
+    for label, messages in (("完整状态", states), ("动作事件", actions)):
+        json_size = sum(len(json.dumps(m).encode()) for m in messages) / len(messages)
+        packed_size = sum(len(packb(m)) for m in messages) / len(messages)
+        json_rate = bench(json.dumps, messages)
+        packed_rate = bench(packb, messages)
+        print(f"  {label}: JSON {json_size:>6,.0f} 字节 {json_rate:>9,.0f} 次/秒 | "
+              f"MessagePack {packed_size:>6,.0f} 字节 ({json_size / packed_size:.1f}x) {packed_rate:>9,.0f} 次/秒 ({packed_rate / json_rate:.1f}x)")
+    print(f"  解码不一致: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
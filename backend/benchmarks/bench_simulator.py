@@ -0,0 +1,30 @@
+"""
+无头模拟器吞吐量基准测试
+
+单进程连续模拟 N 手 6 人 AI 牌局, 报告每秒手数与结果汇总
+
+用法 (在 backend 目录下):
+    python -m benchmarks.bench_simulator [手数] [种子]
+"""
+import sys
+
+from app.ai.simulator import HeadlessSimulator
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    for smart_dealing in (False, True):
+        stats = HeadlessSimulator(seed=seed, smart_dealing=smart_dealing).run(n).to_dict()
+        label = "智能发牌" if smart_dealing else "标准发牌"
+        print(f"{label}, {n} 手:")
+        print(f"  吞吐量: {stats['hands_per_sec']:>10,.0f} 手/秒  ({stats['actions'] / stats['elapsed']:,.0f} 动作/秒)")
+        print(f"  摊牌率: {stats['showdown_rate']:.1%}, 平均底池: {stats['avg_pot']:.1f}, "
+              f"非法动作: {stats['invalid_actions']}, 未结束: {stats['stalled_hands']}")
+        for player_type, entry in sorted(stats["player_types"].items()):
+            print(f"  {player_type:<8} 胜率 {entry['win_rate']:.3f}  {entry['bb_per_100']:>+12,.1f} bb/100")
+
+
+if __name__ == "__main__":
+    main()
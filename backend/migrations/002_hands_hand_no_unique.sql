@@ -0,0 +1,24 @@
+-- 手牌记录增加手牌序号, 按 (game_id, hand_no, player_id) 唯一, 供写入时 INSERT ... ON CONFLICT 使用
+-- 问题: 同一游戏 (同一 game_id 连续开局) 会记录多手牌, (game_id, player_id) 不唯一
+-- 解决: 添加手牌序号 hand_no (PokerGame.hand_no, 每手牌加一); 已有记录不删除, 按每名玩家在该游戏中
+--       的记录顺序编为负数 (最早的最小, 最近的一条为 -1), 不与升级后从 1 开始的新编号冲突
+
+BEGIN;
+
+ALTER TABLE hands ADD COLUMN IF NOT EXISTS hand_no INTEGER NOT NULL DEFAULT 0;
+
+-- 回填已有记录
+UPDATE hands SET hand_no = numbered.hand_no
+FROM (
+    SELECT id, -ROW_NUMBER() OVER (PARTITION BY game_id, player_id ORDER BY id DESC) AS hand_no
+    FROM hands
+) numbered
+WHERE hands.id = numbered.id;
+
+-- 添加唯一约束
+ALTER TABLE hands ADD CONSTRAINT uq_hands_game_hand_player UNIQUE (game_id, hand_no, player_id);
+
+COMMIT;
+
+-- 验证修改
+SELECT conname FROM pg_constraint WHERE conname = 'uq_hands_game_hand_player';
@@ -0,0 +1,10 @@
+-- 游戏历史键集分页索引
+-- 问题: 游戏历史按 started_at 倒序 OFFSET 分页, 深翻页需要扫描并丢弃前面所有行
+-- 解决: 按 (started_at, id) 键集分页, 添加对应索引 (按状态筛选时使用带 status 前缀的索引)
+-- 手牌数按 game_id 统计, 使用 002 中 (game_id, hand_no, player_id) 唯一约束的索引
+
+CREATE INDEX IF NOT EXISTS ix_games_started_at_id ON games (started_at, id);
+CREATE INDEX IF NOT EXISTS ix_games_status_started_at_id ON games (status, started_at, id);
+
+-- 验证修改
+SELECT indexname FROM pg_indexes WHERE tablename = 'games';
@@ -0,0 +1,30 @@
+-- 手牌记录增加获胜牌型类别, 牌型与位置统计在数据库中分组计算
+-- 问题: 牌型分布按 final_hand 文本 (如 "四条A"、"一对K") 在 Python 中拆分汇总, 需要读取全部手牌行
+-- 解决: hand_category 保存 HandRank 的值 (1 高牌 ... 10 皇家同花顺), 其他玩家弃牌获胜为 0, 未获胜为空;
+--       新记录写入时填写, 已有记录按 final_hand 回填; 添加统计范围 (最近 N 手、时间范围、玩家) 使用的索引
+-- 注意: CREATE INDEX CONCURRENTLY 不能在事务中执行, 请直接用 psql -f 运行本文件
+
+ALTER TABLE hands ADD COLUMN IF NOT EXISTS hand_category SMALLINT;
+
+-- 回填已有获胜记录
+UPDATE hands SET hand_category = CASE
+    WHEN final_hand = '其他玩家弃牌' THEN 0
+    WHEN final_hand LIKE '皇家同花顺%' THEN 10
+    WHEN final_hand LIKE '同花顺%' THEN 9
+    WHEN final_hand LIKE '四条%' THEN 8
+    WHEN final_hand LIKE '葫芦%' THEN 7
+    WHEN final_hand LIKE '同花%' THEN 6
+    WHEN final_hand LIKE '顺子%' THEN 5
+    WHEN final_hand LIKE '三条%' THEN 4
+    WHEN final_hand LIKE '两对%' THEN 3
+    WHEN final_hand LIKE '一对%' THEN 2
+    WHEN final_hand LIKE '高牌%' THEN 1
+END
+WHERE final_hand IS NOT NULL AND hand_category IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hands_hand_category ON hands (hand_category);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hands_created_at ON hands (created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hands_player_id_created_at ON hands (player_id, created_at);
+
+-- 验证修改
+SELECT hand_category, COUNT(*) FROM hands GROUP BY hand_category ORDER BY hand_category;
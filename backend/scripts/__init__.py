@@ -0,0 +1 @@
+"""离线工具脚本"""
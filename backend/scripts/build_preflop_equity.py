@@ -0,0 +1,62 @@
+"""
+生成 169 类起手牌的翻牌前权益表
+
+对每个起手牌类别, 用蒙特卡洛计算对抗 1-9 个随机对手全下到河牌的权益,
+写出为 app/core/preflop_equity.py 定义的紧凑二进制格式
+
+用法 (在 backend 目录下):
+    python -m scripts.build_preflop_equity [--samples 100000] [--seed 20260101] [--output 路径]
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+from app.core.equity import calculate_equity
+from app.core.preflop_equity import (
+    DEFAULT_TABLE_PATH, MAX_OPPONENTS, NUM_CLASSES,
+    class_name, class_representative, write_table
+)
+
+
+def class_equities(index: int, samples: int, seed: int) -> List[float]:
+    """某个类别对抗 1-9 个对手的权益"""
+    hole = class_representative(index)
+    return [
+        calculate_equity(
+            hole,
+            num_opponents=n,
+            samples=samples,
+            seed=seed + index * MAX_OPPONENTS + n
+        )["equity"]
+        for n in range(1, MAX_OPPONENTS + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成翻牌前权益表")
+    parser.add_argument("--samples", type=int, default=100000, help="每个格子的蒙特卡洛样本数")
+    parser.add_argument("--seed", type=int, default=20260101, help="随机种子")
+    parser.add_argument("--output", type=Path, default=DEFAULT_TABLE_PATH, help="输出文件")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(class_equities, index, args.samples, args.seed)
+            for index in range(NUM_CLASSES)
+        ]
+        equities = []
+        for index, future in enumerate(futures):
+            equities.append(future.result())
+            print(f"[{index + 1}/{NUM_CLASSES}] {class_name(index):>4}: "
+                  + " ".join(f"{e:.3f}" for e in equities[-1]))
+
+    write_table(args.output, equities, args.samples, args.seed)
+    print(f"已写出 {args.output} ({time.perf_counter() - start:.0f} 秒)")
+
+
+if __name__ == "__main__":
+    main()
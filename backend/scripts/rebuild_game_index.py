@@ -0,0 +1,35 @@
+"""
+补建 Redis 中游戏摘要与索引
+
+遍历 (SCAN) 所有游戏快照, 为缺少摘要的游戏写入摘要、二级索引与统计计数,
+用于升级前已在 Redis 中的游戏. 可重复执行, 已有摘要的游戏不受影响
+
+用法 (在 backend 目录下):
+    python -m scripts.rebuild_game_index [--page-size 500]
+"""
+import argparse
+import asyncio
+
+from app.core.redis_storage import game_storage
+
+
+async def run(page_size: int):
+    await game_storage.connect()
+    if not game_storage.redis_client:
+        return
+    try:
+        rebuilt = await game_storage.rebuild_index(page_size)
+        print(f"✅ 补建 {rebuilt} 个游戏的摘要索引")
+    finally:
+        await game_storage.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="补建游戏摘要索引")
+    parser.add_argument("--page-size", type=int, default=500, help="每次 SCAN 的键数")
+    args = parser.parse_args()
+    asyncio.run(run(args.page_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+测试公共夹具
+
+Redis 以 fakeredis 代替, 数据库以 SQLite (aiosqlite) 文件库代替 PostgreSQL;
+异步代码在各测试内用 asyncio.run 执行, 不依赖 pytest-asyncio
+"""
+from contextlib import asynccontextmanager
+
+import fakeredis
+import pytest
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.models import Base
+from app.services import game_service
+
+
+@pytest.fixture
+def redis_server():
+    """同一 fakeredis 服务器上可建立多个连接 (模拟多个工作进程)"""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_redis(redis_server):
+    """在当前事件循环中创建 fakeredis 连接"""
+    return lambda: fakeredis.FakeAsyncRedis(server=redis_server)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """
+    打开一个建好表的 SQLite 数据库, 得到会话工厂:
+
+        async with database() as Session:
+            async with Session() as db:
+                ...
+    """
+    # PostgreSQL 的 INSERT ... ON CONFLICT 换成 SQLite 方言的同名语句
+    monkeypatch.setattr(game_service, "insert", sqlite.insert)
+
+    @asynccontextmanager
+    async def open_database():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            yield async_sessionmaker(engine, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    return open_database
@@ -0,0 +1,152 @@
+"""数据分析: 游戏历史键集分页、牌型与位置统计"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.models import Game, Hand
+from app.services.analytics_service import AnalyticsService
+
+_START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+async def _add_games(db, started: list, status: str = "finished") -> list:
+    """按给定开始时间 (分钟偏移) 写入游戏, 第 i 个游戏有 i 手牌记录"""
+    games = []
+    for index, minutes in enumerate(started):
+        game = Game(
+            game_uuid=f"{status}-{index}", num_players=2, status=status,
+            started_at=_START + timedelta(minutes=minutes)
+        )
+        game.hands = [Hand(player_id=1, hand_no=hand_no, position=0) for hand_no in range(index)]
+        games.append(game)
+    db.add_all(games)
+    await db.commit()
+    return games
+
+
+def test_keyset_pages_cover_ties_exactly_once(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                # 开始时间相同的游戏按 ID 排序, 不会在翻页时重复或遗漏
+                games = await _add_games(db, [0, 5, 5, 5, 5, 10, 10])
+                await _add_games(db, [7], status="playing")
+
+                seen, cursor = [], None
+                while True:
+                    page = await AnalyticsService.get_game_history(db, limit=2, cursor=cursor, status="finished")
+                    assert len(page["games"]) <= 2
+                    seen.extend(page["games"])
+                    cursor = page["next_cursor"]
+                    if cursor is None:
+                        break
+
+                expected = sorted(games, key=lambda game: (game.started_at, game.id), reverse=True)
+                assert [game["id"] for game in seen] == [game.id for game in expected]
+                assert {game["game_uuid"]: game["hands_count"] for game in seen} == {
+                    f"finished-{index}": index for index in range(len(games))
+                }
+                assert "total" not in page and "offset" not in page
+
+                everything = await AnalyticsService.get_game_history(db, limit=50)
+                assert len(everything["games"]) == 8 and everything["next_cursor"] is None
+
+    asyncio.run(run())
+
+
+def test_games_without_start_time_excluded(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                unstarted, started = await _add_games(db, [0, 1])
+                await db.execute(update(Game).where(Game.id == unstarted.id).values(started_at=None))
+                await db.commit()
+                page = await AnalyticsService.get_game_history(db, limit=1)
+                assert [game["id"] for game in page["games"]] == [started.id]
+                assert page["next_cursor"] is None
+
+    asyncio.run(run())
+
+
+def test_invalid_cursor_rejected(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                with pytest.raises(ValueError):
+                    await AnalyticsService.get_game_history(db, cursor="not-a-cursor")
+
+    asyncio.run(run())
+
+
+async def _add_hands(db, rows: list):
+    """rows: (分钟偏移, 玩家, 位置, 牌型类别, 是否获胜, 盈亏)"""
+    game = Game(game_uuid="analytics", num_players=6, status="finished", started_at=_START)
+    game.hands = [
+        Hand(
+            hand_no=hand_no, player_id=player_id, position=position, hand_category=category,
+            is_winner=won, profit_loss=profit, created_at=_START + timedelta(minutes=minutes)
+        )
+        for hand_no, (minutes, player_id, position, category, won, profit) in enumerate(rows)
+    ]
+    db.add(game)
+    await db.commit()
+
+
+_HANDS = [
+    (0, 1, 0, 1, True, 10.0),
+    (1, 2, 1, 1, True, 4.0),
+    (2, 1, 1, None, False, -4.0),
+    (3, 2, 2, 0, True, 3.0),
+    (4, 1, 0, None, False, -2.0),
+    (5, 1, 0, 2, True, 8.0),
+]
+
+
+def test_hand_type_distribution_grouped_in_sql(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                await _add_hands(db, _HANDS)
+
+                result = await AnalyticsService.get_hand_type_distribution(db)
+                assert result["total_hands"] == 4
+                assert [(row["hand_category"], row["count"]) for row in result["distribution"]] == [
+                    (1, 2), (0, 1), (2, 1)
+                ]
+                assert result["distribution"][0]["percentage"] == 50
+                assert result["distribution"][1]["hand_type"] == "其他玩家弃牌"
+
+                # 最近 2 手获胜手牌 / 时间范围 / 玩家筛选
+                recent = await AnalyticsService.get_hand_type_distribution(db, limit=2)
+                assert sorted(row["hand_category"] for row in recent["distribution"]) == [0, 2]
+                window = await AnalyticsService.get_hand_type_distribution(
+                    db, start=_START + timedelta(minutes=1), end=_START + timedelta(minutes=4)
+                )
+                assert sorted(row["hand_category"] for row in window["distribution"]) == [0, 1]
+                mine = await AnalyticsService.get_hand_type_distribution(db, player_id=1)
+                assert sorted(row["hand_category"] for row in mine["distribution"]) == [1, 2]
+
+    asyncio.run(run())
+
+
+def test_position_analysis_grouped_in_sql(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                await _add_hands(db, _HANDS)
+
+                result = await AnalyticsService.get_position_analysis(db)
+                assert result["total_hands"] == 6
+                assert [
+                    (row["position_name"], row["total"], row["wins"], row["avg_profit"])
+                    for row in result["positions"]
+                ] == [("BTN", 3, 2, 16 / 3), ("SB", 2, 1, 0.0), ("BB", 1, 1, 3.0)]
+
+                mine = await AnalyticsService.get_position_analysis(db, player_id=2)
+                assert [(row["position"], row["win_rate"]) for row in mine["positions"]] == [(1, 100.0), (2, 100.0)]
+                recent = await AnalyticsService.get_position_analysis(db, limit=1)
+                assert [(row["position"], row["wins"]) for row in recent["positions"]] == [(0, 1)]
+
+    asyncio.run(run())
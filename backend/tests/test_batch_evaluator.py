@@ -0,0 +1,76 @@
+"""NumPy 批量手牌评估与智能发牌公平性审计"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.hand_evaluator import HandEvaluator
+from app.core.process_pool import shutdown_process_pool
+from app.routers import simulation
+
+
+def test_batch_matches_scalar_evaluation():
+    rng = np.random.default_rng(3)
+    cards = np.array([rng.choice(52, 7, replace=False) for _ in range(2000)], dtype=np.int8)
+    strengths = HandEvaluator.evaluate_batch(cards[:, :2], cards[:, 2:])
+    expected = [HandEvaluator.evaluate_strength([int(c) for c in row]) for row in cards]
+    assert strengths.tolist() == expected
+
+
+def test_batch_with_shared_board():
+    board = np.array([0, 14, 28, 42, 5], dtype=np.int8)
+    holes = np.array([[12, 25], [7, 8]], dtype=np.int8)
+    strengths = HandEvaluator.evaluate_batch(holes, board)
+    assert strengths.tolist() == [
+        HandEvaluator.evaluate_strength([12, 25] + board.tolist()),
+        HandEvaluator.evaluate_strength([7, 8] + board.tolist()),
+    ]
+
+
+def test_batch_rejects_duplicate_cards():
+    with pytest.raises(ValueError):
+        HandEvaluator.evaluate_batch(np.array([[1, 1]]), np.array([[2, 3, 4, 5, 6]]))
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(simulation.router)
+    return TestClient(app)
+
+
+def test_dealer_audit_reports_each_seat(client):
+    response = client.post("/api/simulation/dealer-audit", json={
+        "player_states": [{"player_id": 1}, {"player_id": 2, "activity_score": 0.2, "loss_streak": 4}],
+        "num_deals": 200
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert [seat["player_id"] for seat in body["seats"]] == [1, 2]
+    assert sum(seat["win_rate"] for seat in body["seats"]) == pytest.approx(1.0)
+
+
+def test_large_dealer_audit_runs_in_process_pool(client):
+    # 2 人 × 20000 次发牌超过内联上限, 在进程池中执行
+    try:
+        response = client.post("/api/simulation/dealer-audit", json={
+            "player_states": [{"player_id": 1}, {"player_id": 2}], "num_deals": 20000
+        })
+    finally:
+        shutdown_process_pool()
+    assert response.status_code == 200
+    body = response.json()
+    assert body["num_deals"] == 20000
+    assert sum(seat["win_rate"] for seat in body["seats"]) == pytest.approx(1.0)
+    assert body["within_constraint"]
+
+
+@pytest.mark.parametrize("player_states", [
+    [{"player_id": 1}, {"player_id": "x"}],
+    [{"player_id": 1}, {"player_id": 2, "activity_score": 2}],
+    [{"player_id": 1}, {"player_id": 2, "loss_streak": -1}],
+    [{"player_id": 1}],
+])
+def test_dealer_audit_rejects_invalid_player_states(client, player_states):
+    response = client.post("/api/simulation/dealer-audit", json={"player_states": player_states})
+    assert response.status_code == 422
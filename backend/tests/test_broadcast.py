@@ -0,0 +1,171 @@
+"""WebSocket 广播: 跨工作进程分发、慢连接处理"""
+import asyncio
+import json
+
+from app.core.broadcast import ConnectionManager
+from app.core.config import settings
+
+
+class FakeWebSocket:
+    """记录收到的消息; block 为 True 时发送一直等待 (模拟慢连接)"""
+
+    def __init__(self, block: bool = False, fail: bool = False):
+        self.block = block
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+        self._unblocked = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise ConnectionError("连接已断开")
+        if self.block:
+            await self._unblocked.wait()
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self):
+        self.closed = True
+
+    def unblock(self):
+        self.block = False
+        self._unblocked.set()
+
+
+async def _settle(seconds: float = 0.05):
+    """等待订阅连接收到消息并由发送任务发出"""
+    await asyncio.sleep(seconds)
+
+
+async def _managers(make_redis, count: int = 2):
+    managers = [ConnectionManager() for _ in range(count)]
+    for manager in managers:
+        await manager.start(make_redis())
+    return managers
+
+
+def test_broadcast_reaches_connections_on_every_worker(make_redis):
+    async def run():
+        first, second = await _managers(make_redis)
+        here, there, other_game = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await first.connect("g", here)
+        await second.connect("g", there)
+        await second.connect("h", other_game)
+
+        await first.broadcast("g", {"type": "ping", "n": 1})
+        await _settle()
+        assert here.sent == there.sent == [{"type": "ping", "n": 1}]
+        assert other_game.sent == []
+        assert first.stats()["g"]["connections"] == 1
+
+        await second.disconnect("g", there)
+        await first.broadcast("g", {"type": "ping", "n": 2})
+        await _settle()
+        assert [message["n"] for message in here.sent] == [1, 2]
+        assert len(there.sent) == 1
+        assert "g" not in second.active_connections
+
+        for manager in (first, second):
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_local_broadcast_without_redis():
+    async def run():
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.connect("g", websocket)
+        await manager.broadcast("g", {"type": "ping"})
+        await manager.broadcast("missing", {"type": "ping"})
+        await _settle(0.01)
+        assert websocket.sent == [{"type": "ping"}]
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_reconnect_racing_last_disconnect_stays_subscribed(make_redis):
+    async def run():
+        listener, publisher = await _managers(make_redis)
+        leaving, joining = FakeWebSocket(), FakeWebSocket()
+        await listener.connect("g", leaving)
+
+        # 最后一个连接断开与新连接同时进行: 退订与订阅依次执行, 新连接仍能收到广播
+        await asyncio.gather(listener.disconnect("g", leaving), listener.connect("g", joining))
+        assert list(listener.active_connections["g"]) == [joining]
+        assert listener._pubsub.subscribed
+
+        await publisher.broadcast("g", {"type": "ping"})
+        await _settle()
+        assert joining.sent == [{"type": "ping"}]
+
+        for manager in (listener, publisher):
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_slow_client_does_not_delay_others(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 4)
+
+    async def run():
+        manager = ConnectionManager()
+        slow, fast = FakeWebSocket(block=True), FakeWebSocket()
+        await manager.connect("g", slow)
+        await manager.connect("g", fast)
+        for n in range(10):
+            await manager.broadcast("g", {"type": "tick", "n": n})
+            await asyncio.sleep(0.001)  # 正常连接的发送任务随时写出
+        await _settle(0.01)
+        assert [message["n"] for message in fast.sent] == list(range(10))
+
+        # 慢连接的积压被合并: 先收到丢弃通知, 再收到最新消息
+        slow.unblock()
+        await _settle(0.01)
+        assert {"type": "messages_dropped", "count": 4} in slow.sent
+        assert slow.sent[-1] == {"type": "tick", "n": 9}
+        assert len(slow.sent) < 10
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_drop_policy_disconnects_slow_client(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 2)
+    monkeypatch.setattr(settings, "WS_SLOW_CLIENT_POLICY", "drop")
+
+    async def run():
+        manager = ConnectionManager()
+        slow, fast = FakeWebSocket(block=True), FakeWebSocket()
+        await manager.connect("g", slow)
+        await manager.connect("g", fast)
+        for n in range(5):
+            await manager.broadcast("g", {"type": "tick", "n": n})
+            await asyncio.sleep(0.001)  # 正常连接的发送任务随时写出
+        await _settle(0.01)
+        assert slow.closed
+        assert list(manager.active_connections["g"]) == [fast]
+        assert len(fast.sent) == 5
+        await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_failed_send_removes_connection():
+    async def run():
+        manager = ConnectionManager()
+        broken = FakeWebSocket(fail=True)
+        await manager.connect("g", broken)
+        await manager.broadcast("g", {"type": "ping"})
+        await _settle(0.01)
+        assert broken.closed
+        assert "g" not in manager.active_connections
+        await manager.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,58 @@
+"""权益计算 (精确枚举与蒙特卡洛)"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.equity import calculate_equity, parse_range
+from app.core.poker import parse_card
+from app.routers import equity
+
+
+def _cards(text: str) -> list:
+    return [parse_card(card) for card in text.split()]
+
+
+def test_river_is_enumerated_exactly():
+    # 河牌已发完, 对手随机: 唯一的不确定来自对手底牌
+    result = calculate_equity(_cards("As Ah"), _cards("Ad Ac 2h 7s 9d"))
+    assert result["method"] == "exact"
+    assert result["win"] == 1.0 and result["lose"] == 0.0
+
+
+def test_exact_probabilities_sum_to_one():
+    result = calculate_equity(_cards("Kh Qh"), _cards("Jh Th 2c 3d"))
+    assert result["method"] == "exact"
+    assert result["win"] + result["tie"] + result["lose"] == pytest.approx(1.0)
+    assert result["confidence_interval"] == [result["equity"], result["equity"]]
+
+
+def test_monte_carlo_is_reproducible_with_seed():
+    first = calculate_equity(_cards("As Ks"), num_opponents=2, samples=5000, seed=7)
+    second = calculate_equity(_cards("As Ks"), num_opponents=2, samples=5000, seed=7)
+    assert first["method"] == "monte_carlo"
+    assert first == second
+    low, high = first["confidence_interval"]
+    assert low <= first["equity"] <= high
+
+
+def test_aces_against_random_hand_preflop():
+    result = calculate_equity(_cards("As Ah"), samples=20000, seed=1)
+    # AA 对随机手牌约 85%
+    assert result["equity"] == pytest.approx(0.85, abs=0.02)
+
+
+def test_parse_range():
+    assert len(parse_range("AKs")) == 4
+    assert len(parse_range("AKo")) == 12
+    assert len(parse_range("TT+")) == 5 * 6
+    assert parse_range("random") is None
+
+
+def test_equity_route_rejects_duplicate_cards():
+    app = FastAPI()
+    app.include_router(equity.router)
+    client = TestClient(app)
+    response = client.post("/api/equity", json={"hole_cards": ["As", "As"]})
+    assert response.status_code == 400
+    response = client.post("/api/equity", json={"hole_cards": ["As", "Kd"], "board": ["2c", "3d", "4h", "5s", "6c"]})
+    assert response.status_code == 200 and response.json()["method"] == "exact"
@@ -0,0 +1,204 @@
+"""游戏 Actor: 一致性哈希、命令串行执行、停止与跨进程转发"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.game_actors import GameActorSystem, HashRing
+from app.core.poker import PokerGame
+from app.core.redis_storage import RedisGameStorage
+
+
+def test_hash_ring_moves_few_keys():
+    keys = [f"game-{index}" for index in range(2000)]
+    ring = HashRing(["a", "b", "c"])
+    assert HashRing().owner("x") is None
+    assert ring.owner("x") == HashRing(["c", "b", "a"]).owner("x")
+    assert {ring.owner(key) for key in keys} == {"a", "b", "c"}
+
+    grown = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in keys if ring.owner(key) != grown.owner(key)]
+    # 新增节点只接管约 1/4 的游戏, 且只从其他节点移向新节点
+    assert len(moved) < len(keys) * 0.4
+    assert {grown.owner(key) for key in moved} == {"d"}
+
+
+def _system(storage: RedisGameStorage) -> GameActorSystem:
+    system = GameActorSystem(storage)
+
+    @system.command("bump")
+    async def _bump(game, delay: float = 0):
+        # 读取-等待-写入: 不串行执行时会丢失更新
+        pot = game.pot
+        await asyncio.sleep(delay)
+        game.pot = pot + 1
+        return game.pot
+
+    @system.command("pot", readonly=True)
+    async def _pot(game):
+        return game.pot
+
+    return system
+
+
+async def _create(system: GameActorSystem, game_id: str):
+    game = PokerGame(game_id=game_id, verbose=False)
+    game.add_player(1)
+    await system.create(game)
+
+
+def test_commands_on_one_game_run_in_order():
+    async def run():
+        system = _system(RedisGameStorage(cache_size=0))
+        await _create(system, "g")
+        results = await asyncio.gather(*(system.call("g", "bump", delay=0.001) for _ in range(20)))
+        assert sorted(results) == list(range(1, 21))
+        assert await system.call("g", "pot") == 20
+
+        with pytest.raises(HTTPException) as exc:
+            await system.call("missing", "bump")
+        assert exc.value.status_code == 404
+        with pytest.raises(ValueError):
+            await system.call("g", "unknown")
+        await system.stop()
+
+    asyncio.run(run())
+
+
+def test_commands_after_actor_stop_go_to_new_actor():
+    async def run():
+        system = _system(RedisGameStorage(cache_size=0))
+        await _create(system, "g")
+        slow = asyncio.ensure_future(system.call("g", "bump", delay=0.05))
+        await asyncio.sleep(0)
+        actor = system._actors["g"]
+        actor.stop()
+        # 排在退出标记之后的命令由新的 Actor 执行, 不会一直等待
+        later = asyncio.ensure_future(system.call("g", "bump"))
+        assert await asyncio.wait_for(asyncio.gather(slow, later), 2) == [1, 2]
+        await actor.task
+        assert await system.call("g", "bump") == 3
+
+    asyncio.run(run())
+
+
+def test_stop_waits_for_queued_commands_then_rejects():
+    async def run():
+        system = _system(RedisGameStorage(cache_size=0))
+        await _create(system, "g")
+        pending = [asyncio.ensure_future(system.call("g", "bump", delay=0.01)) for _ in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(system.stop(), 2)
+        assert sorted(await asyncio.gather(*pending)) == [1, 2, 3]
+
+        with pytest.raises(HTTPException) as exc:
+            await system.call("g", "bump")
+        assert exc.value.status_code == 503
+
+    asyncio.run(run())
+
+
+def test_commands_forwarded_to_owning_worker(make_redis):
+    async def run():
+        systems = []
+        for _ in range(2):
+            storage = RedisGameStorage(cache_size=8, flush_interval=100, validate_cache=False)
+            storage.redis_client = make_redis()
+            systems.append(_system(storage))
+        for system in systems:
+            await system.start()
+        await systems[0]._heartbeat()
+        first, second = systems
+        assert first._ring.nodes == second._ring.nodes == sorted([first.worker_id, second.worker_id])
+
+        game_id = next(f"g{index}" for index in range(100) if second._ring.owner(f"g{index}") == second.worker_id)
+        await first.create(PokerGame(game_id=game_id, verbose=False))
+        assert first.storage.cached_game_ids() == []
+
+        assert [await first.call(game_id, "bump") for _ in range(3)] == [1, 2, 3]
+        assert list(second._actors) == [game_id]
+        assert not first._actors
+
+        for system in systems:
+            await system.stop()
+
+    asyncio.run(run())
+
+
+def test_queued_commands_follow_ring_change(make_redis):
+    async def run():
+        systems, executed = [], []
+        for _ in range(2):
+            storage = RedisGameStorage(cache_size=8, flush_interval=100, validate_cache=False)
+            storage.redis_client = make_redis()
+            system = _system(storage)
+
+            @system.command("where")
+            async def _where(game, system=system):
+                executed.append(system.worker_id)
+                game.pot += 1
+                return game.pot
+
+            systems.append(system)
+        first, second = systems
+        ring = HashRing([first.worker_id, second.worker_id])
+        game_id = next(f"g{index}" for index in range(100) if ring.owner(f"g{index}") == second.worker_id)
+
+        # 只有第一个工作进程时游戏归它所有, 命令在它的 Actor 中排队
+        await first.start()
+        await first.create(PokerGame(game_id=game_id, verbose=False))
+        running = asyncio.ensure_future(first.call(game_id, "bump", delay=0.05))
+        await asyncio.sleep(0.01)
+        queued = [asyncio.ensure_future(first.call(game_id, "where")) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        # 第二个工作进程加入, 游戏改归它所有: 排队的命令按顺序转发过去, 不在原进程继续执行
+        await second.start()
+        await first._heartbeat()
+        assert not first.owns(game_id)
+        assert await asyncio.wait_for(asyncio.gather(running, *queued), 5) == [1, 2, 3, 4]
+        assert executed == [second.worker_id] * 3
+        assert game_id not in first._actors and game_id not in first.storage.cached_game_ids()
+
+        for system in systems:
+            await system.stop()
+
+    asyncio.run(run())
+
+
+def test_forwarded_replies_use_pubsub_and_cap_inflight(make_redis, monkeypatch):
+    monkeypatch.setattr(settings, "GAME_FORWARD_MAX_INFLIGHT", 2)
+
+    async def run():
+        systems = []
+        for _ in range(2):
+            storage = RedisGameStorage(cache_size=8, flush_interval=100, validate_cache=False)
+            storage.redis_client = make_redis()
+            systems.append(_system(storage))
+        for system in systems:
+            await system.start()
+        await systems[0]._heartbeat()
+        first, second = systems
+        game_id = next(f"g{index}" for index in range(100) if second._ring.owner(f"g{index}") == second.worker_id)
+        await first.create(PokerGame(game_id=game_id, verbose=False))
+
+        # 所属进程执行得慢: 最多 2 条转发命令同时等待结果, 其余排队等待转发名额
+        calls = [asyncio.ensure_future(first.call(game_id, "bump", delay=0.02)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        assert len(first._pending) == 2
+        assert sorted(await asyncio.wait_for(asyncio.gather(*calls), 5)) == [1, 2, 3, 4, 5]
+        assert not first._pending
+        # 结果经回复频道送回, 不留下回复列表
+        assert not [key async for key in first._redis.scan_iter("game_workers:reply:*")]
+
+        # 超时后返回 503, 不再等待该请求的结果
+        with pytest.raises(HTTPException) as exc:
+            await first.call(game_id, "bump", timeout=0.05, delay=0.2)
+        assert exc.value.status_code == 503
+        assert not first._pending
+
+        for system in systems:
+            await system.stop()
+
+    asyncio.run(run())
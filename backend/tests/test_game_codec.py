@@ -0,0 +1,102 @@
+"""游戏快照二进制格式"""
+import pickle
+import random
+import struct
+
+import pytest
+
+from app.core.game_codec import (
+    MAGIC, SnapshotError, decode_action_event, decode_game, encode_action_event, encode_game
+)
+from app.core.poker import Card, GameState, PokerGame
+
+
+def _game(seed: int = 0, num_players: int = 4) -> PokerGame:
+    game = PokerGame(game_id="codec", verbose=False)
+    for player_id in range(1, num_players + 1):
+        game.add_player(player_id * 10)
+    game.start_hand(random.Random(seed))
+    return game
+
+
+def _play(game: PokerGame, actions: int):
+    for _ in range(actions):
+        player = game.get_current_player()
+        if player is None:
+            return
+        game.player_action(player.player_id, "call" if player.current_bet < game.current_bet else "check")
+
+
+def _assert_same(decoded: PokerGame, game: PokerGame):
+    assert decoded.get_state() == game.get_state()
+    assert decoded.deck.cards == game.deck.cards
+    assert decoded.action_history == game.action_history
+    assert [(p.hole_cards, p.total_bet, p.has_acted) for p in decoded.players] == \
+        [(p.hole_cards, p.total_bet, p.has_acted) for p in game.players]
+    assert (decoded.state_seq, decoded.hand_no, decoded.created_at) == (game.state_seq, game.hand_no, game.created_at)
+
+
+def test_round_trip_mid_hand():
+    game = _game(seed=1)
+    _play(game, 6)
+    game.state_seq = 17
+    game._player_types = {10: "TAG", 20: "FISH"}
+    decoded = decode_game(encode_game(game))
+    _assert_same(decoded, game)
+    assert decoded._player_types == game._player_types
+
+
+def test_round_trip_after_showdown_and_next_hand():
+    game = _game(seed=2)
+    _play(game, 100)
+    assert game.state == GameState.SHOWDOWN
+    game.showdown()
+    _assert_same(decode_game(encode_game(game)), game)
+    game.start_hand(random.Random(3))
+    assert game.hand_no == 2
+    _assert_same(decode_game(encode_game(game)), game)
+
+
+def test_fractional_chips_use_float_encoding():
+    game = PokerGame(game_id="f", small_blind=0.5, big_blind=1.0, verbose=False)
+    game.add_player(1, 100.25)
+    game.add_player(2, 99.75)
+    game.start_hand(random.Random(0))
+    decoded = decode_game(encode_game(game))
+    assert [p.chips for p in decoded.players] == [p.chips for p in game.players]
+    assert decoded.pot == game.pot == 1.5
+
+
+def test_legacy_pickle_snapshot_is_migrated():
+    game = _game(seed=4)
+    game.deck.cards = [Card.from_int(card) for card in game.deck.cards]
+    for player in game.players:
+        player.hole_cards = [Card.from_int(card) for card in player.hole_cards]
+    for name in ("hand_no", "state_seq", "created_at", "hand_cache", "action_history"):
+        del game.__dict__[name]
+
+    decoded = decode_game(pickle.dumps(game))
+    assert decoded.hand_no == 0 and decoded.state_seq == 0 and decoded.action_history == []
+    assert all(isinstance(card, int) for card in decoded.deck.cards)
+    assert all(isinstance(card, int) for p in decoded.players for card in p.hole_cards)
+
+
+def test_unknown_sections_are_skipped():
+    game = _game(seed=5)
+    data = encode_game(game) + struct.pack("<BI", 200, 3) + b"xyz"
+    _assert_same(decode_game(data), game)
+
+
+def test_newer_or_corrupt_snapshots_raise():
+    data = encode_game(_game(seed=6))
+    with pytest.raises(SnapshotError):
+        decode_game(MAGIC + bytes([99]) + data[4:])
+    with pytest.raises(SnapshotError):
+        decode_game(data[:20])
+
+
+def test_action_event_round_trip():
+    game = _game(seed=7)
+    _play(game, 3)
+    for record in game.action_history:
+        assert decode_action_event(encode_action_event(record)) == record
@@ -0,0 +1,179 @@
+"""游戏数据持久化: 批量写入、按手牌幂等、INSERT ... ON CONFLICT"""
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.ai.simulator import HeadlessSimulator
+from app.core.poker import PokerGame
+from app.models import Action, Game, Hand, PlayerStats
+from app.services.game_service import GameService
+
+
+@contextmanager
+def _count_statements(Session):
+    """统计期间发往数据库的语句数 (executemany 算一次)"""
+    engine = Session.kw["bind"].sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def _count(db, model) -> int:
+    return await db.scalar(select(func.count()).select_from(model))
+
+
+def test_finish_game_uses_fixed_number_of_statements(database):
+    async def run():
+        async with database() as Session:
+            counts = []
+            for num_players in (3, 9):
+                simulator = HeadlessSimulator(num_players=num_players, seed=num_players)
+                simulator.game.game_id = f"bulk-{num_players}"
+                simulator.play_hand()
+                async with Session() as db:
+                    with _count_statements(Session) as statements:
+                        await GameService.finish_game(db, simulator.game, simulator.game.last_winners)
+                    counts.append(len(statements))
+
+            # 语句数与玩家数、动作数无关
+            assert counts[0] == counts[1] <= 4
+            async with Session() as db:
+                assert await _count(db, Game) == 2
+                assert await _count(db, Hand) == 12
+                assert await _count(db, Action) > 12
+                game = await db.scalar(select(Game).where(Game.game_uuid == "bulk-9"))
+                assert game.status == "finished"
+
+    asyncio.run(run())
+
+
+def _records(hands: int, seed: int = 7, game_id: str = "two-hands") -> list:
+    """同一 game_id 连续打 hands 手牌的手牌记录"""
+    simulator = HeadlessSimulator(num_players=4, seed=seed)
+    simulator.game.game_id = game_id
+    records = []
+    for _ in range(hands):
+        simulator.play_hand()
+        records.append(GameService.build_hand_record(simulator.game, simulator.game.last_winners))
+    return records
+
+
+def test_two_hands_of_one_game_both_saved(database):
+    async def run():
+        first, second = _records(2)
+        assert (first["hand_no"], second["hand_no"]) == (1, 2)
+        async with database() as Session:
+            async with Session() as db:
+                assert (await GameService.save_hand_records(db, [first]))["records"] == 1
+                assert (await GameService.save_hand_records(db, [second]))["records"] == 1
+                assert await _count(db, Game) == 1
+                rows = (await db.execute(select(Hand.hand_no, func.count()).group_by(Hand.hand_no))).all()
+                assert sorted(rows) == [(1, 4), (2, 4)]
+                assert await _count(db, Action) == len(first["actions"]) + len(second["actions"])
+
+    asyncio.run(run())
+
+
+def test_replayed_batch_is_idempotent(database):
+    async def run():
+        records = _records(3, game_id="replay") + _records(1, seed=8, game_id="other")
+        async with database() as Session:
+            async with Session() as db:
+                # 同一批中重复的手牌只写一次
+                counts = await GameService.save_hand_records(db, records + records[:1])
+                assert (counts["records"], counts["skipped"], counts["hands"]) == (4, 1, 16)
+                actions = await _count(db, Action)
+
+                # 整批重放 (写入后确认前进程退出): 不重复写入手牌与动作
+                counts = await GameService.save_hand_records(db, records)
+                assert (counts["records"], counts["hands"], counts["actions"], counts["skipped"]) == (0, 0, 0, 4)
+                assert (await _count(db, Hand), await _count(db, Action)) == (16, actions)
+                assert await GameService.save_hand_records(db, []) == {
+                    "records": 0, "hands": 0, "actions": 0, "skipped": 0
+                }
+
+    asyncio.run(run())
+
+
+def _game_record(game_uuid: str = "upsert", **values) -> dict:
+    return dict({
+        "game_uuid": game_uuid, "num_players": 4, "small_blind": 1.0, "big_blind": 2.0, "total_pot": 3.0
+    }, **values)
+
+
+def test_create_game_record_returns_existing_row(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                first = await GameService.create_game_record(db, _game_record())
+                # 同一游戏的后续手牌: 不报错, 不修改已有记录
+                second = await GameService.create_game_record(db, _game_record(num_players=6, total_pot=9.0))
+                assert second.id == first.id
+                assert (second.num_players, second.total_pot) == (4, 3.0)
+                assert await _count(db, Game) == 1
+
+    asyncio.run(run())
+
+
+def test_update_player_stats_accumulates(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                await GameService.update_player_stats(db, 7, won=True, profit=10.0)
+                await GameService.update_player_stats(db, 7, won=False, profit=-4.0)
+                await GameService.update_player_stats(db, 7, won=False, profit=-1.0)
+                await GameService.update_player_stats(db, 7, played_hand=False)
+                stats = await db.scalar(select(PlayerStats).where(PlayerStats.player_id == 7))
+                await db.refresh(stats)
+                assert (stats.total_hands, stats.wins, stats.total_profit) == (3, 1, 5.0)
+                assert stats.win_rate == pytest.approx(100 / 3)
+                assert await _count(db, PlayerStats) == 1
+
+    asyncio.run(run())
+
+
+def test_save_hand_overwrites_same_hand(database):
+    async def run():
+        async with database() as Session:
+            async with Session() as db:
+                game = await GameService.create_game_record(db, _game_record())
+                first = await GameService.save_hand(db, game.id, 1, 0, "AhKd", hand_no=1)
+                again = await GameService.save_hand(
+                    db, game.id, 1, 0, "AhKd", final_hand="一对", profit_loss=5.0, is_winner=True, hand_no=1
+                )
+                next_hand = await GameService.save_hand(db, game.id, 1, 0, "2c3d", hand_no=2)
+                assert again.id == first.id != next_hand.id
+                assert (again.final_hand, again.profit_loss, again.is_winner) == ("一对", 5.0, True)
+                assert await _count(db, Hand) == 2
+
+    asyncio.run(run())
+
+
+def test_create_game_record_from_built_record(database):
+    async def run():
+        game = PokerGame(game_id="built", verbose=False)
+        for player_id in (1, 2, 3):
+            game.add_player(player_id)
+        game.start_hand()
+        async with database() as Session:
+            async with Session() as db:
+                row = await GameService.create_game_record(db, GameService.build_game_record(game))
+                assert (row.game_uuid, row.num_players, row.total_pot, row.status) == ("built", 3, game.pot, "playing")
+                assert row.started_at is not None
+
+                # 下一手牌 (hand_no 增加) 复用同一游戏记录
+                game.start_hand()
+                again = await GameService.create_game_record(db, GameService.build_game_record(game))
+                assert again.id == row.id
+                assert await _count(db, Game) == 1
+
+    asyncio.run(run())
@@ -0,0 +1,136 @@
+"""游戏 API: 命令冲突重试后的数据库写入、WebSocket 增量推送、MessagePack 协商"""
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import metrics
+from app.core.msgpack_encoding import MSGPACK_MEDIA_TYPE, compact
+from app.core.redis_storage import RedisGameStorage, game_storage
+from app.core.state_diff import apply_patch
+from app.routers import games
+from app.services.game_service import GameService
+from app.services.hand_history_queue import hand_history_queue
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(games.router)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def records(monkeypatch):
+    """记录路由写入数据库与手牌记录队列的内容 (不连接数据库)"""
+    written = {"games": [], "hands": []}
+
+    async def create_game_record(db, record):
+        written["games"].append(record)
+
+    async def enqueue(record):
+        written["hands"].append(record)
+
+    monkeypatch.setattr(GameService, "create_game_record", create_game_record)
+    monkeypatch.setattr(hand_history_queue, "enqueue", enqueue)
+    return written
+
+
+@pytest.fixture
+def conflict_once(monkeypatch, make_redis):
+    """游戏存储改用 fakeredis (不带缓存); 下一次保存之前另一个工作进程先写入该游戏, 保存时版本冲突"""
+    monkeypatch.setattr(game_storage, "cache_size", 0)
+    monkeypatch.setattr(game_storage, "redis_client", make_redis())
+    other = RedisGameStorage(cache_size=0)
+    other.redis_client = make_redis()
+    save_game = game_storage.save_game
+    pending = []
+
+    async def save_after_other_writer(game_id, game, *args, **kwargs):
+        if pending:
+            pending.pop()
+            await other.save_game(game_id, await other.load_game(game_id))
+        await save_game(game_id, game, *args, **kwargs)
+
+    monkeypatch.setattr(game_storage, "save_game", save_after_other_writer)
+    return lambda: pending.append(True)
+
+
+def test_records_written_once_after_conflict_retry(client, records, conflict_once):
+    game_id = client.post("/api/games", json={"num_players": 3}).json()["game_id"]
+
+    retries = metrics.get("game_mutation_retries")
+    conflict_once()
+    assert client.post(f"/api/games/{game_id}/start").status_code == 200
+    assert metrics.get("game_mutation_retries") == retries + 1
+    assert [record["game_uuid"] for record in records["games"]] == [game_id]
+    state = client.get(f"/api/games/{game_id}").json()
+    # 第一次执行的修改已回滚, 盲注只下了一次
+    assert state["pot"] == 3
+    assert sum(player["chips"] for player in state["players"]) == 3000 - 3
+
+    # 跟注 / 过牌直到摊牌
+    while state["state"] != "showdown":
+        player = state["players"][state["current_player"]]
+        action = "call" if player["current_bet"] < state["current_bet"] else "check"
+        response = client.post(f"/api/games/{game_id}/action", json={"player_id": player["player_id"], "action": action})
+        assert response.status_code == 200
+        state = response.json()["game_state"]
+
+    conflict_once()
+    response = client.post(f"/api/games/{game_id}/showdown")
+    assert response.status_code == 200
+    assert metrics.get("game_mutation_retries") == retries + 2
+    assert "hand_record" not in response.json()
+    assert [(record["game_uuid"], record["hand_no"]) for record in records["hands"]] == [(game_id, 1)]
+    assert client.get(f"/api/games/{game_id}").json()["state"] == "finished"
+
+
+def test_websocket_receives_sequenced_patches(client):
+    game_id = client.post("/api/games", json={"num_players": 3}).json()["game_id"]
+    with client.websocket_connect(f"/api/games/ws/{game_id}") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        seq, state = snapshot["seq"], snapshot["state"]
+
+        client.post(f"/api/games/{game_id}/start")
+        patch = websocket.receive_json()
+        assert (patch["type"], patch["seq"]) == ("patch", seq + 1)
+        state = apply_patch(state, patch["ops"])
+        assert state == client.get(f"/api/games/{game_id}").json()
+        assert websocket.receive_json() == {"type": "game_started"}
+
+        # 客户端请求重新同步时收到最新快照
+        websocket.send_json({"type": "resync"})
+        snapshot = websocket.receive_json()
+        assert (snapshot["type"], snapshot["seq"], snapshot["state"]) == ("snapshot", seq + 1, state)
+
+
+def test_msgpack_negotiated_for_rest_and_websocket(client):
+    game_id = client.post("/api/games", json={"num_players": 3}).json()["game_id"]
+    client.post(f"/api/games/{game_id}/start")
+    url = f"/api/games/{game_id}?include_hole_cards=true"
+
+    plain = client.get(url)
+    as_json = plain.json()
+    response = client.get(url, headers={"Accept": MSGPACK_MEDIA_TYPE})
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    # 两种编码的响应都声明随 Accept 变化, 共享缓存不会混用
+    assert plain.headers["vary"] == response.headers["vary"] == "Accept"
+    as_msgpack = msgpack.unpackb(response.content)
+    # 牌压缩为整数 suit * 13 + rank, 其余结构不变
+    assert as_msgpack == compact(as_json)
+    card = as_json["players"][0]["hole_cards"][0]
+    assert as_msgpack["players"][0]["hole_cards"][0] == card["suit"] * 13 + card["rank"]
+    assert len(response.content) < len(client.get(url).content)
+
+    # 错误响应仍为 JSON
+    missing = client.get("/api/games/missing", headers={"Accept": MSGPACK_MEDIA_TYPE})
+    assert missing.status_code == 404
+    assert missing.json()["detail"]
+
+    with client.websocket_connect(f"/api/games/ws/{game_id}?encoding=msgpack") as websocket:
+        snapshot = msgpack.unpackb(websocket.receive_bytes())
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["state"]["game_id"] == game_id
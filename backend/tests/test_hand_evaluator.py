@@ -0,0 +1,80 @@
+"""查表手牌评估"""
+import random
+from itertools import combinations
+
+import pytest
+
+from app.core.hand_evaluator import HandEvaluator, HandRank
+from app.core.poker import parse_card
+
+
+def _cards(text: str) -> list:
+    return [parse_card(card) for card in text.split()]
+
+
+@pytest.mark.parametrize("text, rank, values", [
+    ("As Ks Qs Js Ts 2d 3c", HandRank.ROYAL_FLUSH, [14, 13, 12, 11, 10]),
+    ("9h 8h 7h 6h 5h Ad Ac", HandRank.STRAIGHT_FLUSH, [9, 8, 7, 6, 5]),
+    ("Qd Qc Qh Qs 2d 3c 4h", HandRank.FOUR_OF_KIND, [12, 12, 12, 12, 4]),
+    ("Kd Kc Kh 2s 2d 2c 4h", HandRank.FULL_HOUSE, [13, 13, 13, 2, 2]),
+    ("Ad 9d 7d 4d 2d Ks Kc", HandRank.FLUSH, [14, 9, 7, 4, 2]),
+    ("Ad 2c 3h 4s 5d Kc 9h", HandRank.STRAIGHT, [5, 4, 3, 2, 1]),
+    ("7d 7c 7h As 9d 3c 2h", HandRank.THREE_OF_KIND, [7, 7, 7, 14, 9]),
+    ("Jd Jc 4h 4s 9d 9c 2h", HandRank.TWO_PAIR, [11, 11, 9, 9, 4]),
+    ("Td Tc 4h 8s Ad 3c 2h", HandRank.ONE_PAIR, [10, 10, 14, 8, 4]),
+    ("Kd Jc 9h 7s 5d 3c 2h", HandRank.HIGH_CARD, [13, 11, 9, 7, 5]),
+])
+def test_evaluate_hand_categories(text, rank, values):
+    cards = _cards(text)
+    assert HandEvaluator.evaluate_hand(cards[:2], cards[2:]) == (rank, values)
+
+
+def test_seven_cards_pick_best_five_card_subset():
+    rng = random.Random(1)
+    for _ in range(300):
+        cards = rng.sample(range(52), 7)
+        best = max(HandEvaluator.evaluate_strength(list(five)) for five in combinations(cards, 5))
+        assert HandEvaluator.evaluate_strength(cards) == best
+
+
+def test_incremental_keys_match_full_evaluation():
+    rng = random.Random(2)
+    for _ in range(100):
+        cards = rng.sample(range(52), 7)
+        keys = HandEvaluator.partial_keys(cards[:5])
+        keys = HandEvaluator.partial_keys(cards[5:], keys)
+        assert HandEvaluator.strength_from_keys(keys) == HandEvaluator.evaluate_strength(cards)
+
+
+def test_compare_hands_uses_kickers():
+    pair_ace_kicker = HandEvaluator.evaluate_hand(_cards("Td Tc"), _cards("4h 8s Ad 3c 2h"))
+    pair_king_kicker = HandEvaluator.evaluate_hand(_cards("Th Ts"), _cards("4h 8s Kd 3c 2h"))
+    assert HandEvaluator.compare_hands(pair_ace_kicker, pair_king_kicker) == 1
+    assert HandEvaluator.compare_hands(pair_king_kicker, pair_ace_kicker) == -1
+    assert HandEvaluator.compare_hands(pair_ace_kicker, pair_ace_kicker) == 0
+
+
+def test_integer_cards_round_trip():
+    from app.core.poker import Card, card_to_str
+    for card in range(52):
+        assert Card.from_int(card).to_int() == card
+    assert parse_card("As") == 12 and card_to_str(parse_card("Td")) == "T♦"
+    with pytest.raises(ValueError):
+        parse_card("1x")
+
+
+@pytest.mark.parametrize("cards", [
+    [12, 12, 0, 1, 2],          # 重复的牌
+    [0, 1, 2, 3, 4, 5, 52],     # 超出 0-51
+    [0, 1, 2, 3, -1],           # 负数 (不能当作从末尾取的下标)
+    [-52, 1, 2, 3, 4],
+    [0, 1, 2, 3, None],         # 不是整数
+])
+def test_evaluate_strength_rejects_invalid_cards(cards):
+    with pytest.raises(ValueError):
+        HandEvaluator.evaluate_strength(cards)
+
+
+def test_evaluate_hand_rejects_duplicate_between_hole_and_board():
+    with pytest.raises(ValueError):
+        HandEvaluator.evaluate_hand(_cards("As Kd"), _cards("As 2c 3h 4s 5d"))
@@ -0,0 +1,125 @@
+"""手牌记录写入队列: 批量写入、失败重试、接管遗留条目"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import hand_history_queue as queue_module
+from app.services.hand_history_queue import HandHistoryQueue
+
+
+@pytest.fixture(autouse=True)
+def fast_queue(monkeypatch):
+    """缩短阻塞读取时间, 重试退避不等待"""
+    sleep = asyncio.sleep
+    monkeypatch.setattr(settings, "HAND_HISTORY_BLOCK", 0.01)
+    monkeypatch.setattr(settings, "HAND_HISTORY_MAX_RETRIES", 2)
+    monkeypatch.setattr(queue_module.asyncio, "sleep", lambda seconds: sleep(min(seconds, 0.001)))
+
+
+def _queue(failures: int = 0) -> HandHistoryQueue:
+    """写入数据库换成记录批次; 前 failures 次写入失败"""
+    queue = HandHistoryQueue()
+    queue.batches = []
+    queue.attempts = 0
+    queue.failures = failures
+
+    async def save(records):
+        queue.attempts += 1
+        if queue.attempts <= queue.failures:
+            raise ConnectionError("数据库不可用")
+        queue.batches.append(records)
+        return {"records": len(records), "hands": 0, "actions": 0, "skipped": 0}
+
+    queue._save = save
+    return queue
+
+
+def _record(hand_no: int) -> dict:
+    return {"game_uuid": "g", "hand_no": hand_no, "hands": [], "actions": []}
+
+
+async def _drain(queue: HandHistoryQueue, expected: int):
+    for _ in range(200):
+        if sum(len(batch) for batch in queue.batches) >= expected:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_enqueued_records_written_and_removed(make_redis):
+    async def run():
+        queue = _queue()
+        redis_client = make_redis()
+        await queue.start(redis_client)
+        for hand_no in (1, 2, 3):
+            await queue.enqueue(_record(hand_no))
+        await _drain(queue, 3)
+        assert (await queue.stats())["depth"] == 0
+        await queue.stop()
+
+        assert [record["hand_no"] for batch in queue.batches for record in batch] == [1, 2, 3]
+        assert await redis_client.xlen("hand_history") == 0
+
+    asyncio.run(run())
+
+
+def test_failed_writes_retried_then_moved_aside(make_redis):
+    async def run():
+        redis_client = make_redis()
+        queue = _queue(failures=2)
+        await queue.start(redis_client)
+        await queue.enqueue(_record(1))
+        await _drain(queue, 1)
+        # 失败两次后第三次写入成功
+        assert (queue.attempts, len(queue.batches)) == (3, 1)
+
+        queue.attempts, queue.failures = 0, 100
+        await queue.enqueue(_record(2))
+        for _ in range(200):
+            if await redis_client.xlen("hand_history:failed"):
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+        # 超过重试次数的批次移入失败流, 不阻塞后续记录
+        assert queue.attempts == settings.HAND_HISTORY_MAX_RETRIES + 1
+        assert await redis_client.xlen("hand_history") == 0
+        failed = await redis_client.xrange("hand_history:failed")
+        assert len(failed) == 1 and b'"hand_no": 2' in failed[0][1][b"record"]
+
+    asyncio.run(run())
+
+
+def test_entries_of_dead_consumer_claimed(make_redis, monkeypatch):
+    monkeypatch.setattr(settings, "HAND_HISTORY_CLAIM_IDLE", 0)
+
+    async def run():
+        redis_client = make_redis()
+        await redis_client.xgroup_create("hand_history", "hand_history_writers", id="0", mkstream=True)
+        dead = HandHistoryQueue()
+        dead.redis_client = redis_client
+        await dead.enqueue(_record(2))
+        # 读取后未确认就退出的消费者
+        await redis_client.xreadgroup("hand_history_writers", dead.consumer, {"hand_history": ">"}, count=10)
+
+        queue = _queue()
+        await queue.start(redis_client)
+        await _drain(queue, 1)
+        await queue.stop()
+        assert [record["hand_no"] for batch in queue.batches for record in batch] == [2]
+        assert await redis_client.xpending("hand_history", "hand_history_writers") == {
+            "pending": 0, "min": None, "max": None, "consumers": []
+        }
+
+    asyncio.run(run())
+
+
+def test_writes_directly_without_redis():
+    async def run():
+        queue = _queue()
+        await queue.start(None)
+        await queue.enqueue(_record(1))
+        await queue.stop()
+        assert queue.batches == [[_record(1)]]
+
+    asyncio.run(run())
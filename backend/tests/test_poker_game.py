@@ -0,0 +1,61 @@
+"""PokerGame 牌局流程与每名玩家的增量牌型缓存"""
+import random
+
+import pytest
+
+from app.core.hand_evaluator import HandEvaluator
+from app.core.poker import GameState, PokerGame
+
+
+def _game(num_players: int = 3, seed: int = 0) -> PokerGame:
+    game = PokerGame(game_id="t", verbose=False)
+    for player_id in range(1, num_players + 1):
+        game.add_player(player_id)
+    game.start_hand(random.Random(seed))
+    return game
+
+
+def _call_down(game: PokerGame):
+    """所有人跟注/过牌直到摊牌"""
+    while game.state not in (GameState.SHOWDOWN, GameState.FINISHED):
+        player = game.get_current_player()
+        action = "call" if player.current_bet < game.current_bet else "check"
+        game.player_action(player.player_id, action)
+
+
+def test_start_hand_posts_blinds_and_deals():
+    game = _game()
+    assert game.state == GameState.PREFLOP
+    assert game.pot == game.small_blind + game.big_blind
+    assert all(len(p.hole_cards) == 2 for p in game.players)
+    assert len(game.deck.cards) == 52 - 6
+
+
+def test_hand_cache_follows_each_street():
+    game = _game(seed=1)
+    _call_down(game)
+    assert game.state == GameState.SHOWDOWN
+    for player in game.players:
+        strength = game.evaluate_player_hand(player)[0]
+        assert strength == HandEvaluator.evaluate_strength(player.hole_cards + game.community_cards)
+        # 缓存记录已累加到河牌
+        assert game.hand_cache[player.player_id][1] == 5
+
+
+def test_hand_cache_is_cleared_for_new_hand():
+    game = _game(seed=2)
+    _call_down(game)
+    game.evaluate_player_hand(game.players[0])
+    game.showdown()
+    game.start_hand(random.Random(3))
+    assert game.hand_cache == {}
+
+
+def test_showdown_conserves_chips():
+    game = _game(num_players=4, seed=4)
+    total = sum(p.chips for p in game.players) + game.pot
+    _call_down(game)
+    result = game.showdown()
+    assert result["winners"]
+    assert sum(p.chips for p in game.players) == pytest.approx(total)
+    assert game.state == GameState.FINISHED
@@ -0,0 +1,63 @@
+"""翻牌前 169 类起手牌权益表"""
+import pytest
+
+from app.ai import decision_maker as decision_module
+from app.core.poker import PokerGame, parse_card
+from app.core.preflop_equity import (
+    MAX_OPPONENTS, NUM_CLASSES, PreflopEquityTable, class_index, class_name, preflop_table, write_table
+)
+
+
+def test_class_index_covers_169_classes():
+    names = {class_name(class_index(c1, c2)) for c1 in range(52) for c2 in range(52) if c1 != c2}
+    assert len(names) == NUM_CLASSES
+    assert class_name(class_index(parse_card("As"), parse_card("Ks"))) == "AKs"
+    assert class_name(class_index(parse_card("Kd"), parse_card("As"))) == "AKo"
+    assert class_index(parse_card("Td"), parse_card("Tc")) == class_index(parse_card("Ts"), parse_card("Th"))
+
+
+def test_shipped_table_is_ordered_by_strength():
+    assert preflop_table.available
+    aces = parse_card("As"), parse_card("Ah")
+    seven_deuce = parse_card("7c"), parse_card("2d")
+    for n in range(1, MAX_OPPONENTS + 1):
+        assert preflop_table.strength(*aces, n) == 1.0
+        assert preflop_table.equity(*aces, n) > preflop_table.equity(*seven_deuce, n)
+    # 对手越多, 同一手牌的权益越低
+    assert preflop_table.equity(*aces, 1) > preflop_table.equity(*aces, 5) > preflop_table.equity(*aces, 9)
+
+
+def test_written_table_round_trips(tmp_path):
+    equities = [[(index + n) / (NUM_CLASSES + MAX_OPPONENTS) for n in range(MAX_OPPONENTS)] for index in range(NUM_CLASSES)]
+    path = tmp_path / "table.bin"
+    write_table(path, equities, samples=10, seed=3)
+    table = PreflopEquityTable(path)
+    index = class_index(parse_card("As"), parse_card("Ks"))
+    assert table.equity(parse_card("As"), parse_card("Ks"), 2) == pytest.approx(equities[index][1], abs=1e-4)
+    assert (table.samples, table.seed) == (10, 3)
+
+
+def test_corrupt_table_is_unavailable(tmp_path):
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"not a table")
+    assert not PreflopEquityTable(path).available
+
+
+def test_decision_uses_real_number_of_opponents(monkeypatch):
+    game = PokerGame(game_id="t", verbose=False)
+    for player_id in range(1, 6):
+        game.add_player(player_id)
+    game.start_hand()
+    player = game.get_current_player()
+    next(p for p in game.players if p is not player).is_active = False
+    assert game.active_opponents(player) == 3
+
+    calls = []
+    real_strength = preflop_table.strength
+    monkeypatch.setattr(preflop_table, "strength", lambda c1, c2, n=1: calls.append(n) or real_strength(c1, c2, n))
+    decision_module.ai_decision_maker.make_decision(
+        player_id=player.player_id, player_type="TAG", hole_cards=player.hole_cards, community_cards=[],
+        current_bet=game.current_bet, player_bet=player.current_bet, player_chips=player.chips,
+        pot=game.pot, game_state=game.state.value, num_opponents=game.active_opponents(player)
+    )
+    assert calls and set(calls) == {3}
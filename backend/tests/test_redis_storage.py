@@ -0,0 +1,474 @@
+"""Redis 游戏存储: 异步读写、摘要索引、SCAN 遍历、热点缓存写回、动作事件、比较并写入"""
+import asyncio
+import random
+
+import pytest
+
+from app.core.config import settings
+from app.core.game_codec import SnapshotError, replay_actions
+from app.core.poker import GameState, PokerGame
+from app.core.redis_storage import GameConflictError, RedisGameStorage
+
+
+def _game(game_id: str, num_players: int = 3, start: bool = False) -> PokerGame:
+    game = PokerGame(game_id=game_id, verbose=False)
+    for player_id in range(1, num_players + 1):
+        game.add_player(player_id)
+    if start:
+        game.start_hand(random.Random(0))
+    return game
+
+
+def _storage(make_redis=None) -> RedisGameStorage:
+    """不带缓存的存储; 不传 make_redis 时为内存存储"""
+    storage = RedisGameStorage(cache_size=0)
+    if make_redis is not None:
+        storage.redis_client = make_redis()
+    return storage
+
+
+def test_save_and_load_through_redis(make_redis):
+    async def run():
+        storage = _storage(make_redis)
+        game = _game("g1", start=True)
+        await storage.save_game("g1", game)
+
+        # 另一个连接 (另一个工作进程) 读到同一份快照
+        loaded = await _storage(make_redis).load_game("g1")
+        assert loaded is not game
+        assert loaded.get_state() == game.get_state()
+        assert await storage.exists("g1")
+        assert await storage.load_game("missing") is None
+        assert list(await storage.load_games(["g1", "missing"])) == ["g1"]
+
+    asyncio.run(run())
+
+
+def test_memory_fallback_without_redis():
+    async def run():
+        storage = _storage()
+        game = _game("m1")
+        await storage.save_game("m1", game)
+        assert await storage.load_game("m1") is game
+        assert await storage.exists("m1")
+        await storage.delete_game("m1")
+        assert not await storage.exists("m1")
+        assert await storage.load_game("m1") is None
+
+    asyncio.run(run())
+
+
+def test_redis_errors_fall_back_to_memory(make_redis, redis_server):
+    async def run():
+        storage = _storage(make_redis)
+        redis_server.connected = False  # 之后的每次调用都失败
+        game = _game("e1")
+        await storage.save_game("e1", game)
+        assert await storage.load_game("e1") is game
+
+    asyncio.run(run())
+
+
+def test_update_game_saves_on_success(make_redis):
+    async def run():
+        storage = _storage(make_redis)
+        await storage.save_game("u1", _game("u1"))
+        async with storage.update_game("u1") as game:
+            game.start_hand(random.Random(1))
+        loaded = await storage.load_game("u1")
+        assert loaded.state == GameState.PREFLOP
+
+        async with storage.update_game("missing") as game:
+            assert game is None
+        assert not await storage.exists("missing")
+
+    asyncio.run(run())
+
+
+def _check_index(storage: RedisGameStorage):
+    async def run():
+        for index, game_id in enumerate(["a", "b", "c"]):
+            game = _game(game_id, start=game_id != "a")
+            game.created_at = 1000.0 + index
+            await storage.save_game(game_id, game)
+
+        assert [s["game_id"] for s in await storage.list_games()] == ["c", "b", "a"]
+        assert [s["game_id"] for s in await storage.list_games(offset=1, limit=1)] == ["b"]
+        assert [s["game_id"] for s in await storage.list_games(state="waiting")] == ["a"]
+        stats = await storage.get_stats()
+        assert stats == {
+            "total_games": 3, "active_games": 2, "finished_games": 0,
+            "total_players": 3, "total_hands": 2, "total_pot": stats["total_pot"]
+        }
+        assert stats["total_pot"] > 0
+
+        # 状态变化时索引与计数器随之更新
+        async with storage.update_game("b") as game:
+            game.state = GameState.FINISHED
+        assert [s["game_id"] for s in await storage.list_games(state="finished")] == ["b"]
+        assert [s["game_id"] for s in await storage.list_games(state="preflop")] == ["c"]
+        stats = await storage.get_stats()
+        assert (stats["active_games"], stats["finished_games"]) == (1, 1)
+
+        await storage.delete_game("c")
+        await storage.delete_game("b")
+        await storage.delete_game("a")
+        assert await storage.list_games() == []
+        assert await storage.get_stats() == {
+            "total_games": 0, "active_games": 0, "finished_games": 0,
+            "total_players": 0, "total_hands": 0, "total_pot": 0
+        }
+
+    asyncio.run(run())
+
+
+def test_summary_index_in_redis(make_redis):
+    _check_index(_storage(make_redis))
+
+
+def test_summary_index_in_memory():
+    _check_index(_storage())
+
+
+def test_expired_games_pruned_from_index(make_redis):
+    async def run():
+        storage = _storage(make_redis)
+        await storage.save_game("x", _game("x", start=True), ttl=60)
+        await storage.save_game("y", _game("y"), ttl=60)
+        # 模拟快照过期: 删除快照并把过期时间提前
+        await storage.redis_client.delete("game:x")
+        await storage.redis_client.zadd("games:expiry", {"x": 0})
+
+        assert [s["game_id"] for s in await storage.list_games()] == ["y"]
+        stats = await storage.get_stats()
+        assert (stats["total_games"], stats["active_games"], stats["total_hands"]) == (1, 0, 0)
+
+    asyncio.run(run())
+
+
+def test_iter_game_ids_pages_with_scan(make_redis):
+    async def run():
+        storage = _storage(make_redis)
+        game_ids = {f"s{index}" for index in range(25)}
+        for game_id in game_ids:
+            await storage.save_game(game_id, _game(game_id))
+        # 其他前缀的键 (摘要、索引) 不在结果中
+        pages = [page async for page in storage.iter_game_id_pages(page_size=5)]
+        assert len(pages) > 1
+        assert {game_id for page in pages for game_id in page} == game_ids
+        assert {game_id async for game_id in storage.iter_game_ids(page_size=7)} == game_ids
+
+    asyncio.run(run())
+
+
+def test_scan_failure_falls_back_only_before_first_page(make_redis, redis_server):
+    async def run():
+        storage = _storage(make_redis)
+        for index in range(25):
+            await storage.save_game(f"s{index}", _game(f"s{index}"))
+        storage._memory_storage["only-in-memory"] = _game("only-in-memory")
+
+        # 已返回 Redis 中的页后 SCAN 失败: 报错, 不混入内存中的游戏
+        scan, calls = storage.redis_client.scan, []
+
+        async def fail_after_first_page(*args, **kwargs):
+            calls.append(args)
+            if len(calls) > 1:
+                raise ConnectionError("Redis 连接断开")
+            return await scan(*args, **kwargs)
+
+        storage.redis_client.scan = fail_after_first_page
+        pages = []
+        with pytest.raises(ConnectionError):
+            async for page in storage.iter_game_id_pages(page_size=5):
+                pages.append(page)
+        assert len(pages) == 1 and "only-in-memory" not in pages[0]
+
+        # 第一页之前就失败: 改用内存
+        storage.redis_client.scan = scan
+        redis_server.connected = False
+        assert [page async for page in storage.iter_game_id_pages()] == [["only-in-memory"]]
+
+    asyncio.run(run())
+
+
+def test_iter_game_ids_in_memory():
+    async def run():
+        storage = _storage()
+        for index in range(5):
+            await storage.save_game(f"m{index}", _game(f"m{index}"))
+        pages = [page async for page in storage.iter_game_id_pages(page_size=2)]
+        assert pages == [["m0", "m1"], ["m2", "m3"], ["m4"]]
+
+    asyncio.run(run())
+
+
+def test_rebuild_index_for_games_without_summary(make_redis):
+    async def run():
+        storage = _storage(make_redis)
+        await storage.save_game("old", _game("old", start=True))
+        await storage.save_game("new", _game("new"))
+        # 模拟引入摘要索引之前保存的游戏
+        await storage.redis_client.delete("game_summary:old", "games:by_created", "games:counters")
+        assert [s["game_id"] for s in await storage.list_games()] == []
+
+        assert await storage.rebuild_index(page_size=1) == 1
+        assert [s["game_id"] for s in await storage.list_games()] == ["old"]
+        assert (await storage.get_stats())["total_hands"] == 1
+        assert await storage.rebuild_index() == 0
+
+    asyncio.run(run())
+
+
+def _cached_storage(make_redis, cache_size: int = 8) -> RedisGameStorage:
+    """带热点缓存的存储 (写回任务不启动, 由测试调用 flush)"""
+    storage = RedisGameStorage(cache_size=cache_size, flush_interval=100, validate_cache=False)
+    storage.redis_client = make_redis()
+    return storage
+
+
+def test_cache_writes_behind_until_flush(make_redis):
+    async def run():
+        storage, other = _cached_storage(make_redis), _storage(make_redis)
+        game = _game("w1")
+        await storage.save_game("w1", game)
+        assert await storage.load_game("w1") is game
+        assert await other.load_game("w1") is None
+
+        await storage.flush()
+        assert (await other.load_game("w1")).get_state() == game.get_state()
+        assert storage.cached_game_ids() == ["w1"]
+
+        # 一手牌结束时立即写回
+        game.state = GameState.FINISHED
+        await storage.save_game("w1", game)
+        assert (await other.load_game("w1")).state == GameState.FINISHED
+
+    asyncio.run(run())
+
+
+def test_cache_evicts_least_recently_used(make_redis):
+    async def run():
+        storage, other = _cached_storage(make_redis, cache_size=2), _storage(make_redis)
+        for game_id in ["l1", "l2"]:
+            await storage.save_game(game_id, _game(game_id))
+        await storage.load_game("l1")
+        await storage.save_game("l3", _game("l3"))
+
+        # l2 最久未使用: 写回后移出缓存
+        assert storage.cached_game_ids() == ["l1", "l3"]
+        assert await other.exists("l2")
+        assert not await other.exists("l1")
+
+    asyncio.run(run())
+
+
+def test_release_writes_back_and_drops(make_redis):
+    async def run():
+        storage, other = _cached_storage(make_redis), _storage(make_redis)
+        await storage.save_game("r1", _game("r1"))
+        await storage.release("r1")
+        assert storage.cached_game_ids() == []
+        assert await other.exists("r1")
+        await storage.release("r1")
+
+    asyncio.run(run())
+
+
+def test_update_game_rolls_back_dirty_entry(make_redis):
+    async def run():
+        storage = _cached_storage(make_redis)
+        await storage.save_game("d1", _game("d1"))
+        with pytest.raises(ValueError):
+            async with storage.update_game("d1") as game:
+                game.add_player(99)
+                raise ValueError("中途失败")
+        # 未写回的修改没有其他副本: 还原为修改前的状态
+        restored = await storage.load_game("d1")
+        assert [p.player_id for p in restored.players] == [1, 2, 3]
+        await storage.flush()
+        assert [p.player_id for p in (await _storage(make_redis).load_game("d1")).players] == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def test_update_game_drops_clean_entry_on_error(make_redis):
+    async def run():
+        storage = _cached_storage(make_redis)
+        await storage.save_game("c1", _game("c1"))
+        await storage.flush()
+        with pytest.raises(KeyError):
+            async with storage.update_game("c1") as game:
+                game.add_player(99)
+                raise KeyError("中途失败")
+        assert storage.cached_game_ids() == []
+        assert [p.player_id for p in (await storage.load_game("c1")).players] == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def test_update_game_rolls_back_memory_storage():
+    async def run():
+        storage = _storage()
+        await storage.save_game("mm", _game("mm"))
+        with pytest.raises(RuntimeError):
+            async with storage.update_game("mm") as game:
+                game.add_player(99)
+                raise RuntimeError("中途失败")
+        assert [p.player_id for p in (await storage.load_game("mm")).players] == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def _act(game: PokerGame):
+    player = game.get_current_player()
+    game.player_action(player.player_id, "call" if player.current_bet < game.current_bet else "check")
+
+
+def test_actions_appended_as_events_and_replayed(make_redis):
+    async def run():
+        storage, other = _cached_storage(make_redis), _storage(make_redis)
+        game = _game("ev", num_players=4, start=True)
+        await storage.save_game("ev", game)
+        await storage.flush()
+        snapshot = await storage.redis_client.get("game:ev")
+
+        # 同一条街上的动作只追加事件, 不重写快照
+        for _ in range(2):
+            _act(game)
+            await storage.save_game("ev", game)
+            await storage.flush()
+        assert await storage.redis_client.get("game:ev") == snapshot
+        assert await storage.redis_client.xlen("game_events:ev") == 2
+
+        loaded = await other.load_game("ev")
+        assert loaded.get_state() == game.get_state()
+        assert loaded.action_history == game.action_history
+
+        # 进入下一条街时写入新快照
+        while game.state == GameState.PREFLOP:
+            _act(game)
+        await storage.save_game("ev", game)
+        await storage.flush()
+        assert await storage.redis_client.get("game:ev") != snapshot
+        assert (await other.load_game("ev")).get_state() == game.get_state()
+
+    asyncio.run(run())
+
+
+def test_event_sourcing_disabled_writes_snapshots(make_redis, monkeypatch):
+    monkeypatch.setattr(settings, "GAME_EVENT_SOURCING", False)
+
+    async def run():
+        storage = _cached_storage(make_redis)
+        game = _game("sn", num_players=4, start=True)
+        await storage.save_game("sn", game)
+        await storage.flush()
+        _act(game)
+        await storage.save_game("sn", game)
+        await storage.flush()
+        assert await storage.redis_client.xlen("game_events:sn") == 0
+        assert (await _storage(make_redis).load_game("sn")).get_state() == game.get_state()
+
+    asyncio.run(run())
+
+
+def test_missing_events_fail_loudly(make_redis):
+    async def run():
+        storage = _cached_storage(make_redis)
+        game = _game("lost", num_players=4, start=True)
+        await storage.save_game("lost", game)
+        await storage.flush()
+        _act(game)
+        await storage.save_game("lost", game)
+        await storage.flush()
+        await storage.redis_client.delete("game_events:lost")
+
+        with pytest.raises(SnapshotError):
+            await _storage(make_redis)._fetch(["lost"])
+
+    asyncio.run(run())
+
+
+def test_replay_rejects_mismatched_events():
+    game = _game("rp", num_players=4, start=True)
+    replayed = _game("rp", num_players=4, start=True)
+    _act(game)
+    record = dict(game.action_history[-1])
+    assert replay_actions(replayed, [record]).get_state() == game.get_state()
+
+    with pytest.raises(SnapshotError):
+        replay_actions(_game("rp", num_players=4, start=True), [dict(record, pot_after=record["pot_after"] + 1)])
+    with pytest.raises(SnapshotError):
+        replay_actions(_game("rp", num_players=4, start=True), [dict(record, street="river")])
+
+
+def test_save_with_stale_version_conflicts(make_redis):
+    async def run():
+        storage = _storage(make_redis)
+        await storage.save_game("v", _game("v"))
+        game, version = await storage._load_versioned("v")
+        await storage.save_game("v", game, expected_version=version)
+        with pytest.raises(GameConflictError):
+            await storage.save_game("v", game, expected_version=version)
+
+    asyncio.run(run())
+
+
+def test_mutate_game_retries_after_concurrent_write(make_redis):
+    async def run():
+        storage, other = _storage(make_redis), _storage(make_redis)
+        await storage.save_game("cas", _game("cas"))
+        calls = []
+
+        async def add_player(game):
+            calls.append([p.player_id for p in game.players])
+            if len(calls) == 1:
+                # 另一个工作进程在读取之后写入
+                async with other.update_game("cas") as theirs:
+                    theirs.add_player(50)
+            game.add_player(60 + len(calls))
+            return len(calls)
+
+        assert await storage.mutate_game("cas", add_player) == 2
+        # 第二次执行拿到的是对方写入之后的状态, 两次修改都没有丢失
+        assert calls == [[1, 2, 3], [1, 2, 3, 50]]
+        assert [p.player_id for p in (await other.load_game("cas")).players] == [1, 2, 3, 50, 62]
+
+    asyncio.run(run())
+
+
+def test_mutate_game_gives_up_after_retries(make_redis):
+    async def run():
+        storage, other = _storage(make_redis), _storage(make_redis)
+        await storage.save_game("busy", _game("busy"))
+        attempts = 0
+
+        async def always_raced(game):
+            nonlocal attempts
+            attempts += 1
+            await other.save_game("busy", await other.load_game("busy"))
+
+        with pytest.raises(GameConflictError):
+            await storage.mutate_game("busy", always_raced, retries=2)
+        assert attempts == 3
+
+    asyncio.run(run())
+
+
+def test_validated_cache_detects_other_writers(make_redis):
+    async def run():
+        storage = RedisGameStorage(cache_size=8, validate_cache=True)
+        storage.redis_client = make_redis()
+        other = _storage(make_redis)
+        await storage.save_game("vc", _game("vc"))
+        cached = await storage.load_game("vc")
+
+        async with other.update_game("vc") as game:
+            game.add_player(70)
+        # 版本号不符: 缓存作废, 重新从 Redis 加载
+        reloaded = await storage.load_game("vc")
+        assert reloaded is not cached
+        assert [p.player_id for p in reloaded.players] == [1, 2, 3, 70]
+
+    asyncio.run(run())
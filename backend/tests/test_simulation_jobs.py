@@ -0,0 +1,49 @@
+"""批量模拟任务: 分片种子派生与进程池执行"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.ai.simulator import SimulationStats, run_simulation
+from app.core.process_pool import shutdown_process_pool
+from app.services.simulation_service import SimulationJob, SimulationJobManager, shard_seed
+
+
+def test_shard_seed_matches_spawned_sequences():
+    children = np.random.SeedSequence(1234).spawn(50)
+    assert [shard_seed(1234, index) for index in range(50)] == [
+        int(child.generate_state(1)[0]) for child in children
+    ]
+
+
+def test_shard_sizes_cover_all_hands():
+    job = SimulationJob(job_id="j", seed=1, hands=1050, shard_size=200, params={})
+    assert job.total_shards == 6
+    assert [job.shard_hands(index) for index in range(job.total_shards)] == [200] * 5 + [50]
+
+
+@pytest.fixture
+def process_pool():
+    yield
+    shutdown_process_pool()
+
+
+def test_job_merges_deterministic_shards(process_pool):
+    async def run_job():
+        manager = SimulationJobManager()
+        job = manager.submit(hands=300, shard_size=100, seed=42, num_players=4)
+        for _ in range(600):
+            if job.finished:
+                break
+            await asyncio.sleep(0.1)
+        return job
+
+    job = asyncio.run(run_job())
+    assert job.status == "completed"
+    assert job.hands_completed == 300
+
+    expected = SimulationStats()
+    for index in range(3):
+        expected.merge(SimulationStats.from_dict(run_simulation(100, seed=shard_seed(42, index), num_players=4)))
+    assert job.stats.hand_ranks == expected.hand_ranks
+    assert job.stats.total_pot == pytest.approx(expected.total_pot)
@@ -0,0 +1,55 @@
+"""无头模拟器与自动运行一手牌的接口"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.ai.simulator import HeadlessSimulator, SimulationStats, run_simulation
+from app.routers import games, simulation
+
+
+def _without_timing(result: dict) -> dict:
+    return {key: value for key, value in result.items() if key not in ("elapsed", "hands_per_sec")}
+
+
+def test_same_seed_reproduces_results():
+    first = run_simulation(200, num_players=6, seed=11)
+    second = run_simulation(200, num_players=6, seed=11)
+    assert _without_timing(first) == _without_timing(second)
+    assert first["hands"] == 200
+    assert sum(first["hand_ranks"].values()) >= 200
+
+
+def test_chips_are_conserved_across_hands():
+    simulator = HeadlessSimulator(num_players=4, seed=5, starting_chips=200)
+    stats = simulator.run(100)
+    assert stats.hands == 100
+    # 净输赢之和为零 (补充的筹码不计入输赢)
+    assert abs(sum(entry["net_chips"] for entry in stats.player_types.values())) < 1e-6
+
+
+def test_merged_shards_equal_sum_of_parts():
+    a = SimulationStats.from_dict(run_simulation(50, seed=1))
+    b = SimulationStats.from_dict(run_simulation(70, seed=2))
+    total = SimulationStats()
+    total.merge(a)
+    total.merge(b)
+    assert total.hands == 120
+    assert total.actions == a.actions + b.actions
+    assert total.max_pot == max(a.max_pot, b.max_pot)
+
+
+def test_auto_play_runs_a_full_hand():
+    app = FastAPI()
+    app.include_router(games.router)
+    app.include_router(simulation.router)
+    with TestClient(app) as client:
+        game_id = client.post("/api/games", json={"num_players": 4}).json()["game_id"]
+        response = client.post(f"/api/simulation/{game_id}/auto-play", params={"speed": 1000})
+        assert response.status_code == 200
+        body = response.json()
+        types = [action["type"] for action in body["game_log"]["actions"]]
+        assert types[:6] == ["player_type_assigned"] * 4 + ["game_started", "hole_cards_dealt"]
+        assert types[-1] in ("showdown", "early_win")
+        assert body["final_state"]["state"] == "finished"
+        assert body["game_log"]["winners"]
+
+        assert client.post("/api/simulation/missing/auto-play").status_code == 404
@@ -0,0 +1,47 @@
+"""游戏状态差分与补丁"""
+import copy
+import random
+
+from app.core.poker import PokerGame
+from app.core.state_diff import apply_patch, diff_state
+
+
+def _round_trip(old, new):
+    ops = diff_state(old, new)
+    assert apply_patch(copy.deepcopy(old), ops) == new
+    return ops
+
+
+def test_dict_and_list_changes():
+    old = {"pot": 0, "players": [{"chips": 1000}, {"chips": 1000}], "cards": [], "gone": 1}
+    new = {"pot": 30, "players": [{"chips": 1000}, {"chips": 970}], "cards": [1, 2, 3], "added": True}
+    ops = _round_trip(old, new)
+    assert [["pot"], 30] in ops
+    assert [["players", 1, "chips"], 970] in ops
+    # 长度变化的列表整体替换
+    assert [["cards"], [1, 2, 3]] in ops
+    assert [["gone"]] in ops
+    assert diff_state(new, copy.deepcopy(new)) == []
+
+
+def test_type_change_and_root_replacement():
+    assert diff_state({"pot": 1}, {"pot": 1.0}) == [[["pot"], 1.0]]
+    assert apply_patch({"a": 1}, diff_state({"a": 1}, [1])) == [1]
+
+
+def test_patches_follow_a_played_hand():
+    game = PokerGame(game_id="diff", verbose=False)
+    for player_id in range(1, 5):
+        game.add_player(player_id)
+    server = game.get_state()
+    client = copy.deepcopy(server)
+    game.start_hand(random.Random(3))
+    while True:
+        state = game.get_state()
+        client = apply_patch(client, diff_state(server, state))
+        assert client == state
+        server = state
+        player = game.get_current_player()
+        if player is None:
+            break
+        game.player_action(player.player_id, "call" if player.current_bet < game.current_bet else "check")